@@ -0,0 +1,339 @@
+# encoding: utf-8
+"""
+    benchmark.py
+    Authors: Mario Sarmientos, Randy Venegas, Pablo Ruiz 18259 (PingMaster99)
+    Version 1.0
+    Updated October 18, 2026
+
+    Benchmark suite for the routing algorithms.
+    Generates reproducible synthetic topologies, writes them as edge lists and loads them with
+    TopologyReader, so the algorithms run over the same data structures as the client.
+    Results are printed (or written) as JSON.
+
+    Example: python benchmark.py --topologies random grid --sizes 10 100 1000 --output bench.json
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import deque
+from message_codec import FLOODING
+from routing_algorithms import NetworkAlgorithms
+from simulator import SimulatedNode
+from topology_reader import TopologyReader, EDGE_LIST_HEADER
+
+TOPOLOGIES = ('random', 'grid', 'ring', 'scale_free', 'mesh')
+QUERIES = ('single_pair', 'single_source', 'all_pairs')
+
+
+def random_links(size, rng, degree=4):
+    """
+    Random connected graph: a random spanning tree plus extra links for the average degree, every pair of
+    nodes is linked at most once
+    """
+    order = list(range(size))
+    rng.shuffle(order)
+    linked = set()
+    for i in range(1, size):
+        u, v = order[i], order[rng.randrange(i)]
+        linked.add((min(u, v), max(u, v)))
+        yield u, v
+    for _ in range(max(0, size * degree // 2 - (size - 1))):
+        u, v = rng.randrange(size), rng.randrange(size)
+        if u != v and (min(u, v), max(u, v)) not in linked:
+            linked.add((min(u, v), max(u, v)))
+            yield u, v
+
+
+def grid_links(size, rng):
+    """
+    Square grid with ceil(sqrt(size)) columns
+    """
+    columns = max(1, math.ceil(math.sqrt(size)))
+    for u in range(size):
+        if (u + 1) % columns and u + 1 < size:
+            yield u, u + 1
+        if u + columns < size:
+            yield u, u + columns
+
+
+def ring_links(size, rng):
+    """
+    Every node linked to the next one
+    """
+    if size > 1:
+        for u in range(size):
+            yield u, (u + 1) % size
+
+
+def scale_free_links(size, rng, attachments=2):
+    """
+    Barabási-Albert preferential attachment
+    """
+    targets = list(range(min(size, attachments + 1)))
+    for u in range(1, len(targets)):
+        for v in range(u):
+            yield u, v
+    endpoints = [node for node in targets for _ in range(attachments)]
+    for u in range(len(targets), size):
+        chosen = set()
+        while len(chosen) < min(attachments, u):
+            chosen.add(rng.choice(endpoints))
+        for v in chosen:
+            yield u, v
+            endpoints.extend((u, v))
+
+
+def mesh_links(size, rng):
+    """
+    Fully meshed graph
+    """
+    for u in range(size):
+        for v in range(u + 1, size):
+            yield u, v
+
+
+GENERATORS = {
+    'random': random_links,
+    'grid': grid_links,
+    'ring': ring_links,
+    'scale_free': scale_free_links,
+    'mesh': mesh_links,
+}
+
+
+def write_topology(path, topology, size, seed, max_weight=10):
+    """
+    Writes a synthetic topology as an edge list file, every link in both directions
+    :param path: output file
+    :param topology: name of the generator
+    :param size: number of nodes
+    :param seed: random seed
+    :param max_weight: biggest link weight
+    :return: number of links written
+    """
+    rng = random.Random(f"{topology}-{size}-{seed}")
+    links = 0
+    with open(path, 'w') as output:
+        output.write(f"{EDGE_LIST_HEADER}\n")
+        output.write(' '.join(f"n{u}" for u in range(size)) + '\n')
+        for u, v in GENERATORS[topology](size, rng):
+            weight = rng.randint(1, max_weight)
+            output.write(f"{u} {v} {weight}\n{v} {u} {weight}\n")
+            links += 2
+    return links
+
+
+class FloodNetwork:
+    """
+    Synchronous in-memory transport for SimulatedNode, a flood runs until its last copy is handled
+    """
+    def __init__(self):
+        self.loop = None
+        self.nodes = {}
+        self.pending = deque()
+        self.transmissions = 0
+
+    def add(self, node):
+        self.nodes[node.jid] = node
+
+    def transmit(self, sender, receiver, body):
+        self.transmissions += 1
+        self.pending.append((sender, receiver, body))
+
+    def record_delivery(self, tag, hops):
+        pass
+
+    def run(self):
+        """
+        Hands the pending messages to their receivers, including the ones sent while handling them
+        """
+        while self.pending:
+            sender, receiver, body = self.pending.popleft()
+            self.nodes[receiver].receive_routed_message(body, sender)
+
+
+def flood_nodes(reader):
+    """
+    One client node per node of a topology, sending straight to the network instead of through outbound queues
+    so a flood is measured without the asyncio scheduling
+    :param reader: TopologyReader of the topology
+    :return: FloodNetwork and the nodes in the order of the topology
+    """
+    network = FloodNetwork()
+    nodes = [SimulatedNode(jid, reader, network) for jid in reader.nodes]
+    for node in nodes:
+        node.outbound = None
+    return network, nodes
+
+
+def flood(network, nodes, src, destination):
+    """
+    Floods a message through the client nodes, with the client's TTL and duplicate suppression
+    :return: number of messages sent
+    """
+    transmissions = network.transmissions
+    nodes[src].send_routed(nodes[destination].jid, "benchmark", FLOODING)
+    network.run()
+    return network.transmissions - transmissions
+
+
+def query_runner(algorithm, query, reader, rng, pairs):
+    """
+    Builds the function that runs one benchmark case
+    :param reader: TopologyReader of the topology
+    :return: function returning the number of queries answered, None if the case does not apply
+    """
+    routing = NetworkAlgorithms()
+    graph = reader.graph
+    size = graph.size
+    sources = [rng.randrange(size) for _ in range(pairs)]
+    destinations = [rng.randrange(size) for _ in range(pairs)]
+
+    if algorithm.startswith('link_state') and query == 'single_pair':
+        bidirectional = algorithm == 'link_state_bidirectional'
+
+        def run():
+            for src, destination in zip(sources, destinations):
+                routing.link_state_routing(graph, destination, src, bidirectional=bidirectional)
+            return len(sources)
+        return run
+
+    if algorithm == 'link_state_bidirectional':
+        return None
+
+    # Bellman-Ford and flooding answer a single pair query with a whole single source run
+    roots = range(size) if query == 'all_pairs' else sources[:1]
+    if algorithm == 'flooding':
+        network, nodes = flood_nodes(reader)
+        targets = dict(zip(sources, destinations))
+
+        def solve(_, src):
+            flood(network, nodes, src, targets.get(src, (src + 1) % size))
+    else:
+        solve = routing.dijkstra if algorithm == 'link_state' else routing.bellman_ford
+
+    def run():
+        for src in roots:
+            solve(graph, src)
+        return len(roots)
+    return run
+
+
+def measure(run, repeat):
+    """
+    Times a benchmark case and measures its peak memory in a separate run
+    :return: dictionary with the measurements
+    """
+    timings = []
+    operations = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        operations = run()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = min(timings)
+    return {
+        'wall_time': best,
+        'mean_wall_time': sum(timings) / len(timings),
+        'peak_memory': peak,
+        'operations': operations,
+        'operations_per_second': operations / best if best else None,
+    }
+
+
+def run_benchmarks(topologies, sizes, algorithms, queries, seed, repeat=3, pairs=20, max_links=2_000_000,
+                   max_all_pairs=500, directory=None):
+    """
+    Runs every combination of topology, size, algorithm and query
+    :return: report dictionary
+    """
+    results = []
+    with tempfile.TemporaryDirectory(dir=directory) as workspace:
+        for topology in topologies:
+            for size in sizes:
+                case = {'topology': topology, 'nodes': size}
+                expected_links = size * (size - 1) if topology == 'mesh' else 0
+                if expected_links > max_links:
+                    results.append(dict(case, skipped=f"more than {max_links} links"))
+                    continue
+
+                path = os.path.join(workspace, f"{topology}-{size}.txt")
+                write_topology(path, topology, size, seed)
+                start = time.perf_counter()
+                reader = TopologyReader(path, use_cache=False)
+                load_time = time.perf_counter() - start
+                graph = reader.graph
+                case.update(links=graph.edge_count, load_time=load_time)
+
+                for algorithm in algorithms:
+                    for query in queries:
+                        entry = dict(case, algorithm=algorithm, query=query)
+                        if query == 'all_pairs' and size > max_all_pairs:
+                            results.append(dict(entry, skipped=f"all pairs limited to {max_all_pairs} nodes"))
+                            continue
+                        if algorithm == 'bellman_ford' and size > max_all_pairs and query != 'single_pair':
+                            results.append(dict(entry, skipped=f"Bellman-Ford limited to {max_all_pairs} nodes"))
+                            continue
+                        if algorithm == 'flooding' and size > max_all_pairs:
+                            # Every node of the topology is a client node with its own routing state
+                            results.append(dict(entry, skipped=f"flooding limited to {max_all_pairs} nodes"))
+                            continue
+                        run = query_runner(algorithm, query, reader, random.Random(seed), pairs)
+                        if run is None:
+                            continue
+                        entry.update(measure(run, repeat))
+                        results.append(entry)
+                        print(json.dumps(entry), file=sys.stderr)
+
+    return {
+        'seed': seed,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+
+
+def main():
+    """
+    Command line entry point
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the routing algorithms over synthetic topologies")
+    parser.add_argument('--topologies', nargs='+', choices=TOPOLOGIES, default=list(TOPOLOGIES))
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10, 100, 1000, 10000, 100000])
+    parser.add_argument('--algorithms', nargs='+', default=['link_state', 'link_state_bidirectional',
+                                                            'bellman_ford', 'flooding'],
+                        choices=['link_state', 'link_state_bidirectional', 'bellman_ford', 'flooding'])
+    parser.add_argument('--queries', nargs='+', choices=QUERIES, default=list(QUERIES))
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--pairs', type=int, default=20, help="Random source/destination pairs per single pair case")
+    parser.add_argument('--max-links', type=int, default=2_000_000)
+    parser.add_argument('--max-all-pairs', type=int, default=500)
+    parser.add_argument('--output', help="JSON report file, printed when omitted")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.topologies, args.sizes, args.algorithms, args.queries, args.seed, args.repeat,
+                            args.pairs, args.max_links, args.max_all_pairs)
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -21,7 +21,65 @@ Select an option to proceed:
 2 -> Send a message
 3 -> Exit
 4 -> Send DVR weight update
+5 -> Change a link weight
+6 -> Send a file
 >> """
 
 SERVER = "@alumchat.xyz"    # Change to @192.168.56.1 or ipv4 value if using a local server
 LOGGING = False             # Change to True if you want logging
+DVR_INCREMENTAL = True      # Only re-evaluate destinations affected by received distance vectors
+DVR_MAX_DISTANCE = 0        # Distance vector distances at or above this are unreachable, ends counting to infinity.
+                            # 0 uses the node count times the heaviest link, more than any loop free path
+DVR_DEBOUNCE = 0.2          # Seconds to wait so distance vectors that arrive together cause one recompute
+DVR_TTL = 64                # Maximum number of hops of a distance vector routed message
+MESSAGE_FORMAT = 'binary'   # 'binary' envelopes or the original '/$/' 'text' format
+FLOOD_TTL = 16              # Maximum number of hops of a flooded message
+FLOOD_CACHE_SIZE = 4096     # Flooded message ids remembered to drop duplicates
+FLOOD_CACHE_LIFETIME = 60   # Seconds a flooded message id is remembered
+SOURCE_ROUTING = False      # Link state messages carry their whole path instead of only the destination
+LINK_STATE_TTL = 64         # Maximum number of hops of a destination only link state message
+MULTIPATH_PATHS = 1         # Link state messages are spread over this many shortest paths, 1 disables multipath
+MULTIPATH_STRETCH = 1.5     # Paths longer than the shortest one times this are not used
+MULTIPATH_MAX_IN_FLIGHT = 32    # Queued messages on a path before its traffic moves to the other paths
+AREA_SIZE = 0               # Destination only link state routes are kept per area of this many nodes, 0 routes flat
+LINK_STATE_DATABASE = True  # Link state routes follow advertisements flooded at runtime
+LSA_REFRESH = 1800          # Seconds between refreshes of a node's link state advertisement
+LSA_MAX_AGE = 3600          # Seconds an advertisement lives without a refresh from its origin
+SPF_INITIAL_DELAY = 0.05    # Seconds between the first changed advertisement and the SPF run
+SPF_HOLD = 0.2              # Minimum seconds between SPF runs, doubled on every run during churn
+SPF_MAX_HOLD = 5.0          # Biggest SPF hold time
+INCREMENTAL_SPF = True      # Repair the shortest path tree link by link instead of recomputing it
+INCREMENTAL_SPF_LIMIT = 64  # Most link changes in one SPF run before the tree is recomputed
+LINK_PROBE_INTERVAL = 0     # Seconds between round trip probes of the neighbors, 0 keeps the topology file weights
+LINK_PROBE_TIMEOUT = 2.0    # Seconds before a probe counts as lost
+LINK_RTT_ALPHA = 0.25       # Weight of a new probe in the round trip time and loss moving averages
+LINK_COST_UNIT = 0.01       # Seconds of smoothed round trip time per unit of link weight
+LINK_COST_THRESHOLD = 0.25  # Relative weight change needed before a new link weight is advertised
+LINK_HOLD_DOWN = 30.0       # Seconds after a link weight change before it changes again, going down is immediate
+LINK_DOWN_LOSS = 0.5        # Smoothed probe loss above which a link is advertised as down
+ROUTE_WORKER = 'thread'     # Route computation in a 'thread' or 'process' pool, or 'inline' on the event loop
+ROUTE_WORKERS = 1           # Workers of the route computation pool
+ROUTE_INDEX_PATCH_LIMIT = 64    # Most changed links for which an outdated all-pairs route index is patched
+ROUTE_INDEX_MAX_NODES = 4096    # Biggest topology that gets an all-pairs route index, it takes 16 bytes per pair
+DENSE_MATRIX_LIMIT = 2000   # Biggest topology that also gets a dense adjacency matrix view
+OUTBOUND_QUEUES = True      # Send through one bounded queue and sender task per neighbor
+OUTBOUND_QUEUE_SIZE = 256   # Messages queued per neighbor before producers wait
+OUTBOUND_BATCH_DELAY = 0.01 # Seconds a DVR update waits so more entries are merged into it
+OUTBOUND_RATE = 0           # Maximum messages per second per neighbor, 0 for no limit
+TRANSFER_CHUNK_SIZE = 4096  # Compressed bytes per chunk of a streamed transfer
+TRANSFER_WINDOW = 32        # Chunks in flight before the sender waits for acknowledgements, at most 64
+TRANSFER_TIMEOUT = 2.0      # Seconds without an acknowledgement before a chunk is sent again
+TRANSFER_RETRIES = 5        # Times a chunk is sent again before the transfer fails
+TRANSFER_DIRECTORY = 'received'     # Directory received files are written to
+TRANSFER_MAX_INCOMING = 16  # Transfers received at the same time
+TRANSFER_MAX_SIZE = 1 << 30 # Biggest file accepted, in bytes
+TRANSFER_IDLE_TIMEOUT = 60  # Seconds without chunks before a partially received file is discarded
+METRICS = False             # Record forwarding path counters and histograms
+METRICS_FILE = 'metrics.json'   # Metrics export file, Prometheus text when it ends in .prom
+METRICS_INTERVAL = 10       # Seconds between metrics exports
+
+# Results of an account registration
+CREATED = 'created'
+EXISTS = 'exists'
+TIMEOUT = 'timeout'
+FAILED = 'failed'
@@ -0,0 +1,348 @@
+# encoding: utf-8
+"""
+    daemon.py
+    Authors: Mario Sarmientos, Randy Venegas, Pablo Ruiz 18259 (PingMaster99)
+    Version 1.0
+    Updated October 18, 2026
+
+    Headless node for scripted load runs.
+    Logs in without the menus and takes requests from a local control socket, a script file and a
+    built-in load generator, so the throughput and latency of a real node can be measured reproducibly.
+    Options come from a JSON config file and/or command line flags, flags win.
+
+    Requests are JSON lines, answered with {"ok": true, ...} or {"ok": false, "error": ...}:
+        {"to": "user", "message": "hello", "algorithm": "link_state", "flow": "chat-1"}
+        {"command": "load", "to": ["user1", "user2"], "rate": 50, "count": 1000, "size": 32}
+        {"command": "transfer", "to": "user", "file": "data.bin", "algorithm": "link_state"}
+        {"command": "link", "to": "user", "weight": 3}
+        {"command": "dvr_update"}   {"command": "stats"}   {"command": "sleep", "seconds": 1}   {"command": "stop"}
+
+    Example: python daemon.py --jid node1 --password secret --metrics node1.prom --load-to node2 --load-rate 50
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import constants
+import metrics
+from message_codec import ALGORITHM_NAMES, DVR, FLOODING, LINK_STATE
+from transfer import TransferError
+
+ALGORITHMS = {ALGORITHM_NAMES[algorithm]: algorithm for algorithm in (DVR, FLOODING, LINK_STATE)}
+
+DEFAULTS = {
+    'jid': None,
+    'password': None,
+    'topology': './topology.txt',
+    'algorithm': 'link_state',
+    'metrics': None,
+    'metrics_interval': constants.METRICS_INTERVAL,
+    'control': None,
+    'script': None,
+    'load_to': [],
+    'load_rate': 0.0,
+    'load_count': 0,
+    'load_duration': 0.0,
+    'load_size': 32,
+    'seed': 1,
+    'exit_when_done': False,
+}
+
+log = logging.getLogger(__name__)
+
+
+class NodeController:
+    """
+    Drives a routing node without the menus
+    """
+    def __init__(self, node, options):
+        """
+        Initializes the controller
+        :param node: RoutingNode to drive, usually a MessengerAccount
+        :param options: dictionary with the DEFAULTS keys
+        """
+        self.node = node
+        self.options = options
+        self.algorithm = ALGORITHMS[options['algorithm']]
+        self.random = random.Random(options['seed'])
+        self.sent = 0
+        self.received = 0
+        self.stopped = asyncio.Event()
+        self.server = None
+        self.clients = set()
+        node.delivery_callback = self.delivered
+
+    def jid(self, user):
+        """
+        :return: jid of a topology node name or username
+        """
+        if user in self.node.codec.node_indexes or '@' in user:
+            return user
+        return f"{user}{constants.SERVER}"
+
+    def delivered(self, envelope):
+        """
+        Counts a message that reached this node
+        """
+        self.received += 1
+        log.info("Message received from %s: %s", self.node.nodes[envelope.sender], envelope.text)
+
+    async def send(self, user, message, algorithm=None, flow=None):
+        """
+        Sends a routed message, waiting while the outbound queue of its next hop is full
+        :param user: destination username or jid
+        :param message: content
+        :param algorithm: 'dvr', 'flooding' or 'link_state', the configured one when omitted
+        :param flow: multipath flow key, messages with the same key take the same path
+        """
+        await self.node.put_routed(self.jid(user), message, ALGORITHMS[algorithm] if algorithm else self.algorithm,
+                                   flow)
+        self.sent += 1
+
+    async def generate_load(self, destinations, rate, count=0, duration=0.0, size=32):
+        """
+        Sends messages at a fixed rate to random destinations until count messages were sent, duration
+        seconds passed or the controller is stopped
+        :param destinations: usernames or jids
+        :param rate: messages per second
+        :param count: messages to send, 0 for no limit
+        :param duration: seconds to send for, 0 for no limit
+        :param size: characters per message
+        :return: dictionary with the messages sent, elapsed seconds and achieved rate
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        sent = 0
+        while (not count or sent < count) and (not duration or loop.time() - start < duration) and \
+                not self.stopped.is_set():
+            await self.send(self.random.choice(destinations), f"load-{sent}-".ljust(size, '.'))
+            sent += 1
+            # Scheduled from the start time so the rate does not drift with the time spent sending
+            delay = start + sent / rate - loop.time()
+            await asyncio.sleep(max(0.0, delay))
+        elapsed = loop.time() - start
+        summary = {'sent': sent, 'elapsed': elapsed, 'rate': sent / elapsed if elapsed else None}
+        log.info("Load finished: %s", summary)
+        return summary
+
+    def stats(self):
+        """
+        :return: dictionary with the counters of the node
+        """
+        stats = {'sent': self.sent, 'received': self.received, 'route_cache': self.node.route_cache.stats()}
+        if self.node.outbound is not None:
+            stats['outbound'] = self.node.outbound.stats()
+        if getattr(self.node, 'startup', None):
+            stats['startup'] = self.node.startup
+        if self.node.link_monitor is not None:
+            stats['links'] = self.node.link_monitor.stats()
+        if self.node.multipath is not None:
+            stats['multipath'] = {self.node.nodes[destination]: routes
+                                  for destination, routes in self.node.multipath.stats().items()}
+        if metrics.REGISTRY.enabled:
+            stats['metrics'] = json.loads(metrics.REGISTRY.to_json())['metrics']
+        return stats
+
+    async def handle(self, request):
+        """
+        Runs one request
+        :param request: request dictionary
+        :return: response dictionary
+        """
+        command = request.get('command', 'send')
+        if command == 'send':
+            await self.send(request['to'], request['message'], request.get('algorithm'), request.get('flow'))
+        elif command == 'load':
+            destinations = request['to'] if isinstance(request['to'], list) else [request['to']]
+            return {'ok': True, 'load': await self.generate_load(
+                destinations, float(request['rate']), int(request.get('count', 0)),
+                float(request.get('duration', 0)), int(request.get('size', 32)))}
+        elif command == 'transfer':
+            algorithm = request.get('algorithm')
+            with open(request['file'], 'rb') as file:
+                result = await self.node.transfers.send(self.jid(request['to']), file,
+                                                        os.path.basename(request['file']),
+                                                        ALGORITHMS[algorithm] if algorithm else self.algorithm)
+            return {'ok': True, 'transfer': result}
+        elif command == 'link':
+            self.node.update_link(self.jid(request['to']), float(request['weight']))
+        elif command == 'dvr_update':
+            self.node.send_dvr_update()
+        elif command == 'stats':
+            return {'ok': True, 'stats': self.stats()}
+        elif command == 'sleep':
+            await asyncio.sleep(float(request['seconds']))
+        elif command == 'stop':
+            self.stopped.set()
+        else:
+            return {'ok': False, 'error': f"Unknown command {command}"}
+        return {'ok': True}
+
+    async def handle_line(self, line):
+        """
+        Runs one JSON line request
+        :param line: JSON text
+        :return: response dictionary
+        """
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Requests must be JSON objects")
+            return await self.handle(request)
+        except (ValueError, KeyError, TypeError, ZeroDivisionError, OSError, TransferError) as error:
+            return {'ok': False, 'error': f"{type(error).__name__}: {error}"}
+
+    async def serve_client(self, reader, writer):
+        """
+        Answers the requests of one control socket connection
+        """
+        self.clients.add(writer)
+        try:
+            while not reader.at_eof():
+                line = await reader.readline()
+                if not line.strip():
+                    continue
+                writer.write(json.dumps(await self.handle_line(line)).encode('utf-8') + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.clients.discard(writer)
+            writer.close()
+
+    async def start_control(self, address):
+        """
+        Opens the control socket
+        :param address: host:port for a TCP socket, a file path for a unix socket
+        """
+        host, _, port = address.rpartition(':')
+        if port.isdigit():
+            self.server = await asyncio.start_server(self.serve_client, host or '127.0.0.1', int(port))
+        else:
+            self.server = await asyncio.start_unix_server(self.serve_client, address)
+        log.info("Control socket listening on %s", address)
+
+    async def run_script(self, path):
+        """
+        Runs the requests of a script file, one JSON line each. Empty lines and # comments are skipped.
+        :param path: script file
+        """
+        with open(path) as script:
+            lines = script.readlines()
+        for number, line in enumerate(lines, 1):
+            if not line.strip() or line.lstrip().startswith('#'):
+                continue
+            response = await self.handle_line(line)
+            if not response['ok']:
+                print(f"{path}:{number}: {response['error']}")
+            if self.stopped.is_set():
+                return
+
+    async def session_start(self, event):
+        """
+        Starts the configured control socket, script and load generator once the node is online
+        :param event: session start
+        """
+        options = self.options
+        if options['control']:
+            await self.start_control(options['control'])
+        if options['script']:
+            await self.run_script(options['script'])
+        if options['load_to'] and options['load_rate']:
+            await self.generate_load(options['load_to'], float(options['load_rate']), int(options['load_count']),
+                                     float(options['load_duration']), int(options['load_size']))
+        if options['exit_when_done'] or not options['control']:
+            self.stopped.set()
+        await self.stopped.wait()
+        await self.shutdown()
+
+    async def shutdown(self):
+        """
+        Closes the control socket, writes the metrics one last time and logs out
+        """
+        if self.server is not None:
+            self.server.close()
+            for writer in list(self.clients):
+                writer.close()
+        # Give the outbound queues a moment to drain
+        for _ in range(100):
+            if self.node.outbound is None or self.node.outbound.idle:
+                break
+            await asyncio.sleep(0.05)
+        if self.options['metrics']:
+            metrics.REGISTRY.export(self.options['metrics'])
+        log.info("Stopping: %s", json.dumps(self.stats()))
+        self.node.stop_routing()
+        self.node.disconnect()
+
+
+def read_options(argv=None):
+    """
+    Merges the defaults, the config file and the command line flags
+    :param argv: command line arguments, sys.argv when omitted
+    :return: options dictionary
+    """
+    parser = argparse.ArgumentParser(description="Run a node without the interactive menus")
+    parser.add_argument('--config', help="JSON file with any of the options below, flags override it")
+    parser.add_argument('--jid')
+    parser.add_argument('--password')
+    parser.add_argument('--topology', help="Topology file")
+    parser.add_argument('--algorithm', choices=list(ALGORITHMS), help="Algorithm of the messages sent")
+    parser.add_argument('--metrics', help="Metrics file, Prometheus text when it ends in .prom")
+    parser.add_argument('--metrics-interval', type=float, help="Seconds between metrics exports")
+    parser.add_argument('--control', help="Control socket, host:port or unix socket path")
+    parser.add_argument('--script', help="File with one JSON request per line")
+    parser.add_argument('--load-to', nargs='+', help="Destinations of the load generator")
+    parser.add_argument('--load-rate', type=float, help="Messages per second of the load generator")
+    parser.add_argument('--load-count', type=int, help="Messages to send, 0 for no limit")
+    parser.add_argument('--load-duration', type=float, help="Seconds to send for, 0 for no limit")
+    parser.add_argument('--load-size', type=int, help="Characters per generated message")
+    parser.add_argument('--seed', type=int, help="Random seed of the load generator")
+    parser.add_argument('--exit-when-done', action='store_true', default=None,
+                        help="Log out after the script and load finish even with a control socket")
+    args = parser.parse_args(argv)
+
+    options = dict(DEFAULTS)
+    if args.config:
+        with open(args.config) as config:
+            options.update(json.load(config))
+    options.update({key: value for key, value in vars(args).items() if value is not None and key != 'config'})
+    if not options['jid'] or not options['password']:
+        parser.error("a jid and a password are required")
+    if options['algorithm'] not in ALGORITHMS:
+        parser.error(f"unknown algorithm {options['algorithm']}")
+    if constants.SERVER not in options['jid'] and '@' not in options['jid']:
+        options['jid'] += constants.SERVER
+    return options
+
+
+def main():
+    """
+    Command line entry point
+    """
+    options = read_options()
+    logging.basicConfig(level=logging.DEBUG if constants.LOGGING else logging.INFO,
+                        format='%(levelname)-8s %(message)s')
+    if options['metrics']:
+        metrics.REGISTRY.enabled = True
+
+    # Imported here so the controller can drive simulated nodes without slixmpp installed
+    from messenger_account import MessengerAccount, set_event_loop_policy
+
+    set_event_loop_policy()
+    xmpp = MessengerAccount(options['jid'], options['password'], options['topology'], interactive=False)
+    if options['metrics']:
+        xmpp.metrics_file = options['metrics']
+        xmpp.metrics_interval = options['metrics_interval']
+    controller = NodeController(xmpp, options)
+    xmpp.add_event_handler("routing_ready", controller.session_start)
+    xmpp['feature_mechanisms'].unencrypted_plain = True
+    xmpp.connect()
+    xmpp.process(forever=False)
+
+
+if __name__ == '__main__':
+    main()
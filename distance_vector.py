@@ -0,0 +1,133 @@
+# encoding: utf-8
+"""
+    distance_vector.py
+    Authors: Mario Sarmientos, Randy Venegas, Pablo Ruiz 18259 (PingMaster99)
+    Version 1.0
+    Updated October 18, 2026
+
+    Incremental distance vector routing table.
+    Received vectors are queued and applied together, and only the destinations whose cost
+    through the updating neighbor could change are evaluated again. Distances at or above the
+    maximum distance are unreachable, which ends counting to infinity after a partition.
+"""
+
+from graph import INF, is_link
+
+
+class DistanceVectorTable:
+    """
+    Distance vector state of a single node
+    """
+    def __init__(self, node, link_weights, max_distance=INF):
+        """
+        Initializes the table with the direct links of the node
+        :param node: index of the node that owns the table
+        :param link_weights: row of the adjacency matrix of the node
+        :param max_distance: distances at or above it are unreachable
+        """
+        self.node = node
+        self.max_distance = max_distance
+        self.size = len(link_weights)
+        self.link_costs = {neighbor: weight for neighbor, weight in enumerate(link_weights)
+                           if neighbor != node and is_link(weight)}
+        self.vectors = {}
+        self.pending = {}
+        self.advertised = {}
+
+        self.distances = [INF] * self.size
+        self.next_hops = [-1] * self.size
+        self.distances[node] = 0
+        self.next_hops[node] = node
+        for neighbor, weight in self.link_costs.items():
+            self.distances[neighbor] = weight
+            self.next_hops[neighbor] = neighbor
+
+    def receive(self, neighbor, entries):
+        """
+        Queues a vector received from a neighbor. Vectors from the same neighbor are merged
+        until apply_pending runs, so only the newest distances are evaluated.
+        :param neighbor: index of the neighbor that sent the vector
+        :param entries: dictionary of destination index -> distance
+        """
+        self.pending.setdefault(neighbor, {}).update(entries)
+
+    def apply_pending(self):
+        """
+        Applies every queued vector and updates the affected destinations
+        :return: set of destinations whose distance or next hop changed
+        """
+        changed = set()
+        pending, self.pending = self.pending, {}
+        for neighbor, entries in pending.items():
+            vector = self.vectors.setdefault(neighbor, {})
+            cost = self.link_costs.get(neighbor, INF)
+            for destination, distance in entries.items():
+                if destination == self.node or vector.get(destination, INF) == distance:
+                    continue
+                vector[destination] = distance
+
+                through_neighbor = cost + distance
+                if through_neighbor >= self.max_distance:
+                    through_neighbor = INF
+                if through_neighbor < self.distances[destination]:
+                    self.distances[destination] = through_neighbor
+                    self.next_hops[destination] = neighbor
+                    changed.add(destination)
+                elif self.next_hops[destination] == neighbor and through_neighbor != self.distances[destination]:
+                    # The current route got worse, another neighbor may be better now
+                    if self.evaluate(destination):
+                        changed.add(destination)
+        return changed
+
+    def evaluate(self, destination):
+        """
+        Recomputes the best route to a destination from the direct link and every neighbor vector
+        :param destination: destination index
+        :return: True if the distance or the next hop changed
+        """
+        best = self.link_costs.get(destination, INF)
+        hop = destination if best != INF else -1
+        for neighbor, cost in self.link_costs.items():
+            distance = cost + self.vectors.get(neighbor, {}).get(destination, INF)
+            if distance < best and distance < self.max_distance:
+                best = distance
+                hop = neighbor
+
+        if best == self.distances[destination] and hop == self.next_hops[destination]:
+            return False
+        self.distances[destination] = best
+        self.next_hops[destination] = hop
+        return True
+
+    def set_link_cost(self, neighbor, weight):
+        """
+        Updates the cost of a direct link and every destination that may use it
+        :param neighbor: index of the neighbor
+        :param weight: new link weight, 0 or infinite removes the link
+        :return: set of destinations whose distance or next hop changed
+        """
+        if is_link(weight):
+            self.link_costs[neighbor] = weight
+        else:
+            self.link_costs.pop(neighbor, None)
+            self.vectors.pop(neighbor, None)
+
+        affected = set(self.vectors.get(neighbor, {}))
+        affected.add(neighbor)
+        affected.update(destination for destination, hop in enumerate(self.next_hops) if hop == neighbor)
+        affected.discard(self.node)
+        return {destination for destination in affected if self.evaluate(destination)}
+
+    def triggered_update(self):
+        """
+        Entries whose distance or next hop changed since the last advertisement, marked as advertised.
+        A next hop change alone is sent too, the poisoned reverse entries of the neighbors depend on it.
+        :return: dictionary of destination index -> distance
+        """
+        entries = {}
+        for destination, distance in enumerate(self.distances):
+            route = (distance, self.next_hops[destination])
+            if self.advertised.get(destination, (INF, -1)) != route:
+                entries[destination] = distance
+                self.advertised[destination] = route
+        return entries
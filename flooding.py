@@ -0,0 +1,90 @@
+# encoding: utf-8
+"""
+    flooding.py
+    Authors: Mario Sarmientos, Randy Venegas, Pablo Ruiz 18259 (PingMaster99)
+    Version 1.0
+    Updated October 18, 2026
+
+    Duplicate suppression for flooded messages.
+    Every flooded message is identified by its (sender, sequence number) pair, and each node remembers
+    the ids it already handled in a bounded cache whose entries also expire after a while.
+"""
+
+import time
+from collections import OrderedDict
+
+
+class SeenCache:
+    """
+    Bounded, time expiring set of message ids
+    """
+    def __init__(self, capacity=4096, lifetime=60.0, clock=time.monotonic):
+        """
+        Initializes the cache
+        :param capacity: maximum number of ids remembered
+        :param lifetime: seconds an id is remembered
+        :param clock: function returning the current time in seconds
+        """
+        self.capacity = capacity
+        self.lifetime = lifetime
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.duplicates = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, message_id):
+        self.expire()
+        return message_id in self.entries
+
+    def check_and_add(self, message_id):
+        """
+        Records a message id
+        :param message_id: hashable id of the message
+        :return: True if the id had already been seen
+        """
+        now = self.expire()
+        if message_id in self.entries:
+            self.duplicates += 1
+            return True
+
+        self.entries[message_id] = now
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+        return False
+
+    def expire(self):
+        """
+        Forgets the ids older than the lifetime. Ids are stored in arrival order, so only the oldest
+        entries have to be checked.
+        :return: current time
+        """
+        now = self.clock()
+        limit = now - self.lifetime
+        entries = self.entries
+        while entries:
+            message_id, seen_at = next(iter(entries.items()))
+            if seen_at > limit:
+                break
+            del entries[message_id]
+        return now
+
+
+class SequenceCounter:
+    """
+    Sequence numbers for the messages originated by a node
+    """
+    def __init__(self, start=0):
+        """
+        Initializes the counter
+        :param start: first sequence number
+        """
+        self.value = start
+
+    def next(self):
+        """
+        :return: next 32 bit sequence number
+        """
+        self.value = (self.value + 1) & 0xFFFFFFFF
+        return self.value
@@ -0,0 +1,178 @@
+# encoding: utf-8
+"""
+    graph.py
+    Authors: Mario Sarmientos, Randy Venegas, Pablo Ruiz 18259 (PingMaster99)
+    Version 1.0
+    Updated October 18, 2026
+
+    Compressed sparse row (CSR) view of a network topology.
+    Only the links that actually exist are stored, so routing algorithms can walk the
+    neighbors of a node without reading a full adjacency matrix row.
+"""
+
+from array import array
+
+INF = float("Inf")
+
+
+def is_link(weight):
+    """
+    Checks if an adjacency matrix entry represents an existing link
+    :param weight: matrix entry
+    :return: True if the entry is a usable link weight
+    """
+    return weight != 0 and weight != INF
+
+
+class CSRGraph:
+    """
+    Directed weighted graph stored as offsets / targets / weights arrays.
+    The outgoing links of node u are targets[offsets[u]:offsets[u + 1]]
+    """
+    __slots__ = ('size', 'offsets', 'targets', 'weights', '_reverse', '__weakref__')
+
+    def __init__(self, size, offsets, targets, weights):
+        """
+        Initializes the graph from already built CSR arrays
+        :param size: number of nodes
+        :param offsets: size + 1 start positions of every node's links
+        :param targets: destination node of every link
+        :param weights: weight of every link
+        """
+        self.size = size
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self._reverse = None
+
+    @classmethod
+    def from_matrix(cls, matrix):
+        """
+        Builds the graph from a dense adjacency matrix.
+        Entries that are 0 or infinite are not links, self loops are ignored.
+        :param matrix: adjacency matrix (list of rows)
+        :return: CSRGraph
+        """
+        offsets = array('q', [0])
+        targets = array('q')
+        weights = array('d')
+        for u, row in enumerate(matrix):
+            for v, weight in enumerate(row):
+                if u != v and is_link(weight):
+                    targets.append(v)
+                    weights.append(weight)
+            offsets.append(len(targets))
+        return cls(len(matrix), offsets, targets, weights)
+
+    @classmethod
+    def from_edges(cls, size, edges):
+        """
+        Builds the graph from an iterable of (source, target, weight) links
+        :param size: number of nodes
+        :param edges: iterable of links
+        :return: CSRGraph
+        """
+        sources = array('q')
+        targets = array('q')
+        weights = array('d')
+        for u, v, weight in edges:
+            if u != v and is_link(weight):
+                sources.append(u)
+                targets.append(v)
+                weights.append(weight)
+        return cls.from_arrays(size, sources, targets, weights)
+
+    @classmethod
+    def from_arrays(cls, size, sources, targets, weights):
+        """
+        Builds the graph from parallel link arrays with a counting sort, without per node lists
+        :param size: number of nodes
+        :param sources: source node of every link
+        :param targets: destination node of every link
+        :param weights: weight of every link
+        :return: CSRGraph
+        """
+        offsets = array('q', [0]) * (size + 1)
+        for u in sources:
+            offsets[u + 1] += 1
+        for u in range(size):
+            offsets[u + 1] += offsets[u]
+
+        position = array('q', offsets[:size])
+        sorted_targets = array('q', [0]) * len(targets)
+        sorted_weights = array('d', [0.0]) * len(weights)
+        for k, u in enumerate(sources):
+            slot = position[u]
+            sorted_targets[slot] = targets[k]
+            sorted_weights[slot] = weights[k]
+            position[u] = slot + 1
+        return cls(size, offsets, sorted_targets, sorted_weights)
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def edge_count(self):
+        """
+        :return: number of stored links
+        """
+        return len(self.targets)
+
+    def neighbors(self, u):
+        """
+        Iterates over the outgoing links of a node
+        :param u: node index
+        :return: generator of (target, weight)
+        """
+        for k in range(self.offsets[u], self.offsets[u + 1]):
+            yield self.targets[k], self.weights[k]
+
+    def weight(self, u, v):
+        """
+        :return: weight of the cheapest link u -> v, infinite if there is none
+        """
+        best = INF
+        for k in range(self.offsets[u], self.offsets[u + 1]):
+            if self.targets[k] == v and self.weights[k] < best:
+                best = self.weights[k]
+        return best
+
+    def edges(self):
+        """
+        Iterates over every link of the graph
+        :return: generator of (source, target, weight)
+        """
+        for u in range(self.size):
+            for k in range(self.offsets[u], self.offsets[u + 1]):
+                yield u, self.targets[k], self.weights[k]
+
+    def reverse(self):
+        """
+        Graph with every link reversed, used by backward searches. It is built once and reused.
+        :return: CSRGraph
+        """
+        if self._reverse is None:
+            self._reverse = CSRGraph.from_edges(self.size, ((v, u, w) for u, v, w in self.edges()))
+            self._reverse._reverse = self
+        return self._reverse
+
+    def to_matrix(self):
+        """
+        Dense adjacency matrix view, only meant for small graphs. Duplicate links keep the cheapest weight.
+        :return: list of rows, missing links are infinite
+        """
+        matrix = [[INF] * self.size for _ in range(self.size)]
+        for u, v, weight in self.edges():
+            matrix[u][v] = min(matrix[u][v], weight)
+        return matrix
+
+
+def as_csr(graph):
+    """
+    Returns a CSR view of the graph, converting adjacency matrices when needed
+    :param graph: CSRGraph or adjacency matrix
+    :return: CSRGraph
+    """
+    if isinstance(graph, CSRGraph):
+        return graph
+    return CSRGraph.from_matrix(graph)
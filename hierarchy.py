@@ -0,0 +1,230 @@
+# encoding: utf-8
+"""
+    hierarchy.py
+    Authors: Mario Sarmientos, Randy Venegas, Pablo Ruiz 18259 (PingMaster99)
+    Version 1.0
+    Updated October 18, 2026
+
+    Area based hierarchical link state routing.
+    The topology is cut into areas of about AREA_SIZE nodes with a deterministic breadth first partition,
+    so every node computes the same areas. A node keeps the shortest path tree of its own area and only a
+    summarized view of the rest: the border nodes of every area, the links between areas and the
+    distances from the borders of each area to its members through the area itself.
+    The route to a destination either stays inside its area or enters it through one of its borders and
+    never leaves it again, so every hop gets strictly closer to the destination and forwarding has no loops.
+"""
+
+import weakref
+from array import array
+from collections import OrderedDict, deque
+from graph import INF, CSRGraph
+from routing_algorithms import NetworkAlgorithms
+
+# Border distance summaries keyed by the links of their area, shared by the nodes of the process
+SUMMARY_CACHE_SIZE = 4096
+summaries = OrderedDict()
+# Areas of every live topology graph by area size, dropped with their graph
+partitions = weakref.WeakKeyDictionary()
+
+
+class Areas:
+    """
+    Partition of a topology into areas
+    """
+    def __init__(self, graph, area_size):
+        """
+        Partitions a graph by growing breadth first regions over its links in both directions
+        :param graph: CSRGraph of the topology file
+        :param area_size: nodes per area
+        """
+        self.area_size = area_size
+        self.area_of = array('q', [-1]) * graph.size
+        self.position = array('q', [0]) * graph.size     # Index of every node among the members of its area
+        self.members = []
+        reverse = graph.reverse()
+        for start in range(graph.size):
+            if self.area_of[start] >= 0:
+                continue
+            area = len(self.members)
+            members = [start]
+            self.area_of[start] = area
+            queue = deque([start])
+            while queue and len(members) < area_size:
+                u = queue.popleft()
+                for side in (graph, reverse):
+                    for k in range(side.offsets[u], side.offsets[u + 1]):
+                        v = side.targets[k]
+                        if self.area_of[v] < 0 and len(members) < area_size:
+                            self.area_of[v] = area
+                            self.position[v] = len(members)
+                            members.append(v)
+                            queue.append(v)
+            self.members.append(members)
+
+    def __len__(self):
+        return len(self.members)
+
+
+def shared_areas(graph, area_size):
+    """
+    Areas of a topology, partitioned once per graph and shared by the nodes of the process
+    :param graph: CSRGraph of the topology file
+    :param area_size: nodes per area
+    :return: Areas
+    """
+    by_size = partitions.setdefault(graph, {})
+    if area_size not in by_size:
+        by_size[area_size] = Areas(graph, area_size)
+    return by_size[area_size]
+
+
+def border_summary(members, links, borders):
+    """
+    Distances from every border of an area to its members through the area itself, cached by the links
+    of the area
+    :param members: nodes of the area
+    :param links: tuple of (u, v, weight) links inside the area
+    :param borders: border nodes of the area
+    :return: one distance array per border, indexed like the members
+    """
+    key = (links, borders)
+    summary = summaries.get(key)
+    if summary is not None:
+        summaries.move_to_end(key)
+        return summary
+
+    graph = area_graph(members, links)
+    position = {node: index for index, node in enumerate(members)}
+    summary = [NetworkAlgorithms.dijkstra(graph, position[border])[0] for border in borders]
+    summaries[key] = summary
+    if len(summaries) > SUMMARY_CACHE_SIZE:
+        summaries.popitem(last=False)
+    return summary
+
+
+def area_graph(members, links):
+    """
+    :return: CSRGraph of the links inside an area, numbered like the members
+    """
+    position = {node: index for index, node in enumerate(members)}
+    return CSRGraph.from_edges(len(members), [(position[u], position[v], weight) for u, v, weight in links])
+
+
+class HierarchicalRoutes:
+    """
+    Routes of one node: its own area and the borders of every area
+    """
+    def __init__(self, areas, source):
+        """
+        Initializes the routes
+        :param areas: Areas of the topology
+        :param source: index of the node
+        """
+        self.areas = areas
+        self.source = source
+        self.area = areas.area_of[source]
+        self.version = None
+        self.local = None
+        self.borders = [()] * len(areas)
+        self.summaries = [[] for _ in range(len(areas))]
+        self.area_edges = [[] for _ in range(len(areas))]   # Edges every area adds to the view
+        self.dirty = set(range(len(areas)))
+        self.border_distances = {}
+        self.border_hops = {}
+
+    def invalidate(self, changes):
+        """
+        Marks the areas at both ends of changed links, only those are summarized again by compute
+        :param changes: (origin, neighbor, weight) link changes from the link state database
+        """
+        area_of = self.areas.area_of
+        for u, v, _ in changes:
+            for node in (u, v):
+                if 0 <= node < len(area_of):
+                    self.dirty.add(area_of[node])
+
+    def compute(self, graph, version):
+        """
+        Rebuilds the routes over the summarized view of a topology. Only the areas marked by invalidate
+        are summarized again, the others keep their borders, summaries and edges.
+        :param graph: CSRGraph of the current topology
+        :param version: topology version of the graph
+        """
+        area_of = self.areas.area_of
+        offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+        reverse = graph.reverse()
+        for area in sorted(self.dirty):
+            members = self.areas.members[area]
+            links = []
+            edges = []
+            borders = set()
+            for u in members:
+                for k in range(offsets[u], offsets[u + 1]):
+                    v = targets[k]
+                    if area_of[v] == area:
+                        links.append((u, v, weights[k]))
+                    else:   # Links between areas are part of every view
+                        edges.append((u, v, weights[k]))
+                        borders.add(u)
+                for k in range(reverse.offsets[u], reverse.offsets[u + 1]):
+                    if area_of[reverse.targets[k]] != area:
+                        borders.add(u)
+            borders = tuple(sorted(borders))
+            links = tuple(links)
+            summary = border_summary(members, links, borders)
+            self.borders[area] = borders
+            self.summaries[area] = summary
+            if area == self.area:
+                edges.extend(links)
+                self.local = NetworkAlgorithms.shortest_paths(area_graph(members, links), members.index(self.source))
+            else:
+                position = {node: index for index, node in enumerate(members)}
+                for border, distances in zip(borders, summary):
+                    edges.extend((border, other, distances[position[other]]) for other in borders if other != border)
+            self.area_edges[area] = edges
+        self.dirty.clear()
+
+        # The view only holds the own area and the borders, renumbered so its arrays stay small
+        view_nodes = sorted(set(self.areas.members[self.area]).union(*self.borders))
+        position = {node: index for index, node in enumerate(view_nodes)}
+        view = CSRGraph.from_edges(len(view_nodes), [(position[u], position[v], weight)
+                                                     for edges in self.area_edges for u, v, weight in edges
+                                                     if u in position and v in position])
+        result = NetworkAlgorithms.shortest_paths(view, position[self.source])
+        hops = result.next_hops
+
+        # Summary links only join borders of other areas, the first link of a path is always a real one
+        self.border_distances = {}
+        self.border_hops = {}
+        for borders in self.borders:
+            for border in borders:
+                index = position[border]
+                if hops[index] >= 0 and border != self.source:
+                    self.border_distances[border] = result.distances[index]
+                    self.border_hops[border] = view_nodes[hops[index]]
+        self.version = version
+
+    def route(self, destination):
+        """
+        Next hop and distance of a destination, the route either stays inside the area of the destination
+        or goes to the border of that area with the shortest distance left
+        :param destination: destination node index
+        :return: next hop index, -1 if the destination is unreachable, and distance
+        """
+        area = self.areas.area_of[destination]
+        index = self.areas.position[destination]
+        hop, best = -1, INF
+        if area == self.area and self.local.next_hops[index] >= 0:
+            hop = self.areas.members[area][self.local.next_hops[index]]
+            best = self.local.distances[index]
+        for border, distances in zip(self.borders[area], self.summaries[area]):
+            if border in self.border_distances and self.border_distances[border] + distances[index] < best:
+                best = self.border_distances[border] + distances[index]
+                hop = self.border_hops[border]
+        return hop, best
+
+    def size(self):
+        """
+        :return: number of routes held by the node
+        """
+        return len(self.local) + len(self.border_hops)
@@ -0,0 +1,182 @@
+# encoding: utf-8
+"""
+    link_monitor.py
+    Authors: Mario Sarmientos, Randy Venegas, Pablo Ruiz 18259 (PingMaster99)
+    Version 1.0
+    Updated October 18, 2026
+
+    Adaptive link weights.
+    Every neighbor of the topology file is probed concurrently at a fixed interval and an exponentially
+    weighted moving average of its round trip time and loss is kept. The link weight follows the smoothed
+    round trip time, inflated by the loss, but a new weight is only advertised when it differs enough from
+    the advertised one and the link has not changed during its hold down time. A link whose loss crosses
+    the limit goes down at once, it only comes back after the hold down, so a flapping link stays down.
+    The weights that change in one probe round are advertised together.
+"""
+
+import asyncio
+import logging
+import time
+from graph import INF, is_link
+
+log = logging.getLogger(__name__)
+
+
+class LinkEstimate:
+    """
+    Smoothed measurements of one link
+    """
+    def __init__(self, weight):
+        """
+        Initializes the estimate
+        :param weight: weight of the link in the topology file
+        """
+        self.rtt = None
+        self.loss = 0.0
+        self.weight = weight
+        self.changed_at = -INF
+        self.probes = 0
+        self.lost = 0
+
+    def observe(self, rtt, alpha):
+        """
+        Adds the result of one probe to the moving averages
+        :param rtt: round trip time in seconds, None if the probe was lost
+        :param alpha: weight of the new sample
+        """
+        self.probes += 1
+        if rtt is None:
+            self.lost += 1
+            self.loss += alpha * (1.0 - self.loss)
+            return
+        self.loss -= alpha * self.loss
+        self.rtt = rtt if self.rtt is None else self.rtt + alpha * (rtt - self.rtt)
+
+    def cost(self, unit, loss_limit):
+        """
+        Link weight of the current averages
+        :param unit: seconds of round trip time per unit of weight
+        :param loss_limit: smoothed loss above which the link is down
+        :return: weight, at least 1, infinite when the link is down
+        """
+        if self.loss > loss_limit:
+            return INF
+        if self.rtt is None:
+            return self.weight
+        return max(1, round(self.rtt / (unit * (1.0 - self.loss))))
+
+
+class LinkMonitor:
+    """
+    Probes the links of a node and changes their weights when the measurements move
+    """
+    def __init__(self, node, probe, interval=10.0, timeout=2.0, alpha=0.25, unit=0.01, threshold=0.25,
+                 hold_down=30.0, loss_limit=0.5, clock=time.monotonic):
+        """
+        Initializes the monitor
+        :param node: RoutingNode whose links are measured
+        :param probe: coroutine function(jid, timeout) returning the round trip time or None if it was lost
+        :param interval: seconds between probe rounds
+        :param timeout: seconds before a probe counts as lost
+        :param alpha: weight of a new sample in the moving averages
+        :param unit: seconds of round trip time per unit of weight
+        :param threshold: relative weight change needed before a new weight is advertised
+        :param hold_down: seconds after a weight change before the link changes again, going down is immediate
+        :param loss_limit: smoothed loss above which the link is down
+        :param clock: time source
+        """
+        self.node = node
+        self.probe = probe
+        self.interval = interval
+        self.timeout = timeout
+        self.alpha = alpha
+        self.unit = unit
+        self.threshold = threshold
+        self.hold_down = hold_down
+        self.loss_limit = loss_limit
+        self.clock = clock
+        # Links of the topology file, still probed while they are down so they can come back
+        self.links = {node.nodes[neighbor]: LinkEstimate(weight)
+                      for neighbor, weight in enumerate(node.adjacent_node_weights)
+                      if neighbor != node.node_number and is_link(weight)}
+        self.task = None
+        self.rounds = 0
+        self.changes = 0
+
+    def start(self):
+        """
+        Starts probing in the background
+        """
+        if self.task is None and self.links:
+            self.task = self.node.loop.create_task(self.run())
+
+    async def run(self):
+        """
+        Probe rounds until the monitor is closed
+        """
+        while True:
+            await self.probe_round()
+            await asyncio.sleep(self.interval)
+
+    async def probe_round(self):
+        """
+        Probes every link at the same time and advertises the weights that changed
+        """
+        jids = list(self.links)
+        results = await asyncio.gather(*(self.measure(jid) for jid in jids))
+        for jid, rtt in zip(jids, results):
+            self.links[jid].observe(rtt, self.alpha)
+        self.rounds += 1
+        changes = self.evaluate()
+        if changes:
+            self.changes += len(changes)
+            log.info("Link weights changed: %s", changes)
+            self.node.update_links(changes)
+
+    async def measure(self, jid):
+        """
+        :return: round trip time to a neighbor in seconds, None if the probe was lost
+        """
+        try:
+            return await asyncio.wait_for(self.probe(jid, self.timeout), self.timeout)
+        except (asyncio.TimeoutError, OSError):
+            return None
+
+    def evaluate(self):
+        """
+        Applies the hysteresis and hold down rules to the current averages
+        :return: dictionary of neighbor jid -> new weight
+        """
+        now = self.clock()
+        changes = {}
+        for jid, link in self.links.items():
+            weight = link.cost(self.unit, self.loss_limit)
+            advertised = self.node.adjacent_node_weights[self.node.codec.node_indexes[jid]]
+            if not is_link(advertised):
+                advertised = INF
+            if weight == advertised:
+                continue
+            if weight != INF:
+                if now - link.changed_at < self.hold_down:
+                    continue
+                if advertised != INF and abs(weight - advertised) < self.threshold * advertised:
+                    continue
+            changes[jid] = weight
+            link.changed_at = now
+        return changes
+
+    def stats(self):
+        """
+        :return: dictionary of neighbor jid -> smoothed measurements and advertised weight
+        """
+        return {jid: {'rtt': link.rtt, 'loss': link.loss, 'probes': link.probes, 'lost': link.lost,
+                      'weight': self.node.adjacent_node_weights[self.node.codec.node_indexes[jid]]}
+                for jid, link in self.links.items()}
+
+    def close(self):
+        """
+        Stops probing
+        """
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
@@ -0,0 +1,176 @@
+# encoding: utf-8
+"""
+    link_state.py
+    Authors: Mario Sarmientos, Randy Venegas, Pablo Ruiz 18259 (PingMaster99)
+    Version 1.0
+    Updated October 18, 2026
+
+    Link state database.
+    Every node originates a sequence numbered advertisement (LSA) with the weights of its own links.
+    The database keeps the newest advertisement of every origin on top of the topology file, ages them
+    out when their origin stops refreshing them, and builds the graph the shortest path first (SPF)
+    computation runs on. SpfThrottle spaces SPF runs with an exponential backoff during churn.
+"""
+
+import time
+from graph import INF, CSRGraph, is_link
+
+
+def newer(sequence, other):
+    """
+    32 bit serial number comparison, so sequence numbers can wrap around
+    :return: True if sequence is newer than other
+    """
+    return 0 < (sequence - other) & 0xFFFFFFFF < 0x80000000
+
+
+class LinkStateAdvertisement:
+    """
+    Links of one node as advertised by that node
+    """
+    __slots__ = ('origin', 'sequence', 'links', 'installed')
+
+    def __init__(self, origin, sequence, links, installed):
+        """
+        Initializes the advertisement
+        :param origin: index of the node that originated it
+        :param sequence: sequence number at the origin
+        :param links: dictionary of neighbor index -> weight
+        :param installed: time the advertisement was installed in the database
+        """
+        self.origin = origin
+        self.sequence = sequence
+        self.links = links
+        self.installed = installed
+
+
+class LinkStateDatabase:
+    """
+    Newest advertisement of every origin over the topology loaded from the topology file
+    """
+    def __init__(self, base_graph, max_age=3600.0, clock=time.monotonic):
+        """
+        Initializes the database
+        :param base_graph: CSRGraph of the topology file, used for nodes that have not advertised yet
+        :param max_age: seconds an advertisement lives without being refreshed by its origin
+        :param clock: function returning the current time in seconds
+        """
+        self.base_graph = base_graph
+        self.max_age = max_age
+        self.clock = clock
+        self.advertisements = {}
+        self.changes = []
+
+    def __len__(self):
+        return len(self.advertisements)
+
+    def get(self, origin):
+        """
+        :return: advertisement of an origin or None
+        """
+        return self.advertisements.get(origin)
+
+    def install(self, origin, sequence, links):
+        """
+        Stores an advertisement if it is newer than the one in the database
+        :param origin: index of the node that originated it
+        :param sequence: sequence number at the origin
+        :param links: dictionary of neighbor index -> weight
+        :return: True if the advertisement was installed
+        """
+        current = self.advertisements.get(origin)
+        if current is not None and not newer(sequence, current.sequence):
+            return False
+        links = {neighbor: weight for neighbor, weight in links.items() if neighbor != origin and is_link(weight)}
+        if current is not None:
+            previous = current.links
+        else:   # The topology file may list a link more than once, routing uses the cheapest
+            previous = {}
+            for neighbor, weight in (self.base_graph.neighbors(origin) if origin < self.base_graph.size else ()):
+                previous[neighbor] = min(weight, previous.get(neighbor, INF))
+        for neighbor in previous.keys() | links.keys():
+            weight = links.get(neighbor, INF)
+            if previous.get(neighbor, INF) != weight:
+                self.changes.append((origin, neighbor, weight))
+        self.advertisements[origin] = LinkStateAdvertisement(origin, sequence, links, self.clock())
+        return True
+
+    def expire(self, keep=None):
+        """
+        Withdraws the links of advertisements older than max_age. Their sequence number is kept so
+        delayed copies of them are not installed again.
+        :param keep: origin that never expires, the node's own advertisement
+        :return: list of origins whose links were withdrawn
+        """
+        limit = self.clock() - self.max_age
+        expired = []
+        for origin, advertisement in self.advertisements.items():
+            if origin != keep and advertisement.links and advertisement.installed <= limit:
+                self.changes.extend((origin, neighbor, INF) for neighbor in advertisement.links)
+                advertisement.links = {}
+                expired.append(origin)
+        return expired
+
+    def take_changes(self):
+        """
+        Link changes since the last call, in the order they were installed
+        :return: list of (origin, neighbor, weight) with an infinite weight for removed links
+        """
+        changes, self.changes = self.changes, []
+        return changes
+
+    def graph(self):
+        """
+        Builds the graph of the network: advertised links replace the topology file links of their origin
+        :return: CSRGraph
+        """
+        base = self.base_graph
+        edges = []
+        for u in range(base.size):
+            advertisement = self.advertisements.get(u)
+            if advertisement is None:
+                edges.extend((u, v, weight) for v, weight in base.neighbors(u))
+            else:
+                edges.extend((u, v, weight) for v, weight in advertisement.links.items() if v < base.size)
+        return CSRGraph.from_edges(base.size, edges)
+
+
+class SpfThrottle:
+    """
+    Exponential backoff between SPF runs. The first run after a quiet period waits initial seconds,
+    every run inside the hold time of the previous one doubles the hold up to maximum.
+    """
+    def __init__(self, initial=0.05, hold=0.2, maximum=5.0, clock=time.monotonic):
+        """
+        Initializes the throttle
+        :param initial: delay of the first SPF after a quiet period
+        :param hold: minimum seconds between two SPF runs, doubled on every run during churn
+        :param maximum: biggest hold time
+        :param clock: function returning the current time in seconds
+        """
+        self.initial = initial
+        self.initial_hold = hold
+        self.hold = hold
+        self.maximum = maximum
+        self.clock = clock
+        self.last_run = None
+        self.runs = 0
+
+    def delay(self):
+        """
+        Seconds to wait before the next SPF run
+        """
+        now = self.clock()
+        if self.last_run is None or now - self.last_run >= self.hold:
+            self.hold = self.initial_hold
+            return self.initial
+        delay = max(self.initial, self.last_run + self.hold - now)
+        self.hold = min(self.hold * 2, self.maximum)
+        return delay
+
+    def ran(self):
+        """
+        Records an SPF run
+        """
+        self.last_run = self.clock()
+        self.runs += 1
@@ -7,7 +7,7 @@
     Main file to run the XMPP client
 """
 
-from messenger_account import MessengerAccount
+from messenger_account import MessengerAccount, set_event_loop_policy
 import logging
 import constants
 from registration import Registration
@@ -21,6 +21,7 @@ def main():
     """
     Main loop for the program functionality
     """
+    set_event_loop_policy()
     running = True
     while running:
         option = input(constants.APP_MENU)
@@ -54,7 +55,6 @@ def main():
 
             xmpp = MessengerAccount(jid, password)
             xmpp['feature_mechanisms'].unencrypted_plain = True
-            xmpp.register_plugin('xep_0199')
             xmpp.connect()
             print("Connected!")
             xmpp.process(forever=False)
@@ -0,0 +1,326 @@
+# encoding: utf-8
+"""
+    message_codec.py
+    Authors: Mario Sarmientos, Randy Venegas, Pablo Ruiz 18259 (PingMaster99)
+    Version 1.0
+    Updated October 18, 2026
+
+    Wire format of routed messages.
+    Messages are packed as a binary envelope (node indexes instead of jids) wrapped in base64 for the
+    XMPP body. The original '/$/' text format is still supported as a compatibility mode.
+"""
+
+import ast
+import base64
+import struct
+import constants
+from graph import INF
+
+DVR = 1
+FLOODING = 2
+LINK_STATE = 3
+DVR_UPDATE = 4
+LSA = 5
+ALGORITHM_NAMES = {DVR: 'dvr', FLOODING: 'flooding', LINK_STATE: 'link_state', DVR_UPDATE: 'dvr_update',
+                   LSA: 'lsa'}
+
+# Payload kinds, routed the same way but handled differently at the destination
+MESSAGE = 0
+CHUNK = 1
+CHUNK_ACK = 2
+
+CODEC_VERSION = 4
+MAGIC = b'NR'
+TEXT_SEPARATOR = '/$/'
+TEXT_PREFIX = 'Sender' + TEXT_SEPARATOR
+
+# magic, version, algorithm, ttl, sender, sequence, destination, distance, timestamp, kind, visited count,
+# path count
+HEADER = struct.Struct('!2sBBBIIIddBHH')
+# Leading header fields that identify a message, enough base64 characters are decoded to read them
+MESSAGE_ID = struct.Struct('!2sBBBII')
+MESSAGE_ID_CHARS = 4 * -(-MESSAGE_ID.size // 3)
+NODE = struct.Struct('!I')
+VECTOR_ENTRY = struct.Struct('!Id')
+
+
+class CodecError(ValueError):
+    """
+    Raised when a message body cannot be decoded
+    """
+
+
+class Envelope:
+    """
+    Routed message. Nodes are stored as indexes of the topology node list.
+    """
+    def __init__(self, sender, destination, algorithm, payload=b'', distance=INF, visited=None, path=None,
+                 sequence=0, ttl=0, timestamp=0.0, kind=MESSAGE):
+        """
+        Initializes the envelope
+        :param sender: index of the sender node
+        :param destination: index of the destination node
+        :param algorithm: DVR, FLOODING, LINK_STATE, DVR_UPDATE or LSA
+        :param payload: message content as bytes
+        :param distance: distance of the route, infinite when unknown
+        :param visited: indexes of the nodes the message went through
+        :param path: indexes of the nodes the message still has to go through
+        :param sequence: sequence number of the message at its sender
+        :param ttl: hops the message can still travel when flooded or forwarded on its destination alone
+        :param timestamp: time.time() when the message was sent by its origin, 0 when unknown
+        :param kind: MESSAGE, or CHUNK and CHUNK_ACK for streamed transfers
+        """
+        self.sender = sender
+        self.destination = destination
+        self.algorithm = algorithm
+        self.payload = payload
+        self.distance = distance
+        self.visited = visited if visited is not None else []
+        self.path = path if path is not None else []
+        self.sequence = sequence
+        self.ttl = ttl
+        self.timestamp = timestamp
+        self.kind = kind
+        self.binary = True
+
+    @property
+    def message_id(self):
+        """
+        :return: (sender, sequence) pair that identifies the message
+        """
+        return self.sender, self.sequence
+
+    @property
+    def text(self):
+        """
+        :return: payload decoded as text
+        """
+        return bytes(self.payload).decode('utf-8')
+
+
+def pack_header(envelope):
+    """
+    Packs everything but the payload of an envelope
+    :param envelope: envelope to pack
+    :return: bytes
+    """
+    distance = -1.0 if envelope.distance == INF else envelope.distance
+    parts = [HEADER.pack(MAGIC, CODEC_VERSION, envelope.algorithm, envelope.ttl, envelope.sender,
+                         envelope.sequence, envelope.destination, distance, envelope.timestamp, envelope.kind,
+                         len(envelope.visited), len(envelope.path))]
+    parts.extend(NODE.pack(node) for node in envelope.visited)
+    parts.extend(NODE.pack(node) for node in envelope.path)
+    return b''.join(parts)
+
+
+def unpack_header(data):
+    """
+    Reads the header of a packed message without touching the payload
+    :param data: packed message
+    :return: envelope whose payload is a memoryview over data
+    """
+    data = memoryview(data)
+    if len(data) < HEADER.size:
+        raise CodecError("Message is shorter than the header")
+    magic, version, algorithm, ttl, sender, sequence, destination, distance, timestamp, kind, visited_count, \
+        path_count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != CODEC_VERSION:
+        raise CodecError(f"Unknown message format {bytes(magic)!r} version {version}")
+
+    offset = HEADER.size
+    end = offset + NODE.size * (visited_count + path_count)
+    if len(data) < end:
+        raise CodecError("Message is shorter than its node lists")
+    nodes = [node for (node,) in struct.iter_unpack('!I', data[offset:end])]
+    offset = end
+    return Envelope(sender, destination, algorithm, payload=data[offset:],
+                    distance=INF if distance < 0 else distance,
+                    visited=nodes[:visited_count], path=nodes[visited_count:], sequence=sequence, ttl=ttl,
+                    timestamp=timestamp, kind=kind)
+
+
+def default_ttl(algorithm):
+    """
+    :return: hops a message of an algorithm can travel when its sender did not set a TTL
+    """
+    ttls = {FLOODING: constants.FLOOD_TTL, DVR: constants.DVR_TTL, LINK_STATE: constants.LINK_STATE_TTL}
+    return ttls.get(algorithm, 0)
+
+
+def peek_message_id(body):
+    """
+    Reads the algorithm and message id of a binary message body by decoding only its first characters
+    :param body: message body
+    :return: (algorithm, sender, sequence) or None if the body is not a binary message
+    """
+    try:
+        magic, version, algorithm, _, sender, sequence = \
+            MESSAGE_ID.unpack(base64.b64decode(body[:MESSAGE_ID_CHARS])[:MESSAGE_ID.size])
+    except (ValueError, struct.error):
+        return None
+    if magic != MAGIC or version != CODEC_VERSION:
+        return None
+    return algorithm, sender, sequence
+
+
+def pack(envelope):
+    """
+    Packs an envelope
+    :param envelope: envelope to pack
+    :return: bytes
+    """
+    return pack_header(envelope) + bytes(envelope.payload)
+
+
+def pack_vector(entries):
+    """
+    Packs distance vector entries, unreachable distances are sent as -1
+    :param entries: dictionary of destination index -> distance
+    :return: bytes
+    """
+    return b''.join(VECTOR_ENTRY.pack(destination, -1.0 if distance == INF else distance)
+                    for destination, distance in entries.items())
+
+
+def unpack_vector(data):
+    """
+    Reads packed distance vector entries
+    :param data: packed entries
+    :return: dictionary of destination index -> distance
+    """
+    if len(data) % VECTOR_ENTRY.size:
+        raise CodecError("Distance vector is not a whole number of entries")
+    return {destination: (INF if distance < 0 else distance)
+            for destination, distance in VECTOR_ENTRY.iter_unpack(data)}
+
+
+class MessageCodec:
+    """
+    Converts envelopes to XMPP message bodies and back
+    """
+    def __init__(self, nodes, mode='binary'):
+        """
+        Initializes the codec
+        :param nodes: topology node jids, their indexes are the node ids on the wire
+        :param mode: 'binary' or 'text' (original '/$/' format)
+        """
+        self.nodes = nodes
+        self.node_indexes = {node: index for index, node in enumerate(nodes)}
+        self.mode = mode
+
+    def encode(self, envelope):
+        """
+        Builds the message body of an envelope
+        :param envelope: envelope to send
+        :return: message body
+        """
+        if self.mode == 'text':
+            return self.encode_text(envelope)
+        return base64.b64encode(pack(envelope)).decode('ascii')
+
+    def decode(self, body):
+        """
+        Reads a message body in either format. Only the header of binary messages is parsed,
+        the payload is kept as bytes so forwarding nodes can re-encode it untouched.
+        :param body: message body
+        :return: Envelope
+        """
+        if body.startswith(TEXT_PREFIX):
+            return self.decode_text(body)
+        try:
+            data = base64.b64decode(body, validate=True)
+        except ValueError as error:
+            raise CodecError("Message body is not base64") from error
+        return unpack_header(data)
+
+    def encode_vector(self, entries):
+        """
+        Distance vector payload for the current mode
+        :param entries: dictionary of destination index -> distance
+        :return: bytes
+        """
+        if self.mode == 'text':
+            return str({destination: (None if distance == INF else distance)
+                        for destination, distance in entries.items()}).encode('utf-8')
+        return pack_vector(entries)
+
+    @staticmethod
+    def decode_vector(envelope):
+        """
+        Reads the distance vector carried by an envelope
+        :param envelope: DVR envelope
+        :return: dictionary of destination index -> distance
+        """
+        if envelope.binary:
+            return unpack_vector(envelope.payload)
+
+        try:
+            vector = ast.literal_eval(envelope.text.replace('inf', 'None'))
+            if isinstance(vector, (list, tuple)):
+                vector = dict(enumerate(vector))
+            return {int(destination): (INF if distance is None else float(distance))
+                    for destination, distance in vector.items()}
+        except (ValueError, TypeError, SyntaxError, AttributeError) as error:
+            raise CodecError(f"Invalid distance vector: {error}") from error
+
+    def encode_text(self, envelope):
+        """
+        Builds a message body in the original '/$/' format
+        :param envelope: envelope to send
+        :return: message body
+        """
+        if envelope.kind != MESSAGE:
+            raise CodecError("Streamed transfers need the binary message format")
+        distance = 'N.A' if envelope.distance == INF else envelope.distance
+        return f"Sender/$/{self.nodes[envelope.sender]}/$/Destinatary/$/{self.nodes[envelope.destination]}" \
+               f"/$/Traversed nodes/$/{envelope.visited}/$/Distance/$/{distance}/$/Path/$/" \
+               f"{envelope.path}/$/Id/$/{envelope.sequence}:{envelope.ttl}:{envelope.timestamp}/$/Message/$/{envelope.text}" \
+               f"/$/{envelope.algorithm}"
+
+    def decode_text(self, body):
+        """
+        Reads a message body in the original '/$/' format
+        1 sender jid \\ 3 Destinatary jid \\ 5 visited nodes \\ 7 distance \\ 9 path
+        \\ 11 sequence:ttl:timestamp (node list in older messages) \\ 13 message \\ 14 algorithm
+        Older messages have no TTL, they get the full TTL of their algorithm.
+        :param body: message body
+        :return: Envelope
+        """
+        message_data = body.split(TEXT_SEPARATOR)
+        if len(message_data) < 15:
+            raise CodecError("Message does not have every field of the text format")
+        try:
+            visited = ast.literal_eval(message_data[5])
+            path = ast.literal_eval(message_data[9])
+        except (ValueError, SyntaxError):
+            visited, path = [], []
+        try:
+            distance = float(message_data[7])
+        except ValueError:      # 'N.A'
+            distance = INF
+        sequence, _, ttl = message_data[11].partition(':')
+        ttl, _, timestamp = ttl.partition(':')
+
+        # The message may contain the separator, everything between nodes and algorithm is payload
+        try:
+            envelope = Envelope(self.node_indexes[message_data[1]], self.node_indexes[message_data[3]],
+                                int(message_data[-1]),
+                                payload=TEXT_SEPARATOR.join(message_data[13:-1]).encode('utf-8'),
+                                distance=distance,
+                                visited=[self.index(node) for node in visited] if isinstance(visited, list) else [],
+                                path=[self.index(node) for node in path] if isinstance(path, list) else [],
+                                sequence=int(sequence) if sequence.isdigit() else 0,
+                                ttl=int(ttl) if ttl.isdigit() else default_ttl(int(message_data[-1])),
+                                timestamp=float(timestamp) if timestamp else 0.0)
+        except (KeyError, ValueError) as error:
+            raise CodecError(f"Invalid text message: {error}") from error
+        envelope.binary = False
+        return envelope
+
+    def index(self, node):
+        """
+        Node index of a jid or index
+        :param node: jid or index
+        :return: index
+        """
+        return node if isinstance(node, int) else self.node_indexes[node]
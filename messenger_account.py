@@ -9,36 +9,55 @@
     Base reference for slixmpp implementations: https://lab.louiz.org/poezio/slixmpp/-/tree/master/examples
 """
 
-import ast
 import asyncio
+import logging
+import os
+import sys
+import time
 import constants
+import metrics
 from aioconsole import ainput
 from slixmpp import ClientXMPP, exceptions
+from message_codec import CodecError
 from topology_reader import TopologyReader
-from routing_algorithms import NetworkAlgorithms
+from routing_node import RoutingNode
+from transfer import TransferError
 
-asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+log = logging.getLogger(__name__)
+MUC_INVITE = '{http://jabber.org/protocol/muc#user}x/{http://jabber.org/protocol/muc#user}invite'
 
 
-class MessengerAccount(ClientXMPP):
+def set_event_loop_policy():
+    """
+    slixmpp and aioconsole need a selector loop, which Windows only uses when asked for it.
+    Other platforms keep their default loop.
+    """
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+
+class MessengerAccount(ClientXMPP, RoutingNode):
     """
     Client that uses the XMPP protocol to communicate
     """
-    def __init__(self, jid, password):
+    def __init__(self, jid, password, topology_file='./topology.txt', interactive=True):
         """
         Initializes the client
         :param jid: jid of the user
         :param password: password to log in
+        :param topology_file: topology file path
+        :param interactive: show the menus once the session starts
         """
+        self.created = time.perf_counter()
         super().__init__(jid, password)
-        self.register_plugin('xep_0030')  # Service Discovery
-        self.register_plugin('xep_0199')  # XMPP Ping
-        self.register_plugin('xep_0059')  # Result set management
-        self.register_plugin('xep_0060')  # Publish-subscribe
-        self.register_plugin('xep_0077')  # In-Band Registration
-        self.register_plugin('xep_0045')  # Multi-User Chat
+        # Plugins are registered by feature() when first needed, the topology by ensure_routing()
+        self.loaded_plugins = set()     # Not features, ClientXMPP keeps the stream features there
+        self.topology_file = topology_file
+        self.routing_ready = False
+        self.startup = {}
         self.add_event_handler("session_start", self.session_start)
-        self.add_event_handler("session_start", self.messaging_app)
+        if interactive:
+            self.add_event_handler("routing_ready", self.messaging_app)
         self.add_event_handler("failed_auth", self.failed_auth)
         self.add_event_handler("message", self.get_notification)
         self.add_event_handler("changed_status", self.wait_for_presences)
@@ -46,90 +65,45 @@ class MessengerAccount(ClientXMPP):
         self.add_event_handler("groupchat_invite", self.group_chat_invite)
         self.received = set()
         self.presences_received = asyncio.Event()
+        self.metrics_file = constants.METRICS_FILE
+        self.metrics_interval = constants.METRICS_INTERVAL
 
-        topology_reader = TopologyReader()
-        self.nodes = topology_reader.nodes
-        self.matrix = topology_reader.adjacency_matrix
-        self.node_number = self.nodes.index(self.jid)
-        self.adjacent_node_weights = self.matrix[self.node_number]
-        self.adjacent_names = []
-        self.dvr_matrix = []
-        self.dvr_min_distances = []
-
-        for i in range(len(self.nodes)):
-            self.dvr_matrix.append([0] * len(self.nodes))
-
-        self.dvr_matrix[self.node_number] = self.adjacent_node_weights
-
-        node_index = 0
-        for node in self.adjacent_node_weights:
-            if node < float('inf') and node != 0:
-                self.adjacent_names.append(self.nodes[node_index])
-                node_index += 1
-
-        print()
-
+    def feature(self, name):
+        """
+        Registers a plugin the first time its feature is used
+        :param name: plugin name, e.g. 'xep_0199'
+        :return: the plugin
+        """
+        if name not in self.loaded_plugins:
+            self.register_plugin(name)
+            self.loaded_plugins.add(name)
+        return self[name]
 
-        self.routing_algorithm = NetworkAlgorithms()
+    def ensure_routing(self):
+        """
+        Reads the topology and sets up the routing state the first time routing is needed
+        """
+        if self.routing_ready:
+            return
+        start = time.perf_counter()
+        self.setup_routing(self.jid, TopologyReader(self.topology_file))
+        self.routing_ready = True
+        self.startup['routing_setup'] = time.perf_counter() - start
 
     def get_notification(self, event):
         """
         Prints a notification according to the event received
         :param event: event received
         """
-        print(event['type'])
-        if event['type'] in ('chat', 'normal'):
-            message_data = event['body'].split('/$/')
-            # 1 sender jid \ 3 Destinatary jid \ 5 visited nodes(convert to list) \ 7 distance
-            # \ 9 path (convert to list) \ 11 nodes \ 13 message \ 14 algorithm
-
-            if message_data[3] == self.jid:
-                print(f"Message received from {message_data[1]}: {message_data[13]}")
-
-            elif message_data[14] == 1:     # DVR
-                routing = NetworkAlgorithms()
-                self.dvr_matrix[self.nodes.index(message_data[1])] = ast.literal_eval(message_data[13])
-                current_min_distances = routing.bellman_ford(self.dvr_matrix, self.node_number)
-                if current_min_distances != self.dvr_min_distances:
-                    self.dvr_min_distances = current_min_distances
-                    print(f"The new minimum distances are:\n{self.dvr_min_distances}")
-
-            elif message_data[14] == 2:                                 # Flooding
-                message_data[5] = ast.literal_eval(message_data[5])     # visited nodes
-                message_data[9] = ast.literal_eval(message_data[9])     # path
-                not_sent_to = [x for x in self.adjacent_names not in message_data[5]]
-
-                if len(not_sent_to) > 0 and message_data[3] in message_data[9]:
-                    message_data[9] = [x for x in message_data[9] not in self.adjacent_names]
-                    message_data[9] = str(message_data[9])
-
-                    for node in not_sent_to:
-                        message_data[5].append(node)
-                    message_data[5] = str(message_data[5])
-                    message = '/$/'.join(message_data)
-
-                    for node in not_sent_to:
-                        self.send_message(node, message, mtype='chat')
-                        print(f"Flooding message to {node}")
+        if event['type'] == 'normal' and event.xml.find(MUC_INVITE) is not None:
+            # Multi-User Chat is loaded by the first invite, it reports the next ones as groupchat_invite
+            if 'xep_0045' not in self.loaded_plugins:
+                self.feature('xep_0045')
+                self.group_chat_invite(event)
 
-                message_data[9] = ast.literal_eval(message_data[9])
-
-            elif message_data[14] == 3:                                 # link state routing
-                print(f"Message in transit received")
-                message_data[5] = ast.literal_eval(message_data[5])     # visited_nodes
-                message_data[9] = ast.literal_eval(message_data[9])     # path
-                message_destinatary_index = message_data[9].pop(0)
-                message_data[5].append(message_destinatary_index)
-                message_destinatary = self.nodes[message_destinatary_index]
-
-                message_data[5] = str(message_data[5])
-                message_data[9] = str(message_data[9])
-
-                message = '/$/'.join(message_data)
-
-                self.send_message(message_destinatary, message, mtype='chat')
-
-                print(f"Forwarding message to node {message_destinatary}")
+        elif event['type'] in ('chat', 'normal'):
+            self.ensure_routing()
+            self.receive_routed_message(event['body'], event['from'].bare)
 
         elif event['type'] == 'groupchat':
             print(f"New message from group {event['from']}: {event['body']}")
@@ -150,15 +124,44 @@ class MessengerAccount(ClientXMPP):
 
     async def session_start(self, event):
         """
-        Starts the session
+        Starts the session, routing_ready is triggered once the node is online and its routing state is set up
         :param event: start
         """
+        self.startup['connected'] = time.perf_counter() - self.created
         try:
             await self.get_roster()
         except exceptions.IqTimeout:
             print("Request timed out")
 
         self.send_presence()
+        self.feature('xep_0199')    # XMPP Ping, answers the link probes of the neighbors
+        self.startup['online'] = time.perf_counter() - self.created
+        # The topology is read once the node is online, unless a routed message needed it earlier
+        self.ensure_routing()
+        log.info("Startup: connected in %.3f s, routing set up in %.3f s, online in %.3f s",
+                 self.startup['connected'], self.startup['routing_setup'], self.startup['online'])
+        metrics.REGISTRY.histogram('client_startup_seconds', "Time from creating the client to being online") \
+            .observe(self.startup['online'])
+        if constants.LINK_STATE_DATABASE:
+            self.start_link_state()
+        self.start_link_monitor()
+        if metrics.REGISTRY.enabled:
+            self.loop.create_task(metrics.REGISTRY.export_periodically(self.metrics_file, self.metrics_interval))
+        self.event('routing_ready')
+
+    async def probe_link(self, jid, timeout):
+        """
+        Round trip time to a neighbor with an XMPP ping, sent to one of its online resources when it has one
+        :param jid: bare jid of the neighbor
+        :param timeout: seconds to wait for the answer
+        :return: round trip time in seconds, None if the ping was lost
+        """
+        resources = list(self.client_roster[jid].resources)
+        target = f"{jid}/{resources[0]}" if resources else jid
+        try:
+            return await self.feature('xep_0199').ping(target, timeout=timeout)
+        except (exceptions.IqError, exceptions.IqTimeout):
+            return None
 
     @staticmethod
     def failed_auth(event):
@@ -171,7 +174,7 @@ class MessengerAccount(ClientXMPP):
     async def messaging_app(self, event):
         """
         Handles the main functionalities of the client
-        :param event: event to start the app (session start)
+        :param event: event to start the app (routing ready)
         """
         running = True
         while running:
@@ -183,6 +186,7 @@ class MessengerAccount(ClientXMPP):
 
             if option == 1:     # Log out
                 print("logged out")
+                self.stop_routing()
                 await self.disconnect()
                 break
 
@@ -193,38 +197,12 @@ class MessengerAccount(ClientXMPP):
                     message = await ainput("Message content\n>> ")
                     algorithm = await ainput("Algorithm: \n1. DVR (use option 4 of general menu)"
                                              "\n2. Flooding\n3. Link state routing\n>>")
-                    path = None
-                    if algorithm == '1':    # Distance vector routing
-                        # Routes and weights are updated in option number 4.
-                        pass
-                    elif algorithm == '2':  # Flooding
-                        print(self.matrix, self.node_number, message_destinatary)
-                        message = f"Sender/$/{self.jid}/$/Destinatary/$/{message_destinatary}" \
-                                  f"/$/Traversed nodes/$/{self.adjacent_names}/$/Distance/$/N.A/$/Path/$/" \
-                                  f"{[x for x in self.nodes if x not in self.adjacent_names]}/$/Nodes/$/{self.nodes}/$/Message/$/{message}/$/2"
-
-                        for i in range(len(self.adjacent_names)):
-                            await self.message(self.adjacent_names[i], message, mtype='chat')
-                        continue
-
-                    elif algorithm == '3':  # Link state routing
-                        print(self.matrix, self.node_number, message_destinatary)
-                        routing = NetworkAlgorithms()
-                        path, distance = routing.link_state_routing(self.matrix, self.nodes.index(message_destinatary), self.node_number)
-                        message = f"Sender/$/{self.jid}/$/Destinatary/$/{message_destinatary}" \
-                                  f"/$/Traversed nodes/$/{[path[0], path[1]]}/$/Distance/$/{distance}/$/Path/$/" \
-                                  f"{path[2::]}/$/Nodes/$/{self.nodes}/$/Message/$/{message}/$/3 "
-                        print("message payload:\n", message)
-                        print(f"Shortest path is: {path} with a total weight of {distance}")
-                    else:
+                    if algorithm not in ('1', '2', '3'):
                         print("Algorithm wasn't correct")
                         continue
-                    if path is not None and len(path) > 1:
-                        await self.message(self.nodes[path[1]], message, mtype='chat')
-                    else:
-                        await self.message(message_destinatary, message, mtype='chat')
+                    await self.put_routed(message_destinatary, message, int(algorithm))
                     print(f"Sent: {message} > {username}")
-                except AttributeError:
+                except (AttributeError, KeyError, ValueError):
                     print("El usuario no es correcto")
                 continue
 
@@ -232,11 +210,34 @@ class MessengerAccount(ClientXMPP):
                 self.end_session()
 
             elif option == 4:   # Send dvr
-                for node in self.adjacent_names:
-                    message = f"Sender/$/{self.jid}/$/Destinatary/$/{node}" \
-                              f"/$/Traversed nodes/$/hi/$/Distance/$/EmptyPayload/$/Path/$/" \
-                              f"hi/$/Nodes/$/{self.nodes}/$/Message/$/{self.adjacent_node_weights}/$/3 "
-                    await self.message(node, message, mtype='chat')
+                if constants.DVR_INCREMENTAL:
+                    self.send_dvr_update()
+                    continue
+                self.send_distance_vector(dict(enumerate(self.adjacent_node_weights)))
+            elif option == 5:   # Change a link weight
+                try:
+                    username = await ainput("Neighbor username\n>> ")
+                    weight = float(await ainput("New weight (0 removes the link)\n>> "))
+                    self.update_link(f"{username}{constants.SERVER}", weight)
+                except (KeyError, ValueError):
+                    print("El usuario no es correcto")
+            elif option == 6:   # Send a file
+                try:
+                    username = await ainput("Username to send the file to\n>> ")
+                    file_path = await ainput("File path\n>> ")
+                    algorithm = await ainput("Algorithm: \n1. DVR\n2. Flooding\n3. Link state routing\n>>")
+                    if algorithm not in ('1', '2', '3'):
+                        print("Algorithm wasn't correct")
+                        continue
+                    with open(file_path, 'rb') as file:
+                        result = await self.transfers.send(f"{username}{constants.SERVER}", file,
+                                                           os.path.basename(file_path), int(algorithm))
+                    print(f"Sent {file_path} > {username}: {result['read']} bytes in {result['sent']} "
+                          f"compressed bytes")
+                except (OSError, TransferError, CodecError) as error:
+                    print(f"The file could not be sent: {error}")
+                except (ValueError, KeyError):
+                    print("El usuario no es correcto")
             elif option == 12344321:
                 print("Я Коло-бот")
 
@@ -248,7 +249,10 @@ class MessengerAccount(ClientXMPP):
         :param mtype: message type, defaults to chat
         :return: True
         """
-        self.send_message(message_destinatary, message, mtype=mtype)
+        if self.outbound is not None:
+            await self.outbound.put(message_destinatary, message)
+        else:
+            self.send_message(message_destinatary, message, mtype=mtype)
         return True
 
     def end_session(self):
@@ -0,0 +1,212 @@
+# encoding: utf-8
+"""
+    metrics.py
+    Authors: Mario Sarmientos, Randy Venegas, Pablo Ruiz 18259 (PingMaster99)
+    Version 1.0
+    Updated October 18, 2026
+
+    Counters and histograms for the forwarding path.
+    Metrics are exported periodically as JSON or Prometheus text. When METRICS is disabled in constants.py
+    every metric is a shared object whose methods do nothing, and callers skip their timing code by
+    checking registry.enabled.
+"""
+
+import asyncio
+import json
+import os
+import time
+from bisect import bisect_left
+import constants
+
+# Seconds, from 10 microseconds to 10 seconds
+TIME_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 8, 10, 12, 16, 20, 25, 32, 50, 64, 100, 128, 256, 512, 1024)
+
+
+class Counter:
+    """
+    Monotonic counter, optionally split by the value of one label
+    """
+    def __init__(self, name, description, label=None):
+        """
+        Initializes the counter
+        :param name: metric name
+        :param description: help text
+        :param label: name of the label, None for an unlabeled counter
+        """
+        self.name = name
+        self.description = description
+        self.label = label
+        self.values = {}
+
+    def inc(self, label_value=None, amount=1):
+        """
+        Increments the counter
+        :param label_value: value of the label
+        :param amount: increment
+        """
+        self.values[label_value] = self.values.get(label_value, 0) + amount
+
+    def to_dict(self):
+        if self.label is None:
+            return self.values.get(None, 0)
+        return {str(key): value for key, value in self.values.items()}
+
+    def to_prometheus(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        for key, value in self.values.items():
+            labels = '' if self.label is None else f'{{{self.label}="{key}"}}'
+            lines.append(f"{self.name}{labels} {value}")
+        return lines
+
+
+class Histogram:
+    """
+    Histogram with fixed bucket upper bounds
+    """
+    def __init__(self, name, description, buckets=TIME_BUCKETS):
+        """
+        Initializes the histogram
+        :param name: metric name
+        :param description: help text
+        :param buckets: sorted bucket upper bounds
+        """
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """
+        Records a value
+        :param value: observed value
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, fraction):
+        """
+        Upper bound of the bucket that holds the given quantile
+        :param fraction: quantile between 0 and 1
+        :return: bucket bound, infinite for the overflow bucket, None without observations
+        """
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            if total >= rank:
+                return bound
+        return float('inf')
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else None,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+            'buckets': {str(bound): count for bound, count in zip(self.buckets + ('+Inf',), self.counts)},
+        }
+
+    def to_prometheus(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        total = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {total}')
+        lines.append(f"{self.name}_sum {self.sum}")
+        lines.append(f"{self.name}_count {self.count}")
+        return lines
+
+
+class NullMetric:
+    """
+    Metric used while metrics are disabled
+    """
+    def inc(self, label_value=None, amount=1):
+        pass
+
+    def observe(self, value):
+        pass
+
+
+NULL_METRIC = NullMetric()
+
+
+class Registry:
+    """
+    Collection of metrics
+    """
+    def __init__(self, enabled=False):
+        """
+        Initializes the registry
+        :param enabled: record metrics, otherwise every metric is a NullMetric
+        """
+        self.enabled = enabled
+        self.metrics = {}
+
+    def counter(self, name, description, label=None):
+        """
+        Creates or returns a counter
+        """
+        if not self.enabled:
+            return NULL_METRIC
+        return self.metrics.setdefault(name, Counter(name, description, label))
+
+    def histogram(self, name, description, buckets=TIME_BUCKETS):
+        """
+        Creates or returns a histogram
+        """
+        if not self.enabled:
+            return NULL_METRIC
+        return self.metrics.setdefault(name, Histogram(name, description, buckets))
+
+    def to_json(self):
+        """
+        :return: JSON text with every metric
+        """
+        return json.dumps({'timestamp': time.time(),
+                           'metrics': {name: metric.to_dict() for name, metric in self.metrics.items()}},
+                          indent=2)
+
+    def to_prometheus(self):
+        """
+        :return: Prometheus text exposition of every metric
+        """
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.to_prometheus())
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path):
+        """
+        Writes every metric to a file, as Prometheus text when the file ends in .prom and JSON otherwise
+        :param path: output file
+        """
+        content = self.to_prometheus() if path.endswith('.prom') else self.to_json()
+        temporary_file = f"{path}.tmp"
+        with open(temporary_file, 'w') as output:
+            output.write(content)
+        os.replace(temporary_file, path)
+
+    async def export_periodically(self, path, interval):
+        """
+        Exports the metrics every interval seconds until cancelled
+        :param path: output file
+        :param interval: seconds between exports
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.export(path)
+            except OSError as error:
+                print(f"Could not export metrics to {path}: {error}")
+
+
+REGISTRY = Registry(constants.METRICS)
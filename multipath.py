@@ -0,0 +1,139 @@
+# encoding: utf-8
+"""
+    multipath.py
+    Authors: Mario Sarmientos, Randy Venegas, Pablo Ruiz 18259 (PingMaster99)
+    Version 1.0
+    Updated October 18, 2026
+
+    Multipath link state routing.
+    The k shortest loopless paths to a destination are computed once per topology version and the
+    messages to it are spread over them, by smooth weighted round robin or by hashing a flow key so the
+    messages of one conversation keep their order. A path whose first hop queue backs up is skipped
+    until it drains, so traffic moves off a degraded path without waiting for a topology change.
+"""
+
+import zlib
+from collections import deque
+from graph import INF
+from routing_algorithms import NetworkAlgorithms
+
+
+class PathSet:
+    """
+    Paths to one destination and the state used to balance messages over them
+    """
+    def __init__(self, routes, max_stretch=INF):
+        """
+        Initializes the set
+        :param routes: list of (distance, path) from k_shortest_paths, shortest first
+        :param max_stretch: paths longer than the shortest one times this are not used
+        """
+        best = routes[0][0]
+        routes = [(distance, path) for distance, path in routes if distance <= best * max_stretch]
+        self.distances = [distance for distance, _ in routes]
+        self.paths = [path for _, path in routes]
+        # Cheaper paths get proportionally more messages
+        self.weights = [best / distance if distance else 1.0 for distance in self.distances]
+        self.current = [0.0] * len(self.paths)
+        self.sent = [0] * len(self.paths)
+        self.tickets = [deque() for _ in self.paths]
+
+    def __len__(self):
+        return len(self.paths)
+
+    def in_flight(self, index, queue):
+        """
+        Messages sent on a path that are still waiting in the outbound queue of its first hop
+        :param index: path index
+        :param queue: NeighborQueue of the first hop, None without outbound queues
+        :return: number of messages
+        """
+        tickets = self.tickets[index]
+        if queue is None:
+            tickets.clear()
+            return 0
+        while tickets and tickets[0] <= queue.sent:
+            tickets.popleft()
+        return len(tickets)
+
+    def select(self, queues, max_in_flight, flow=None):
+        """
+        Picks the path of the next message
+        :param queues: NeighborQueue of the first hop of every path, None entries without outbound queues
+        :param max_in_flight: paths with this many messages in flight are skipped while another one is not
+        :param flow: key whose messages always take the same usable path, weighted round robin when None
+        :return: path index
+        """
+        usable = [index for index, queue in enumerate(queues)
+                  if queue is None or (not queue.full and self.in_flight(index, queue) < max_in_flight)]
+        if not usable:      # Every path is backed up, keep spreading the load over all of them
+            usable = list(range(len(self.paths)))
+
+        if flow is not None:
+            key = zlib.crc32(str(flow).encode('utf-8'))
+            index = key % len(self.paths)
+            return index if index in usable else usable[key % len(usable)]
+
+        # Smooth weighted round robin: interleaves the paths instead of sending bursts down each one
+        total = 0.0
+        best = usable[0]
+        for index in usable:
+            self.current[index] += self.weights[index]
+            total += self.weights[index]
+            if self.current[index] > self.current[best]:
+                best = index
+        self.current[best] -= total
+        return best
+
+    def record(self, index, queue):
+        """
+        Counts a message sent on a path, called right before it is queued
+        :param index: path index
+        :param queue: NeighborQueue of the first hop, None without outbound queues
+        """
+        self.sent[index] += 1
+        if queue is not None:
+            self.tickets[index].append(queue.sent + len(queue.messages) + 1)
+
+
+class MultipathTable:
+    """
+    Path sets of the destinations of one source, dropped when the topology version changes
+    """
+    def __init__(self, k=2, max_stretch=1.5):
+        """
+        Initializes the table
+        :param k: paths per destination
+        :param max_stretch: paths longer than the shortest one times this are not used
+        """
+        self.k = k
+        self.max_stretch = max_stretch
+        self.version = None
+        self.source = None
+        self.path_sets = {}
+
+    def path_set(self, graph, source, destination, version):
+        """
+        Path set of a destination, computed on first use for every topology version
+        :param graph: adjacency matrix or CSRGraph of the current topology
+        :param source: source node index
+        :param destination: destination node index
+        :param version: current topology version
+        :return: PathSet or None if the destination is unreachable
+        """
+        if version != self.version or source != self.source:
+            self.path_sets.clear()
+            self.version = version
+            self.source = source
+        if destination not in self.path_sets:
+            routes = NetworkAlgorithms.k_shortest_paths(graph, source, destination, self.k)
+            self.path_sets[destination] = PathSet(routes, self.max_stretch) if routes else None
+        return self.path_sets[destination]
+
+    def stats(self):
+        """
+        Messages sent on every path of the current topology version
+        :return: dictionary of destination index -> list of (path, distance, messages sent)
+        """
+        return {destination: list(zip(path_set.paths, path_set.distances, path_set.sent))
+                for destination, path_set in self.path_sets.items() if path_set is not None}
@@ -0,0 +1,279 @@
+# encoding: utf-8
+"""
+    outbound.py
+    Authors: Mario Sarmientos, Randy Venegas, Pablo Ruiz 18259 (PingMaster99)
+    Version 1.0
+    Updated October 18, 2026
+
+    Outbound scheduler with one bounded queue and one sender task per neighbor.
+    Distance vector updates for a neighbor are merged while they wait, so a slow neighbor only ever has
+    its newest distances pending, and producers wait when a neighbor's queue is full. Link state
+    advertisements are kept apart, only the newest one of every origin, so they are never dropped.
+    A pending distance vector update takes one place of the queue. A message that cannot wait and finds
+    the queue full evicts that update first, and the neighbor gets the whole vector once the queue has
+    space again. Only when there is no update to evict is the message dropped, and counted.
+"""
+
+import asyncio
+import inspect
+import logging
+from collections import deque
+
+log = logging.getLogger(__name__)
+
+
+class NeighborQueue:
+    """
+    Pending messages of a single neighbor
+    """
+    def __init__(self, jid, maxsize):
+        """
+        Initializes the queue
+        :param jid: jid of the neighbor
+        :param maxsize: maximum number of queued messages
+        """
+        self.jid = jid
+        self.maxsize = maxsize
+        self.messages = deque()
+        self.control = {}
+        self.advertisements = {}
+        self.ready = asyncio.Event()
+        self.space = asyncio.Event()
+        self.space.set()
+        self.task = None
+        self.sent = 0
+        self.batches = 0
+        self.dropped = 0
+        self.merged = 0
+        self.errors = 0
+        self.evicted = 0
+        self.resync = False     # The pending update was evicted, the whole vector is sent once there is space
+
+    @property
+    def full(self):
+        return len(self.messages) + (1 if self.control else 0) >= self.maxsize
+
+    def push(self, body):
+        """
+        Queues a message, the caller must check that the queue is not full
+        :param body: message body
+        """
+        self.messages.append(body)
+        if self.full:
+            self.space.clear()
+        self.ready.set()
+
+    def push_control(self, entries):
+        """
+        Merges distance vector entries into the pending update, newer distances replace older ones
+        :param entries: dictionary of destination index -> distance
+        """
+        self.merged += len(self.control.keys() & entries.keys())
+        self.control.update(entries)
+        if self.full:
+            self.space.clear()
+        self.ready.set()
+
+    def evict_control(self):
+        """
+        Drops the pending distance vector update to make room for a message
+        :return: True if there was an update to drop
+        """
+        if not self.control:
+            return False
+        self.control = {}
+        self.evicted += 1
+        self.resync = True
+        return True
+
+    def push_advertisement(self, origin, body):
+        """
+        Queues a link state advertisement, replacing an older one of the same origin still waiting
+        :param origin: index of the node that originated the advertisement
+        :param body: message body
+        """
+        self.advertisements[origin] = body
+        self.ready.set()
+
+
+class OutboundScheduler:
+    """
+    Sends messages to the neighbors from one task per neighbor
+    """
+    def __init__(self, send, encode_control, loop=None, queue_size=256, batch_size=32, batch_delay=0.01, rate=0,
+                 full_control=None):
+        """
+        Initializes the scheduler
+        :param send: function(jid, body) that sends a message, may return an awaitable
+        :param encode_control: function(jid, entries) that builds the body of a distance vector update
+        :param loop: asyncio loop, the running loop when omitted
+        :param queue_size: maximum queued messages per neighbor
+        :param batch_size: messages sent to a neighbor before giving the other senders a turn
+        :param batch_delay: seconds a distance vector update waits so more entries are merged into it
+        :param rate: maximum messages per second to a neighbor, 0 for no limit
+        :param full_control: function(jid) returning every distance vector entry, sent to a neighbor whose
+            pending update was evicted. Without it updates are never evicted.
+        """
+        self.send = send
+        self.encode_control = encode_control
+        self.full_control = full_control
+        self.loop = loop
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.rate = rate
+        self.queues = {}
+
+    def queue(self, jid):
+        """
+        Queue of a neighbor, its sender task is started on first use
+        :param jid: jid of the neighbor
+        :return: NeighborQueue
+        """
+        neighbor_queue = self.queues.get(jid)
+        if neighbor_queue is None:
+            neighbor_queue = self.queues[jid] = NeighborQueue(jid, self.queue_size)
+            loop = self.loop or asyncio.get_event_loop()
+            neighbor_queue.task = loop.create_task(self.run(neighbor_queue))
+        return neighbor_queue
+
+    async def put(self, jid, body):
+        """
+        Queues a message, waiting while the neighbor's queue is full
+        :param jid: jid of the neighbor
+        :param body: message body
+        """
+        neighbor_queue = self.queue(jid)
+        while neighbor_queue.full:
+            await neighbor_queue.space.wait()
+        neighbor_queue.push(body)
+
+    def put_nowait(self, jid, body):
+        """
+        Queues a message without waiting, used from synchronous event handlers. When the queue is full the
+        pending distance vector update is evicted to make room, the message is only dropped without one.
+        :param jid: jid of the neighbor
+        :param body: message body
+        :return: False if the message was dropped because the queue is full
+        """
+        neighbor_queue = self.queue(jid)
+        if neighbor_queue.full and self.full_control is not None:
+            neighbor_queue.evict_control()
+        if neighbor_queue.full:
+            neighbor_queue.dropped += 1
+            return False
+        neighbor_queue.push(body)
+        return True
+
+    def put_control(self, jid, entries):
+        """
+        Queues distance vector entries, merged with any update still waiting for the same neighbor
+        :param jid: jid of the neighbor
+        :param entries: dictionary of destination index -> distance
+        """
+        self.queue(jid).push_control(entries)
+
+    def put_advertisement(self, jid, origin, body):
+        """
+        Queues a link state advertisement, never dropped even when the neighbor's queue is full
+        :param jid: jid of the neighbor
+        :param origin: index of the node that originated the advertisement
+        :param body: message body
+        """
+        self.queue(jid).push_advertisement(origin, body)
+
+    async def wait_for_space(self, jids=None):
+        """
+        Waits until the queues of the given neighbors can take a message
+        :param jids: neighbor jids, every known neighbor when omitted
+        """
+        for jid in (jids if jids is not None else list(self.queues)):
+            neighbor_queue = self.queue(jid)
+            while neighbor_queue.full:
+                await neighbor_queue.space.wait()
+
+    async def deliver(self, neighbor_queue, body):
+        """
+        Sends one message and applies the rate limit. A failed send is logged and only loses that message,
+        the sender task keeps running.
+        :param neighbor_queue: NeighborQueue of the neighbor
+        :param body: message body, or a function building it
+        """
+        try:
+            if callable(body):
+                body = body()
+            result = self.send(neighbor_queue.jid, body)
+            if inspect.isawaitable(result):
+                await result
+        except Exception:
+            neighbor_queue.errors += 1
+            log.exception("Sending to %s failed, message dropped", neighbor_queue.jid)
+        if self.rate:
+            await asyncio.sleep(1 / self.rate)
+
+    async def run(self, neighbor_queue):
+        """
+        Sender task of a neighbor. Pending distance vector updates go first, as a single message, then the
+        pending link state advertisements.
+        :param neighbor_queue: NeighborQueue to send
+        """
+        while True:
+            await neighbor_queue.ready.wait()
+
+            if neighbor_queue.resync and len(neighbor_queue.messages) < neighbor_queue.maxsize - 1:
+                neighbor_queue.resync = False
+                neighbor_queue.control.update(self.full_control(neighbor_queue.jid))
+
+            if neighbor_queue.control:
+                if self.batch_delay:
+                    await asyncio.sleep(self.batch_delay)
+                entries, neighbor_queue.control = neighbor_queue.control, {}
+                if not neighbor_queue.full:
+                    neighbor_queue.space.set()
+                await self.deliver(neighbor_queue, lambda: self.encode_control(neighbor_queue.jid, entries))
+                neighbor_queue.batches += 1
+
+            while neighbor_queue.advertisements:
+                origin = next(iter(neighbor_queue.advertisements))
+                await self.deliver(neighbor_queue, neighbor_queue.advertisements.pop(origin))
+
+            sent = 0
+            while neighbor_queue.messages and sent < self.batch_size:
+                await self.deliver(neighbor_queue, neighbor_queue.messages.popleft())
+                neighbor_queue.sent += 1
+                sent += 1
+                if not neighbor_queue.full:
+                    neighbor_queue.space.set()
+
+            if not (neighbor_queue.messages or neighbor_queue.control or neighbor_queue.advertisements or
+                    neighbor_queue.resync):
+                neighbor_queue.ready.clear()
+            else:
+                await asyncio.sleep(0)
+
+    @property
+    def idle(self):
+        """
+        :return: True when no neighbor has messages, updates or advertisements waiting
+        """
+        return not any(queue.messages or queue.control or queue.advertisements or queue.resync
+                       for queue in self.queues.values())
+
+    def stats(self):
+        """
+        Queue statistics per neighbor
+        :return: dictionary of jid -> statistics
+        """
+        return {jid: {'queued': len(queue.messages), 'sent': queue.sent, 'control_batches': queue.batches,
+                      'merged_entries': queue.merged, 'evicted_updates': queue.evicted, 'dropped': queue.dropped,
+                      'errors': queue.errors}
+                for jid, queue in self.queues.items()}
+
+    def close(self):
+        """
+        Stops every sender task, messages still queued are discarded
+        """
+        for neighbor_queue in self.queues.values():
+            if neighbor_queue.task is not None:
+                neighbor_queue.task.cancel()
+        self.queues.clear()
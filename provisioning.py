@@ -0,0 +1,327 @@
+# encoding: utf-8
+"""
+    provisioning.py
+    Authors: Mario Sarmientos, Randy Venegas, Pablo Ruiz 18259 (PingMaster99)
+    Version 1.0
+    Updated October 18, 2026
+
+    Bulk account provisioning.
+    Registers a list of accounts, or one account per node of a topology file, over a bounded pool of
+    concurrent Registration connections on a single event loop. Timed out registrations are retried,
+    existing accounts are skipped and a result is reported for every account.
+    StandInServer is a local XMPP server that only implements in-band registration, for dry runs of the
+    real client without the actual server.
+
+    Example: python provisioning.py --topology topology.txt --password secret --concurrency 50
+             python provisioning.py --topology topology.txt --password secret --stand-in
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import constants
+from xml.etree import ElementTree
+from xml.sax.saxutils import quoteattr
+from constants import CREATED, EXISTS, TIMEOUT, FAILED
+from topology_reader import TopologyReader
+
+STREAM_HEADER = "<?xml version='1.0'?><stream:stream xmlns='jabber:client' " \
+                "xmlns:stream='http://etherx.jabber.org/streams' id='{id}' from='{domain}' version='1.0'>" \
+                "<stream:features><register xmlns='http://jabber.org/features/iq-register'/></stream:features>"
+
+
+def read_accounts(path, password=None):
+    """
+    Reads accounts from a file with one 'jid [password]' per line, # starts a comment
+    :param path: accounts file
+    :param password: password of the lines without one
+    :return: list of (jid, password)
+    """
+    accounts = []
+    with open(path) as file:
+        for number, line in enumerate(file, 1):
+            fields = line.split('#', 1)[0].split()
+            if not fields:
+                continue
+            if len(fields) == 1 and password is None:
+                raise ValueError(f"{path}:{number}: {fields[0]} has no password and no default was given")
+            accounts.append((full_jid(fields[0]), fields[1] if len(fields) > 1 else password))
+    return accounts
+
+
+def topology_accounts(topology_file, password):
+    """
+    One account per node of a topology file
+    :param topology_file: topology file path
+    :param password: password of every account
+    :return: list of (jid, password)
+    """
+    nodes = TopologyReader(topology_file).nodes
+    if nodes is None:
+        raise ValueError(f"{topology_file} is not a valid topology")
+    return [(node, password) for node in nodes]
+
+
+def full_jid(jid):
+    """
+    :return: jid with the server added when it is missing
+    """
+    return jid if '@' in jid else f"{jid}{constants.SERVER}"
+
+
+async def xmpp_register(jid, password, address=None, timeout=30.0):
+    """
+    Registers one account over its own XMPP connection
+    :param jid: jid of the new account
+    :param password: password of the new account
+    :param address: (host, port) of the server, resolved from the jid when omitted
+    :param timeout: seconds to wait for the server
+    :return: CREATED, EXISTS, TIMEOUT or FAILED
+    """
+    from registration import Registration   # slixmpp is only needed to talk to a real server
+
+    xmpp = Registration(jid, password, interactive=False)
+    xmpp.register_plugin('xep_0030')  # Service Discovery
+    xmpp.register_plugin('xep_0004')  # Data forms
+    xmpp.register_plugin('xep_0066')  # Out-of-band Data
+    xmpp.register_plugin('xep_0077')  # In-band Registration
+    xmpp['xep_0077'].force_registration = True
+    # An unanswered registration ends in IqTimeout before the whole attempt times out
+    xmpp.response_timeout = timeout / 2
+    if address:
+        xmpp.connect(address)
+    else:
+        xmpp.connect()
+    try:
+        await asyncio.wait_for(xmpp.finished.wait(), timeout)
+    except asyncio.TimeoutError:
+        xmpp.finish(TIMEOUT)
+    try:
+        await asyncio.wait_for(xmpp.disconnect(), timeout)
+    except asyncio.TimeoutError:
+        pass
+    return xmpp.result
+
+
+class StandInServer:
+    """
+    Local XMPP server that only knows in-band registration (XEP-0077). Registration connects to it like to a
+    real server: accounts are created, existing ones are answered with a 409 conflict and a share of the
+    registrations is never answered, so the client times out and the provisioner retries.
+    """
+    def __init__(self, domain=None, accounts=None, timeouts=0.0, seed=1):
+        """
+        Initializes the server
+        :param domain: domain of the accounts, the one of constants.SERVER when omitted
+        :param accounts: dictionary of username -> password of the accounts that already exist
+        :param timeouts: probability of not answering a registration
+        :param seed: random seed for the unanswered registrations
+        """
+        self.domain = domain or constants.SERVER.lstrip('@')
+        self.accounts = dict(accounts or {})
+        self.timeouts = timeouts
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.streams = 0
+        self.server = None
+
+    async def start(self, host='127.0.0.1', port=0):
+        """
+        Starts listening
+        :param host: address to listen on
+        :param port: port to listen on, any free one when 0
+        :return: (host, port) the server listens on
+        """
+        self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server.sockets[0].getsockname()[:2]
+
+    def close(self):
+        """
+        Stops listening
+        """
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+
+    async def handle(self, reader, writer):
+        """
+        Serves one client stream, every stanza is answered as soon as it is complete
+        """
+        parser = ElementTree.XMLPullParser(('start', 'end'))
+        depth = 0
+        try:
+            while True:
+                data = await reader.read(4096)
+                if not data:
+                    break
+                parser.feed(data)
+                for event, element in parser.read_events():
+                    if event == 'start':
+                        depth += 1
+                        if depth == 1:
+                            self.streams += 1
+                            writer.write(STREAM_HEADER.format(id=self.streams, domain=self.domain).encode())
+                        continue
+                    depth -= 1
+                    if depth == 0:
+                        writer.write(b"</stream:stream>")
+                        await writer.drain()
+                        return
+                    if depth == 1:
+                        reply = self.answer(element)
+                        if reply:
+                            writer.write(reply.encode())
+                await writer.drain()
+        except (ElementTree.ParseError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def answer(self, stanza):
+        """
+        Answers a stanza of a client
+        :param stanza: ElementTree element of the stanza
+        :return: reply, None if there is none
+        """
+        if stanza.tag != '{jabber:client}iq' or stanza.get('type') not in ('get', 'set'):
+            return None
+        stanza_id = quoteattr(stanza.get('id', ''))
+        query = stanza.find('{jabber:iq:register}query')
+        if query is None:
+            return f"<iq type='error' id={stanza_id}><error type='cancel'>" \
+                   f"<service-unavailable xmlns='urn:ietf:params:xml:ns:xmpp-stanzas'/></error></iq>"
+        if stanza.get('type') == 'get':
+            return f"<iq type='result' id={stanza_id}><query xmlns='jabber:iq:register'>" \
+                   f"<username/><password/></query></iq>"
+
+        self.requests += 1
+        if self.timeouts and self.random.random() < self.timeouts:
+            return None
+        username = query.findtext('{jabber:iq:register}username')
+        if username in self.accounts:
+            return f"<iq type='error' id={stanza_id}><error code='409' type='cancel'>" \
+                   f"<conflict xmlns='urn:ietf:params:xml:ns:xmpp-stanzas'/></error></iq>"
+        self.accounts[username] = query.findtext('{jabber:iq:register}password')
+        return f"<iq type='result' id={stanza_id}/>"
+
+
+class Provisioner:
+    """
+    Registers many accounts concurrently
+    """
+    def __init__(self, register=xmpp_register, concurrency=20, retries=3, backoff=0.5):
+        """
+        Initializes the provisioner
+        :param register: coroutine function(jid, password) returning CREATED, EXISTS, TIMEOUT or FAILED
+        :param concurrency: registrations running at the same time
+        :param retries: times a timed out registration is tried again
+        :param backoff: seconds before the first retry, doubled on every retry
+        """
+        self.register = register
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+
+    async def register_account(self, semaphore, jid, password):
+        """
+        Registers one account, retrying timeouts
+        :return: result dictionary of the account
+        """
+        start = time.perf_counter()
+        attempts = 0
+        result = TIMEOUT
+        while attempts <= self.retries:
+            if attempts:
+                await asyncio.sleep(self.backoff * 2 ** (attempts - 1))
+            attempts += 1
+            async with semaphore:
+                try:
+                    result = await self.register(jid, password)
+                except (OSError, asyncio.TimeoutError):
+                    result = TIMEOUT
+            if result != TIMEOUT:
+                break
+        return {'jid': jid, 'result': result, 'attempts': attempts, 'seconds': time.perf_counter() - start}
+
+    async def provision(self, accounts):
+        """
+        Registers every account
+        :param accounts: list of (jid, password)
+        :return: report dictionary with the count of every result and the result of every account
+        """
+        start = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(self.register_account(semaphore, jid, password)
+                                         for jid, password in accounts))
+        summary = {result: 0 for result in (CREATED, EXISTS, TIMEOUT, FAILED)}
+        for account in results:
+            summary[account['result']] += 1
+        return {'accounts': len(results), 'seconds': time.perf_counter() - start, 'summary': summary,
+                'results': results}
+
+
+def main():
+    """
+    Command line entry point
+    """
+    parser = argparse.ArgumentParser(description="Register many XMPP accounts at once")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--accounts', help="File with one 'jid [password]' per line")
+    source.add_argument('--topology', help="Register one account per node of this topology file")
+    parser.add_argument('--password', help="Password of the accounts without one")
+    parser.add_argument('--server', help="host:port of the server, resolved from the jids when omitted")
+    parser.add_argument('--concurrency', type=int, default=20, help="Registrations running at the same time")
+    parser.add_argument('--retries', type=int, default=3, help="Retries of a timed out registration")
+    parser.add_argument('--timeout', type=float, default=30.0, help="Seconds to wait for the server")
+    parser.add_argument('--report', help="Write the per account report to this JSON file")
+    parser.add_argument('--stand-in', action='store_true',
+                        help="Register against a local StandInServer instead of the XMPP server")
+    args = parser.parse_args()
+
+    if args.topology and args.password is None:
+        parser.error("--topology needs --password")
+    try:
+        if args.topology:
+            accounts = topology_accounts(args.topology, args.password)
+        else:
+            accounts = read_accounts(args.accounts, args.password)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+
+    address = None
+    if args.server:
+        host, _, port = args.server.rpartition(':')
+        address = (host, int(port))
+
+    async def provision():
+        server = None
+        server_address = address
+        if args.stand_in:
+            server = StandInServer()
+            server_address = await server.start()
+        provisioner = Provisioner(lambda jid, password: xmpp_register(jid, password, server_address, args.timeout),
+                                  args.concurrency, args.retries)
+        try:
+            return await provisioner.provision(accounts)
+        finally:
+            if server is not None:
+                server.close()
+
+    from messenger_account import set_event_loop_policy
+    set_event_loop_policy()
+    report = asyncio.run(provision())
+
+    for account in report['results']:
+        if account['result'] not in (CREATED, EXISTS):
+            print(f"{account['jid']}: {account['result']} after {account['attempts']} attempts")
+    print(f"{report['accounts']} accounts in {report['seconds']:.1f} s: " +
+          ", ".join(f"{count} {result}" for result, count in report['summary'].items()))
+    if args.report:
+        with open(args.report, 'w') as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
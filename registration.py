@@ -9,30 +9,58 @@
 """
 
 
+import asyncio
+import logging
 from slixmpp import ClientXMPP, exceptions
+from constants import CREATED, EXISTS, TIMEOUT, FAILED
+
+log = logging.getLogger(__name__)
 
 
 class Registration(ClientXMPP):
     """
     Registers a new user
     """
-    def __init__(self, jid, password):
+    def __init__(self, jid, password, interactive=True):
         """
         Initializes the registration class
         :param jid: jid of the new account
         :param password: password of the new account
+        :param interactive: print the result and log in with the new account, otherwise disconnect as soon as
+            the result is known
         """
         ClientXMPP.__init__(self, jid, password)
+        self.interactive = interactive
+        self.result = None
+        self.finished = asyncio.Event()
 
         self.add_event_handler("session_start", self.session_start)
         self.add_event_handler("register", self.register)
+        self.add_event_handler("connection_failed", self.connection_failed)
+        self.add_event_handler("disconnected", self.connection_failed)
+
+    def finish(self, result):
+        """
+        Records the result of the registration
+        :param result: CREATED, EXISTS, TIMEOUT or FAILED
+        """
+        if self.result is None:
+            self.result = result
+        self.finished.set()
+
+    def connection_failed(self, event):
+        """
+        Ends the registration when the server cannot be reached or closes the connection first
+        :param event: event to handle
+        """
+        self.finish(FAILED)
 
     async def session_start(self, event):
         """
         Starts the registration bot
         :param event: event to handle
         """
-        print("session started")
+        log.debug("Registration session started for %s", self.boundjid)
         self.send_presence()
         await self.get_roster()
         await self.disconnect()
@@ -49,13 +77,23 @@ class Registration(ClientXMPP):
 
         try:
             await resp.send()
-            print(f"{self.boundjid}'s account has been created!")
+            if self.interactive:
+                print(f"{self.boundjid}'s account has been created!")
+            self.finish(CREATED)
+            if not self.interactive:
+                await self.disconnect()
         except exceptions.IqError as e:
             if e.iq['error']['code'] == '409':
-                print(f"There is already an account with the username: {resp['register']['username']}")
+                if self.interactive:
+                    print(f"There is already an account with the username: {resp['register']['username']}")
+                self.finish(EXISTS)
             else:
-                print("Account could not be registered")
+                if self.interactive:
+                    print("Account could not be registered")
+                self.finish(FAILED)
             await self.disconnect()
         except exceptions.IqTimeout as e:
-            print("Timeout error, please try again")
+            if self.interactive:
+                print("Timeout error, please try again")
+            self.finish(TIMEOUT)
             await self.disconnect()
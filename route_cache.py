@@ -0,0 +1,116 @@
+# encoding: utf-8
+"""
+    route_cache.py
+    Authors: Mario Sarmientos, Randy Venegas, Pablo Ruiz 18259 (PingMaster99)
+    Version 1.0
+    Updated October 18, 2026
+
+    Route table cache keyed by a topology version counter.
+    The shortest path tree of the account is computed once per topology version and every
+    destination is then served from it, either as a full path or as the next hop towards it.
+"""
+
+from routing_algorithms import NetworkAlgorithms, RouteResult
+
+
+class RouteCache:
+    """
+    Single source shortest path tree cached until the topology version changes
+    """
+    def __init__(self):
+        """
+        Initializes an empty cache
+        """
+        self.routing = NetworkAlgorithms()
+        self.version = None
+        self.source = None
+        self.graph = None
+        self.result = RouteResult(None, [], [], [])
+        self.routes = {}
+        self.hits = 0
+        self.misses = 0
+
+    def refresh(self, graph, source, version):
+        """
+        Recomputes the shortest path tree if the topology version or the source changed
+        :param graph: adjacency matrix or CSRGraph of the current topology
+        :param source: source node index
+        :param version: current topology version
+        :return: True if the tree was recomputed
+        """
+        if version == self.version and source == self.source:
+            self.hits += 1
+            return False
+        self.misses += 1
+        self.install(graph, version, self.routing.shortest_paths(graph, source))
+        return True
+
+    def install(self, graph, version, result):
+        """
+        Stores a shortest path tree
+        :param graph: graph the tree was computed on
+        :param version: topology version of the tree
+        :param result: RouteResult of the tree
+        """
+        self.result = result
+        self.graph = graph
+        self.version = version
+        self.source = result.source
+        self.routes.clear()
+
+    @property
+    def distances(self):
+        """
+        :return: distance of every destination in the cached tree
+        """
+        return self.result.distances
+
+    @property
+    def parents(self):
+        """
+        :return: parent of every node in the tree in the cached tree
+        """
+        return self.result.parents
+
+    @property
+    def next_hops(self):
+        """
+        :return: next hop of every destination in the cached tree
+        """
+        return self.result.next_hops
+
+    def lookup(self, graph, source, destination, version):
+        """
+        Returns the shortest path to a destination, recomputing the tree only when the
+        topology version or the source changed since the last lookup
+        :param graph: adjacency matrix or CSRGraph of the current topology
+        :param source: source node index
+        :param destination: destination node index
+        :param version: current topology version
+        :return: path and distance
+        """
+        self.refresh(graph, source, version)
+        route = self.routes.get(destination)
+        if route is None:
+            route = self.routes[destination] = (self.result.path(destination), self.result.distance(destination))
+        return route
+
+    def invalidate(self):
+        """
+        Drops the cached tree so the next lookup recomputes it
+        """
+        self.version = None
+        self.routes.clear()
+
+    def stats(self):
+        """
+        Cache statistics
+        :return: dictionary with hits, misses and hit ratio
+        """
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else 0.0,
+            'version': self.version,
+        }
@@ -0,0 +1,341 @@
+# encoding: utf-8
+"""
+    route_index.py
+    Authors: Mario Sarmientos, Randy Venegas, Pablo Ruiz 18259 (PingMaster99)
+    Version 1.0
+    Updated October 18, 2026
+
+    All-pairs route index.
+    The distance and next hop of every (source, destination) pair are computed once, with one Dijkstra
+    per source spread over a process pool, and stored next to the topology file together with the graph
+    they were computed on. Any process maps the index and answers path and distance queries by following
+    the next hops, without running Dijkstra again. The index is keyed by the sha256 of the graph. When the
+    graph changed in only a few links the outdated index is patched: only the sources whose shortest path
+    tree may use a changed link are computed again, the other rows are copied.
+
+    Example: python route_index.py --topology topology.txt sar17055 rui18259
+"""
+
+import argparse
+import concurrent.futures
+import hashlib
+import mmap
+import os
+import struct
+import time
+import constants
+from graph import CSRGraph, INF
+from routing_algorithms import NetworkAlgorithms
+from route_worker import SharedGraph, attach_graph
+
+INDEX_SUFFIX = '.routes'
+INDEX_MAGIC = b'ROUT'
+INDEX_VERSION = 1
+# magic, version, graph sha256, nodes, links
+INDEX_HEADER = struct.Struct('<4sI32sqq')
+
+
+def graph_digest(graph):
+    """
+    sha256 of the nodes and links of a graph
+    :param graph: CSRGraph
+    :return: digest bytes
+    """
+    digest = hashlib.sha256(struct.pack('<q', graph.size))
+    for values in (graph.offsets, graph.targets, graph.weights):
+        digest.update(bytes(values))
+    return digest.digest()
+
+
+def index_layout(size, links):
+    """
+    Positions of the sections of an index file
+    :param size: nodes
+    :param links: links
+    :return: graph start, distances start, next hops start and file length
+    """
+    graph_start = INDEX_HEADER.size
+    distances_start = graph_start + 8 * (size + 1) + 16 * links
+    next_hops_start = distances_start + 8 * size * size
+    return graph_start, distances_start, next_hops_start, next_hops_start + 8 * size * size
+
+
+def write_rows(path, graph, sources):
+    """
+    Computes the rows of some sources and writes them into an index file being built
+    :param path: index file
+    :param graph: CSRGraph
+    :param sources: source node indexes
+    """
+    _, distances_start, next_hops_start, _ = index_layout(graph.size, graph.edge_count)
+    row = 8 * graph.size
+    with open(path, 'r+b') as index:
+        mapped = mmap.mmap(index.fileno(), 0)
+        try:
+            for source in sources:
+                result = NetworkAlgorithms.shortest_paths(graph, source)
+                mapped[distances_start + source * row:distances_start + (source + 1) * row] = \
+                    bytes(result.distances)
+                mapped[next_hops_start + source * row:next_hops_start + (source + 1) * row] = \
+                    bytes(result.next_hops)
+        finally:
+            mapped.close()
+
+
+def write_rows_shared(path, reference, sources):
+    """
+    Process pool entry point, runs write_rows over a SharedGraph
+    """
+    memory, graph = attach_graph(reference)
+    try:
+        write_rows(path, graph, sources)
+    finally:
+        for values in (graph.offsets, graph.targets, graph.weights):
+            values.release()
+        del graph
+        memory.close()
+
+
+class RouteIndex:
+    """
+    Memory mapped all-pairs distances and next hops
+    """
+    def __init__(self, mapped):
+        """
+        Initializes the index over a mapped index file
+        :param mapped: mmap of a valid index file
+        """
+        magic, version, self.digest, size, links = INDEX_HEADER.unpack_from(mapped)
+        graph_start, distances_start, next_hops_start, _ = index_layout(size, links)
+        self.view = view = memoryview(mapped)
+        targets_start = graph_start + 8 * (size + 1)
+        weights_start = targets_start + 8 * links
+        self.mapped = mapped
+        self.size = size
+        self.graph = CSRGraph(size, view[graph_start:targets_start].cast('q'),
+                              view[targets_start:weights_start].cast('q'),
+                              view[weights_start:distances_start].cast('d'))
+        self.distances = view[distances_start:next_hops_start].cast('d')
+        self.next_hops = view[next_hops_start:].cast('q')
+
+    def distance(self, source, destination):
+        """
+        :return: distance between two nodes, infinite if the destination is unreachable
+        """
+        return self.distances[source * self.size + destination]
+
+    def next_hop(self, source, destination):
+        """
+        :return: first node after the source on the path to a destination, -1 if it is unreachable
+        """
+        return self.next_hops[source * self.size + destination]
+
+    def path(self, source, destination):
+        """
+        Follows the next hops of every node of the path, every hop gets strictly closer to the destination
+        :return: list of node indexes from the source to a destination, empty if it is unreachable
+        :raises ValueError: if the next hops do not reach the destination in less than one hop per node
+        """
+        if self.next_hops[source * self.size + destination] < 0:
+            return []
+        path = [source]
+        while path[-1] != destination:
+            hop = self.next_hops[path[-1] * self.size + destination]
+            if hop < 0 or len(path) > self.size:
+                raise ValueError(f"Route index has no loop free path from {source} to {destination}")
+            path.append(hop)
+        return path
+
+    def close(self):
+        """
+        Unmaps the index file
+        """
+        for values in (self.graph.offsets, self.graph.targets, self.graph.weights, self.distances, self.next_hops,
+                       self.view):
+            values.release()
+        self.mapped.close()
+
+
+def load_index(path, digest=None):
+    """
+    Maps an index file
+    :param path: index file
+    :param digest: graph sha256 the index must have been computed for, any graph when omitted
+    :return: RouteIndex or None if the file is missing, invalid or for another graph
+    """
+    try:
+        with open(path, 'rb') as index:
+            mapped = mmap.mmap(index.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        magic, version, index_digest, size, links = INDEX_HEADER.unpack_from(mapped)
+    except struct.error:
+        mapped.close()
+        return None
+    if magic != INDEX_MAGIC or version != INDEX_VERSION or len(mapped) != index_layout(size, links)[3] or \
+            (digest is not None and index_digest != digest):
+        mapped.close()
+        return None
+    return RouteIndex(mapped)
+
+
+def changed_sources(previous, graph, limit):
+    """
+    Sources whose shortest path tree may differ between the graph of an index and a new graph.
+    A source is affected by a link u -> v that got worse if the link is on one of its shortest paths, and by
+    a link that got better if it shortens its path to v.
+    :param previous: RouteIndex of the old graph
+    :param graph: new CSRGraph with the same nodes
+    :param limit: most changed links before every source is considered affected
+    :return: set of source indexes
+    """
+    old_links = {}
+    new_links = {}
+    for links, links_graph in ((old_links, previous.graph), (new_links, graph)):
+        for u, v, weight in links_graph.edges():
+            if weight < links.get((u, v), INF):
+                links[(u, v)] = weight
+    changes = [(u, v, old_links.get((u, v), INF), new_links.get((u, v), INF))
+               for u, v in old_links.keys() | new_links.keys()
+               if old_links.get((u, v), INF) != new_links.get((u, v), INF)]
+    if len(changes) > limit:
+        return set(range(graph.size))
+
+    size = graph.size
+    distances = previous.distances
+    affected = set()
+    for source in range(size):
+        row = source * size
+        for u, v, old_weight, new_weight in changes:
+            through = distances[row + u]
+            if through == INF:
+                continue
+            if (new_weight > old_weight and through + old_weight <= distances[row + v]) or \
+                    (new_weight < old_weight and through + new_weight < distances[row + v]):
+                affected.add(source)
+                break
+    return affected
+
+
+def build_index(graph, path, workers=1, previous=None, limit=64):
+    """
+    Computes the index of a graph and writes it atomically
+    :param graph: CSRGraph
+    :param path: index file
+    :param workers: processes computing rows, 1 computes them in this process
+    :param previous: RouteIndex of an older version of the graph, patched when it has the same nodes and
+        closed once its rows are copied
+    :param limit: most changed links for which the previous index is patched
+    :return: RouteIndex and number of sources computed
+    """
+    size, links = graph.size, graph.edge_count
+    length = index_layout(size, links)[3]
+    temporary_file = f"{path}.{os.getpid()}.tmp"
+    try:
+        sources = set(range(size))
+        if previous is not None and previous.size == size:
+            sources = changed_sources(previous, graph, limit)
+        with open(temporary_file, 'wb') as index:
+            index.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, graph_digest(graph), size, links))
+            for values in (graph.offsets, graph.targets, graph.weights):
+                index.write(bytes(values))
+            if len(sources) == size:
+                index.truncate(length)
+            else:   # Rows of the sources that are not computed again are copied from the previous index
+                index.write(previous.distances)
+                index.write(previous.next_hops)
+    finally:
+        # Closed before the new index replaces it, a mapped file cannot be replaced on Windows
+        if previous is not None:
+            previous.close()
+
+    try:
+        sources = sorted(sources)
+        if workers <= 1 or len(sources) < 2:
+            write_rows(temporary_file, graph, sources)
+        else:
+            shared_graph = SharedGraph(graph)
+            try:
+                chunk = max(1, len(sources) // (4 * workers))
+                with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+                    futures = [executor.submit(write_rows_shared, temporary_file, shared_graph.reference,
+                                               sources[start:start + chunk])
+                               for start in range(0, len(sources), chunk)]
+                    for future in futures:
+                        future.result()
+            finally:
+                shared_graph.release()
+        os.replace(temporary_file, path)
+    except BaseException:
+        os.remove(temporary_file)
+        raise
+    return load_index(path), len(sources)
+
+
+def topology_index(topology_reader, workers=1):
+    """
+    Route index of a topology file, stored next to it and built or patched when it is missing or outdated.
+    The index takes 16 bytes per pair of nodes, topologies above ROUTE_INDEX_MAX_NODES nodes do not get one.
+    :param topology_reader: TopologyReader
+    :param workers: processes computing rows
+    :return: RouteIndex, None if the topology is too big, and number of sources computed
+    """
+    if topology_reader.graph.size > constants.ROUTE_INDEX_MAX_NODES:
+        return None, 0
+    path = f"{topology_reader.file}{INDEX_SUFFIX}"
+    digest = graph_digest(topology_reader.graph)
+    index = load_index(path)
+    if index is not None and index.digest == digest:
+        return index, 0
+    return build_index(topology_reader.graph, path, workers, index, constants.ROUTE_INDEX_PATCH_LIMIT)
+
+
+def main():
+    """
+    Command line entry point
+    """
+    from topology_reader import TopologyReader
+
+    parser = argparse.ArgumentParser(description="Shortest paths from a precomputed all-pairs route index")
+    parser.add_argument('--topology', default='./topology.txt', help="Topology file")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Processes building the index")
+    parser.add_argument('source', nargs='?', help="Source node name, only the index is built when omitted")
+    parser.add_argument('destination', nargs='?', help="Destination node name")
+    args = parser.parse_args()
+
+    reader = TopologyReader(args.topology)
+    if reader.nodes is None:
+        parser.error(f"{args.topology} is not a valid topology")
+    start = time.perf_counter()
+    index, computed = topology_index(reader, args.workers)
+    if index is None:
+        print(f"{args.topology} has more than {constants.ROUTE_INDEX_MAX_NODES} nodes, no route index is built")
+    elif computed:
+        print(f"Computed {computed} of {index.size} sources in {time.perf_counter() - start:.2f} s")
+    if args.source is None or args.destination is None:
+        if index is not None:
+            index.close()
+        return
+
+    indexes = {node: position for position, node in enumerate(reader.nodes)}
+    try:
+        source, destination = (indexes[name if name in indexes else f"{name}{constants.SERVER}"]
+                               for name in (args.source, args.destination))
+    except KeyError as error:
+        parser.error(f"Unknown node {error}")
+    if index is None:   # Answered with a single Dijkstra instead
+        result = NetworkAlgorithms.shortest_paths(reader.graph, source)
+        path, distance = result.path(destination), result.distance(destination)
+    else:
+        path, distance = index.path(source, destination), index.distance(source, destination)
+        index.close()
+    if not path:
+        print(f"{args.destination} is unreachable from {args.source}")
+    else:
+        print(f"{' -> '.join(reader.nodes[node] for node in path)} ({distance})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+# encoding: utf-8
+"""
+    route_worker.py
+    Authors: Mario Sarmientos, Randy Venegas, Pablo Ruiz 18259 (PingMaster99)
+    Version 1.0
+    Updated October 18, 2026
+
+    Route computation outside of the asyncio loop.
+    Shortest path trees and distance vector solves run in a thread or process pool so the XMPP
+    connection keeps answering pings and stanzas during big recomputes. Process workers receive the
+    CSR arrays of the graph through shared memory instead of pickled nested lists.
+"""
+
+import concurrent.futures
+from array import array
+from multiprocessing import shared_memory
+from graph import CSRGraph
+from routing_algorithms import NetworkAlgorithms
+
+
+class SharedGraph:
+    """
+    CSRGraph arrays copied once into a shared memory block that process workers map without copying
+    """
+    def __init__(self, graph):
+        """
+        Copies a graph into shared memory
+        :param graph: CSRGraph
+        """
+        offsets, targets, weights = (array('q', graph.offsets), array('q', graph.targets),
+                                     array('d', graph.weights))
+        self.size = graph.size
+        self.edges = len(targets)
+        self.memory = shared_memory.SharedMemory(create=True, size=max(1, 8 * (len(offsets) + 2 * self.edges)))
+        position = 0
+        for values in (offsets, targets, weights):
+            data = values.tobytes()
+            self.memory.buf[position:position + len(data)] = data
+            position += len(data)
+
+    @property
+    def reference(self):
+        """
+        :return: picklable (block name, nodes, links) tuple sent to the workers
+        """
+        return self.memory.name, self.size, self.edges
+
+    def release(self):
+        """
+        Frees the shared memory block
+        """
+        self.memory.close()
+        self.memory.unlink()
+
+
+def attach_graph(reference):
+    """
+    Maps a SharedGraph in a worker process
+    :param reference: SharedGraph.reference
+    :return: shared memory block and CSRGraph over it, the graph must be dropped before closing the block
+    """
+    name, size, edges = reference
+    memory = shared_memory.SharedMemory(name=name)
+    offsets_end = 8 * (size + 1)
+    targets_end = offsets_end + 8 * edges
+    graph = CSRGraph(size, memory.buf[:offsets_end].cast('q'), memory.buf[offsets_end:targets_end].cast('q'),
+                     memory.buf[targets_end:targets_end + 8 * edges].cast('d'))
+    return memory, graph
+
+
+def solve(job, graph, source):
+    """
+    Runs a route computation
+    :param job: 'shortest_paths' or 'distance_vector'
+    :param graph: CSRGraph
+    :param source: source node index
+    :return: RouteResult with its next hops for shortest_paths, (distances, next hops) for distance_vector
+    """
+    if job == 'shortest_paths':
+        result = NetworkAlgorithms.shortest_paths(graph, source)
+        result.next_hops    # Computed here so the loop does not have to
+        return result
+    return NetworkAlgorithms().bellman_ford(graph, source)
+
+
+def solve_shared(job, reference, source):
+    """
+    Process pool entry point, runs solve over a SharedGraph
+    """
+    memory, graph = attach_graph(reference)
+    try:
+        return solve(job, graph, source)
+    finally:
+        for values in (graph.offsets, graph.targets, graph.weights):
+            values.release()
+        del graph
+        memory.close()
+
+
+class RouteWorker:
+    """
+    Thread or process pool that runs route computations
+    """
+    def __init__(self, mode='thread', workers=1):
+        """
+        Initializes the pool
+        :param mode: 'thread' or 'process'
+        :param workers: number of workers
+        """
+        self.mode = mode
+        if mode == 'process':
+            self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        else:
+            self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers,
+                                                                  thread_name_prefix='route-worker')
+
+    def submit(self, job, graph, source):
+        """
+        Starts a route computation
+        :param job: 'shortest_paths' or 'distance_vector'
+        :param graph: CSRGraph, not modified while the computation runs
+        :param source: source node index
+        :return: concurrent.futures.Future
+        """
+        if self.mode != 'process':
+            return self.executor.submit(solve, job, graph, source)
+
+        shared_graph = SharedGraph(graph)
+        future = self.executor.submit(solve_shared, job, shared_graph.reference, source)
+        future.add_done_callback(lambda _: shared_graph.release())
+        return future
+
+    def close(self):
+        """
+        Stops the workers, pending computations are cancelled and running ones are waited for
+        """
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+workers = {}
+
+
+def default_worker(mode='thread', count=1):
+    """
+    Route worker shared by every node of the process
+    :param mode: 'thread' or 'process'
+    :param count: number of workers
+    :return: RouteWorker
+    """
+    worker = workers.get(mode)
+    if worker is None:
+        worker = workers[mode] = RouteWorker(mode, count)
+    return worker
@@ -10,129 +10,547 @@
     https://www.geeksforgeeks.org/printing-paths-dijkstras-shortest-path-algorithm/
 """
 
+from array import array
+from heapq import heappop, heappush
+from graph import INF, CSRGraph, as_csr, is_link
 
-class NetworkAlgorithms:
+try:
+    import numpy
+except ImportError:     # NumPy is optional, bellman_ford falls back to pure Python
+    numpy = None
+
+
+class NegativeCycleError(ValueError):
+    """
+    Raised when the distance vectors contain a negative cycle
+    """
+
+
+class RouteResult:
+    """
+    Shortest path tree of one source stored as flat distance and parent arrays.
+    Paths are only built for the destinations that are asked for.
+    """
+    __slots__ = ('source', 'distances', 'parents', '_next_hops')
+
+    def __init__(self, source, distances, parents, next_hops=None):
+        """
+        Initializes the result
+        :param source: source node
+        :param distances: array('d') of distances, infinite for unreachable nodes
+        :param parents: array('q') of parents, -1 for the source and unreachable nodes
+        :param next_hops: array('q') of next hops, computed on first use when omitted
+        """
+        self.source = source
+        self.distances = distances
+        self.parents = parents
+        self._next_hops = next_hops
+
+    def __len__(self):
+        return len(self.distances)
+
+    @property
+    def next_hops(self):
+        """
+        :return: next hop of every destination, the source maps to itself and unreachable nodes to -1
+        """
+        if self._next_hops is None:
+            self._next_hops = NetworkAlgorithms.next_hops(self.parents, self.source)
+        return self._next_hops
+
+    def distance(self, destination):
+        """
+        :return: distance to a destination, infinite if it is unreachable
+        """
+        return self.distances[destination]
 
-    def __init__(self):
-        self.shortest_path = []
-        self.current_path = []
-        print("Initializing")
+    def path(self, destination):
+        """
+        :return: list of node indexes from the source to a destination, empty if it is unreachable
+        """
+        if self.distances[destination] == INF:
+            return []
+        return NetworkAlgorithms.build_path(self.parents, destination)
 
-    def min_distance(self, dist, queue):
-        # Initialize min value and min_index as -1
-        minimum = float("Inf")
-        min_index = -1
 
-        # from the dist array,pick one which
-        # has min value and is till in queue
-        for i in range(len(dist)):
-            if dist[i] < minimum and i in queue:
-                minimum = dist[i]
-                min_index = i
-        return min_index
+class NetworkAlgorithms:
 
-    def link_state_routing(self, graph, destination, src=0):
+    def link_state_routing(self, graph, destination, src=0, bidirectional=False):
         """
         Function that implements Dijkstra's single source shortest path
-        algorithm for a graph represented using adjacency matrix
-        representation
+        algorithm with a binary heap over a CSR view of the graph.
+        The search stops as soon as the destination is settled.
 
-        :param graph: adjacency matrix
+        :param graph: adjacency matrix or CSRGraph
         :param destination: destination node
         :param src: source node
+        :param bidirectional: search from both ends at the same time (single pair queries)
         :return: path and distance
         """
-        print("got the funciton")
-        self.shortest_path.clear()
-        row = len(graph)
+        graph = as_csr(graph)
+        if bidirectional:
+            return self.bidirectional_dijkstra(graph, src, destination)
 
-        # All distances start with infinite value
-        dist = [float("Inf")] * row
+        result = self.shortest_paths(graph, src, destination)
+        return result.path(destination), result.distance(destination)
 
-        # Shortest path parent nodes
-        parent = [-1] * row
+    @staticmethod
+    def shortest_paths(graph, src, destination=None):
+        """
+        Shortest path tree of a source
+        :param graph: adjacency matrix or CSRGraph
+        :param src: source node
+        :param destination: node that ends the search once settled, the whole tree when omitted
+        :return: RouteResult
+        """
+        dist, parent = NetworkAlgorithms.dijkstra(graph, src, destination)
+        return RouteResult(src, dist, parent)
 
-        # Distance from initial vertex
+    @staticmethod
+    def dijkstra(graph, src, destination=None):
+        """
+        Heap based Dijkstra. Without a destination it computes the whole shortest path tree,
+        otherwise only the distances of settled nodes are final.
+        :param graph: adjacency matrix or CSRGraph
+        :param src: source node
+        :param destination: node that ends the search once settled
+        :return: distance array and parent array
+        """
+        graph = as_csr(graph)
+        offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+        dist = array('d', [INF]) * graph.size
+        parent = array('q', [-1]) * graph.size
+        settled = bytearray(graph.size)
         dist[src] = 0
-        self.shortest_path.append([src])
+        queue = [(0, src)]
 
-        # Add all vertices in queue
-        queue = [i for i in range(row)]
-        # Find shortest path for all vertices
         while queue:
-            # Pick the minimum dist vertex from vertices that are still in the queue
-            u = self.min_distance(dist, queue)
-
-            # remove min element
-            queue.remove(u)
-
-            # Update distance and parent index of the picked vertex of those in the queue.
-            for i in range(row):
-                '''Update dist[i] only if it is in queue, there is
-                an edge from u to i, and total weight of path from
-                src to i through u is smaller than current value of
-                dist[i]'''
-                if graph[u][i] and i in queue:
-                    if dist[u] + graph[u][i] < dist[i]:
-                        dist[i] = dist[u] + graph[u][i]
-                        parent[i] = u
-        # populate the shortest distance path
-        self.get_distance_path(dist, parent, src)
-        print("returning distance")
-        return self.shortest_path[destination], dist[destination]
-
-    # Populates the shortest distance path array
-    def get_path(self, parent, j):
-
-        # Base Case : If j is source
-        if parent[j] == -1:
-            self.current_path.append(j)
-            print(j)
-            return
-        self.get_path(parent, parent[j])
-        self.current_path.append(j)
-        print(j)
-
-    # A utility function to print
-    # the constructed distance
-    # array
-    def get_distance_path(self, dist, parent, src=0):
-        src = src
-        print(dist)
-        print("Vertex \t\tDistance from Source\tPath")
-        for i in range(1, len(dist)):
-            print("\n%d --> %d \t\t%d \t\t\t\t\t" % (src, i, dist[i])),
-            self.get_path(parent, i)
-            self.shortest_path.append(self.current_path.copy())
-            self.current_path.clear()
-        print("returning recursion")
+            distance, u = heappop(queue)
+            if settled[u]:
+                continue
+            settled[u] = 1
+            if u == destination:
+                break
+
+            for k in range(offsets[u], offsets[u + 1]):
+                v = targets[k]
+                new_distance = distance + weights[k]
+                if new_distance < dist[v]:
+                    dist[v] = new_distance
+                    parent[v] = u
+                    heappush(queue, (new_distance, v))
+        return dist, parent
+
+    @staticmethod
+    def bidirectional_dijkstra(graph, src, destination):
+        """
+        Single pair Dijkstra that grows one search from the source and another one
+        from the destination over the reversed graph until they meet
+        :param graph: adjacency matrix or CSRGraph
+        :param src: source node
+        :param destination: destination node
+        :return: path and distance
+        """
+        graph = as_csr(graph)
+        if src == destination:
+            return [src], 0
+
+        searches = []
+        for side, start in ((graph, src), (graph.reverse(), destination)):
+            dist = [INF] * graph.size
+            dist[start] = 0
+            searches.append((side, dist, [-1] * graph.size, bytearray(graph.size), [(0, start)]))
+
+        best = INF
+        meeting_node = -1
+        forward, backward = searches
+        while forward[4] and backward[4]:
+            if forward[4][0][0] + backward[4][0][0] >= best:
+                break
+
+            # Expand the side with the smaller frontier
+            current, other = (forward, backward) if len(forward[4]) <= len(backward[4]) else (backward, forward)
+            side, dist, parent, settled, queue = current
+            other_dist = other[1]
+
+            distance, u = heappop(queue)
+            if settled[u]:
+                continue
+            settled[u] = 1
+
+            for k in range(side.offsets[u], side.offsets[u + 1]):
+                v = side.targets[k]
+                new_distance = distance + side.weights[k]
+                if new_distance < dist[v]:
+                    dist[v] = new_distance
+                    parent[v] = u
+                    heappush(queue, (new_distance, v))
+                if new_distance + other_dist[v] < best:
+                    best = new_distance + other_dist[v]
+                    meeting_node = v
+
+        if meeting_node == -1:
+            return [], INF
+
+        path = NetworkAlgorithms.build_path(forward[2], meeting_node)
+        node = backward[2][meeting_node]
+        while node != -1:
+            path.append(node)
+            node = backward[2][node]
+        return path, best
+
+    @staticmethod
+    def k_shortest_paths(graph, src, destination, k):
+        """
+        Yen's algorithm: the k shortest loopless paths between two nodes. Every new path deviates from
+        one already found at a spur node, found with a search that avoids the links already used there.
+        :param graph: adjacency matrix or CSRGraph
+        :param src: source node
+        :param destination: destination node
+        :param k: maximum number of paths
+        :return: list of (distance, path) from the shortest to the longest
+        """
+        graph = as_csr(graph)
+        path, distance = NetworkAlgorithms.restricted_dijkstra(graph, src, destination)
+        if not path:
+            return []
+        paths = [(distance, path)]
+        found = {tuple(path)}
+        candidates = []
+        while len(paths) < k:
+            last = paths[-1][1]
+            root_distance = 0
+            for i in range(len(last) - 1):
+                spur, root = last[i], last[:i + 1]
+                blocked_links = {(previous[i], previous[i + 1]) for _, previous in paths
+                                 if len(previous) > i + 1 and previous[:i + 1] == root}
+                spur_path, spur_distance = NetworkAlgorithms.restricted_dijkstra(
+                    graph, spur, destination, set(root[:-1]), blocked_links)
+                if spur_path:
+                    path = root[:-1] + spur_path
+                    if tuple(path) not in found:
+                        found.add(tuple(path))
+                        heappush(candidates, (root_distance + spur_distance, path))
+                root_distance += graph.weight(spur, last[i + 1])
+            if not candidates:
+                break
+            paths.append(heappop(candidates))
+        return paths
+
+    @staticmethod
+    def restricted_dijkstra(graph, src, destination, blocked_nodes=(), blocked_links=()):
+        """
+        Single pair Dijkstra that may not enter some nodes or use some links, with sparse bookkeeping so
+        the many small searches of k_shortest_paths do not allocate arrays of the whole graph
+        :param graph: CSRGraph
+        :param src: source node
+        :param destination: destination node
+        :param blocked_nodes: set of nodes the path may not go through
+        :param blocked_links: set of (u, v) links the path may not use
+        :return: path and distance, empty path and infinite distance if there is none
+        """
+        offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+        dist = {src: 0}
+        parent = {src: -1}
+        settled = set()
+        queue = [(0, src)]
+        while queue:
+            distance, u = heappop(queue)
+            if u in settled:
+                continue
+            if u == destination:
+                path = []
+                while u != -1:
+                    path.append(u)
+                    u = parent[u]
+                path.reverse()
+                return path, distance
+            settled.add(u)
+            for k in range(offsets[u], offsets[u + 1]):
+                v = targets[k]
+                if v in blocked_nodes or v in settled or (u, v) in blocked_links:
+                    continue
+                new_distance = distance + weights[k]
+                if new_distance < dist.get(v, INF):
+                    dist[v] = new_distance
+                    parent[v] = u
+                    heappush(queue, (new_distance, v))
+        return [], INF
+
+    @staticmethod
+    def build_path(parent, destination):
+        """
+        Walks the parent list back from the destination
+        :param parent: parent list of a shortest path tree
+        :param destination: last node of the path
+        :return: list of node indexes from the source to the destination
+        """
+        path = []
+        node = destination
+        while node != -1:
+            path.append(node)
+            node = parent[node]
+        path.reverse()
+        return path
 
     # The main function that finds shortest distances from src to
     # all other vertices using Bellman-Ford algorithm.
     def bellman_ford(self, matrix, src):
-        matrix_size = len(matrix)
-        # Step 1: Initialize distances from src to all other vertices
-        # as INFINITE
-        dist = [float("Inf")] * matrix_size
+        """
+        Distance vector solver. Every iteration relaxes all the links at once and the
+        solver stops as soon as an iteration does not change any distance.
+        Uses NumPy when it is installed and a pure Python solver otherwise.
+        :param matrix: distance vector matrix (0 and infinite entries are not links) or CSRGraph
+        :param src: source node
+        :return: distance list and next hop list (-1 for unreachable nodes)
+        """
+        if numpy is not None and isinstance(matrix, CSRGraph):
+            dist, parent = self.bellman_ford_numpy_sparse(matrix, src)
+        elif numpy is not None:
+            dist, parent = self.bellman_ford_numpy(matrix, src)
+        else:
+            dist, parent = self.bellman_ford_python(matrix, src)
+        return dist, self.next_hops(parent, src)
+
+    @staticmethod
+    def bellman_ford_numpy(matrix, src):
+        """
+        Bellman-Ford as batched min-plus products over the whole matrix
+        :param matrix: adjacency or distance vector matrix
+        :param src: source node
+        :return: distance list and parent list
+        """
+        weights = numpy.array(matrix, dtype=float)
+        weights[weights == 0] = numpy.inf
+        numpy.fill_diagonal(weights, numpy.inf)
+        size = len(weights)
+        columns = numpy.arange(size)
+
+        dist = numpy.full(size, numpy.inf)
         dist[src] = 0
+        parent = numpy.full(size, -1, dtype=numpy.int64)
+
+        # A simple path has at most |V| - 1 links, a change in iteration |V| means a negative cycle
+        for _ in range(size):
+            candidates = dist[:, None] + weights
+            best_parent = candidates.argmin(axis=0)
+            best = candidates[best_parent, columns]
+            improved = best < dist
+            if not improved.any():
+                return dist.tolist(), parent.tolist()
+            dist[improved] = best[improved]
+            parent[improved] = best_parent[improved]
+        raise NegativeCycleError(f"Negative cycle reachable from node {src}")
+
+    @staticmethod
+    def bellman_ford_numpy_sparse(graph, src):
+        """
+        Bellman-Ford relaxing every link of a CSR graph with one vector operation per iteration
+        :param graph: CSRGraph
+        :param src: source node
+        :return: distance list and parent list
+        """
+        offsets = numpy.asarray(graph.offsets, dtype=numpy.int64)
+        sources = numpy.repeat(numpy.arange(graph.size), numpy.diff(offsets))
+        targets = numpy.asarray(graph.targets, dtype=numpy.int64)
+        weights = numpy.asarray(graph.weights, dtype=float)
+
+        dist = numpy.full(graph.size, numpy.inf)
+        dist[src] = 0
+        parent = numpy.full(graph.size, -1, dtype=numpy.int64)
+
+        for _ in range(graph.size):
+            candidates = dist[sources] + weights
+            best = dist.copy()
+            numpy.minimum.at(best, targets, candidates)
+            improved = best < dist
+            if not improved.any():
+                return dist.tolist(), parent.tolist()
+            # Any link that reaches the new minimum of an improved node is a valid parent
+            winners = improved[targets] & (candidates == best[targets])
+            parent[targets[winners]] = sources[winners]
+            dist = best
+        raise NegativeCycleError(f"Negative cycle reachable from node {src}")
+
+    @staticmethod
+    def bellman_ford_python(matrix, src):
+        """
+        Pure Python Bellman-Ford over the sparse links of the matrix
+        :param matrix: adjacency or distance vector matrix
+        :param src: source node
+        :return: distance list and parent list
+        """
+        graph = as_csr(matrix)
+        offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+        dist = [INF] * graph.size
+        parent = [-1] * graph.size
+        dist[src] = 0
+
+        for _ in range(graph.size):
+            changed = False
+            for u in range(graph.size):
+                distance = dist[u]
+                if distance == INF:
+                    continue
+                for k in range(offsets[u], offsets[u + 1]):
+                    v = targets[k]
+                    new_distance = distance + weights[k]
+                    if new_distance < dist[v]:
+                        dist[v] = new_distance
+                        parent[v] = u
+                        changed = True
+            if not changed:
+                return dist, parent
+        raise NegativeCycleError(f"Negative cycle reachable from node {src}")
+
+    @staticmethod
+    def next_hops(parent, src):
+        """
+        First node after the source on the path to every destination
+        :param parent: parent list of a shortest path tree
+        :param src: source node
+        :return: next hop array, the source maps to itself and unreachable nodes to -1
+        """
+        hops = array('q', [-1]) * len(parent)
+        hops[src] = src
+        for node in range(len(parent)):
+            if hops[node] != -1 or parent[node] == -1:
+                continue
+            chain = []
+            current = node
+            while hops[current] == -1:
+                chain.append(current)
+                current = parent[current]
+            hop = chain[-1] if current == src else hops[current]
+            for visited in chain:
+                hops[visited] = hop
+        return hops
+
+
+class ShortestPathTree:
+    """
+    Shortest path tree of one source kept up to date as single links change, in the style of the
+    Ramalingam-Reps dynamic shortest path algorithm. Only the part of the tree whose distances can
+    change is repaired, so the work follows the size of the affected region instead of the graph.
+    """
+    def __init__(self, graph, src, result=None):
+        """
+        Initializes the tree
+        :param graph: adjacency matrix or CSRGraph
+        :param src: source node
+        :param result: RouteResult of an already computed tree, copied, computed when omitted
+        """
+        graph = as_csr(graph)
+        self.src = src
+        self.size = graph.size
+        self.out_links = [{} for _ in range(graph.size)]
+        self.in_links = [{} for _ in range(graph.size)]
+        for u, v, weight in graph.edges():
+            if u != v and weight < self.out_links[u].get(v, INF):
+                self.out_links[u][v] = weight
+                self.in_links[v][u] = weight
 
-        # Step 2: Relax all edges |V| - 1 times. A simple shortest
-        # path from src to any other vertex can have at-most |V| - 1
-        # edges
-        for _ in range(matrix_size - 1):
-            # Update dist value and parent index of the adjacent vertices of
-            # the picked vertex. Consider only those vertices which are still in
-            # queue
-            for row in matrix:
-                for column in matrix:
-                    if dist[row] != float("Inf") and dist[row] + matrix[row][column] < dist[column]:
-                        dist[column] = dist[row] + matrix[row][column]
-
-        # print all distance
-        self.printArr(dist, matrix)
-
-    def printArr(self, dist, matrix):
-        print("Vertex Distance from Source")
-        for i in range(len(matrix)):
-            print("{0}\t\t{1}".format(i, dist[i]))
+        if result is None:
+            result = NetworkAlgorithms.shortest_paths(graph, src)
+        self.distances = array('d', result.distances)
+        self.parents = array('q', result.parents)
+        self.next_hops = array('q', result.next_hops)
+        self.children = [set() for _ in range(graph.size)]
+        for node, parent in enumerate(self.parents):
+            if parent >= 0:
+                self.children[parent].add(node)
 
+    def update_link(self, u, v, weight):
+        """
+        Changes the weight of the link u -> v and repairs the tree
+        :param u: source of the link
+        :param v: target of the link
+        :param weight: new weight, 0 or infinite deletes the link and a missing link is inserted
+        :return: set of destinations whose next hop changed
+        """
+        old_weight = self.out_links[u].get(v, INF)
+        if is_link(weight) and u != v:
+            self.out_links[u][v] = weight
+            self.in_links[v][u] = weight
+        else:
+            self.out_links[u].pop(v, None)
+            self.in_links[v].pop(u, None)
+            weight = INF
+
+        if weight < old_weight:
+            if self.distances[u] + weight >= self.distances[v]:
+                return set()
+            return self.settle([(self.distances[u] + weight, v, u)], None)
+        if weight > old_weight and self.parents[v] == u:
+            return self.increase(v)
+        return set()
+
+    def increase(self, root):
+        """
+        Repairs the subtree hanging from a node whose tree link got more expensive or was deleted
+        :param root: node whose parent link changed
+        :return: set of destinations whose next hop changed
+        """
+        subtree = [root]
+        for node in subtree:
+            subtree.extend(self.children[node])
+        affected = set(subtree)
+        previous_hops = {node: self.next_hops[node] for node in subtree}
+
+        for node in subtree:
+            self.set_parent(node, -1)
+            self.distances[node] = INF
+            self.next_hops[node] = -1
+
+        # Best way into every affected node from the part of the tree that did not change
+        queue = []
+        for node in subtree:
+            for u, weight in self.in_links[node].items():
+                if u not in affected and self.distances[u] != INF:
+                    queue.append((self.distances[u] + weight, node, u))
+        queue.sort()
+        self.settle(queue, affected)
+        return {node for node in subtree if self.next_hops[node] != previous_hops[node]}
+
+    def settle(self, queue, region):
+        """
+        Dijkstra from tentative (distance, node, parent) entries, relaxing only improvements
+        :param queue: heap ordered candidate entries
+        :param region: set of nodes the search may enter, every node when None
+        :return: set of settled destinations whose next hop changed
+        """
+        distances, next_hops, out_links = self.distances, self.next_hops, self.out_links
+        changed = set()
+        while queue:
+            distance, node, parent = heappop(queue)
+            if distance >= distances[node]:
+                continue
+            previous_hop = next_hops[node]
+            distances[node] = distance
+            self.set_parent(node, parent)
+            next_hops[node] = node if parent == self.src else next_hops[parent]
+            if next_hops[node] != previous_hop:
+                changed.add(node)
+            for v, weight in out_links[node].items():
+                if distance + weight < distances[v] and (region is None or v in region):
+                    heappush(queue, (distance + weight, v, node))
+        return changed
+
+    def set_parent(self, node, parent):
+        """
+        Moves a node under a new parent of the tree
+        :param node: node index
+        :param parent: new parent, -1 to detach it
+        """
+        previous = self.parents[node]
+        if previous >= 0:
+            self.children[previous].discard(node)
+        self.parents[node] = parent
+        if parent >= 0:
+            self.children[parent].add(node)
+
+    def result(self):
+        """
+        :return: RouteResult over the arrays of the tree, it follows later updates of the tree
+        """
+        return RouteResult(self.src, self.distances, self.parents, self.next_hops)
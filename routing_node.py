@@ -0,0 +1,863 @@
+# encoding: utf-8
+"""
+    routing_node.py
+    Authors: Mario Sarmientos, Randy Venegas, Pablo Ruiz 18259 (PingMaster99)
+    Version 1.0
+    Updated October 18, 2026
+
+    Routing behaviour of a node, independent of the transport.
+    Classes using it must provide send_message(mto, mbody, mtype) and an asyncio loop in self.loop, and
+    probe_link(jid, timeout) returning the round trip time to a neighbor for adaptive link weights.
+    MessengerAccount uses it over XMPP and the simulator over an in-memory transport.
+"""
+
+import logging
+import random
+import time
+import constants
+import metrics
+from graph import INF, CSRGraph, is_link
+from hierarchy import HierarchicalRoutes, shared_areas
+from link_monitor import LinkMonitor
+from routing_algorithms import NetworkAlgorithms, NegativeCycleError, ShortestPathTree
+from route_cache import RouteCache
+from distance_vector import DistanceVectorTable
+from message_codec import MessageCodec, Envelope, CodecError, DVR, FLOODING, LINK_STATE, DVR_UPDATE, LSA, \
+    MESSAGE, CHUNK, CHUNK_ACK, ALGORITHM_NAMES, peek_message_id
+from flooding import SeenCache, SequenceCounter
+from link_state import LinkStateDatabase, SpfThrottle, newer
+from multipath import MultipathTable
+from outbound import OutboundScheduler
+from route_worker import default_worker
+from transfer import TransferManager
+
+log = logging.getLogger(__name__)
+
+
+class RoutingNode:
+    """
+    Routing state and message handling of a node of the topology
+    """
+    delivery_callback = None    # Function(envelope) that replaces printing delivered messages
+
+    def setup_routing(self, jid, topology_reader):
+        """
+        Initializes the routing state
+        :param jid: jid of the node
+        :param topology_reader: TopologyReader with the network topology
+        """
+        self.topology_reader = topology_reader
+        self.nodes = topology_reader.nodes
+        self.graph = topology_reader.graph
+        self.node_number = self.nodes.index(jid)
+        # Built from the sparse graph so no dense matrix is allocated, the row is the node's own copy.
+        # Duplicate links keep the cheapest weight, like the routing algorithms do.
+        self.adjacent_node_weights = [INF] * len(self.nodes)
+        self.adjacent_node_weights[self.node_number] = 0
+        for neighbor, weight in self.graph.neighbors(self.node_number):
+            self.adjacent_node_weights[neighbor] = min(weight, self.adjacent_node_weights[neighbor])
+        self.adjacent_names = self.neighbor_names()
+        # Vectors received from the neighbors, only used when DVR is solved from scratch
+        self.dvr_vectors = {}
+        self.dvr_min_distances = []
+        self.dvr_next_hops = []
+
+        max_distance = constants.DVR_MAX_DISTANCE or len(self.nodes) * topology_reader.heaviest_link
+        self.dvr_table = DistanceVectorTable(self.node_number, self.adjacent_node_weights, max_distance)
+        self.dvr_update_handle = None
+        if constants.DVR_INCREMENTAL:
+            self.dvr_min_distances = list(self.dvr_table.distances)
+            self.dvr_next_hops = list(self.dvr_table.next_hops)
+        self.codec = MessageCodec(self.nodes, constants.MESSAGE_FORMAT)
+        self.flood_seen = SeenCache(constants.FLOOD_CACHE_SIZE, constants.FLOOD_CACHE_LIFETIME)
+        # Random start so a restarted node does not reuse ids its neighbors still remember
+        self.flood_sequence = SequenceCounter(random.getrandbits(32))
+
+        self.routing_algorithm = NetworkAlgorithms()
+        self.topology_version = 0
+        self.route_cache = RouteCache()
+        self.fib = {}
+        self.fib_version = None
+        self.route_worker = None
+        if constants.ROUTE_WORKER != 'inline':
+            self.route_worker = default_worker(constants.ROUTE_WORKER, constants.ROUTE_WORKERS)
+        self.route_solve = None
+        self.route_solve_version = None
+        self.dvr_solve = None
+        self.dvr_version = 0
+
+        self.lsdb = LinkStateDatabase(self.graph, constants.LSA_MAX_AGE)
+        self.lsa_sequence = SequenceCounter(0)
+        self.lsa_refresh_handle = None
+        self.spf_throttle = SpfThrottle(constants.SPF_INITIAL_DELAY, constants.SPF_HOLD, constants.SPF_MAX_HOLD)
+        self.spf_handle = None
+        self.spt = None
+        self.hierarchy = None
+        if constants.AREA_SIZE:
+            self.hierarchy = HierarchicalRoutes(shared_areas(self.graph, constants.AREA_SIZE), self.node_number)
+        self.multipath = None
+        if constants.MULTIPATH_PATHS > 1:
+            self.multipath = MultipathTable(constants.MULTIPATH_PATHS, constants.MULTIPATH_STRETCH)
+        self.transfers = TransferManager(self, constants.TRANSFER_CHUNK_SIZE, constants.TRANSFER_WINDOW,
+                                         constants.TRANSFER_TIMEOUT, constants.TRANSFER_RETRIES,
+                                         constants.TRANSFER_DIRECTORY, constants.TRANSFER_MAX_INCOMING,
+                                         constants.TRANSFER_MAX_SIZE, constants.TRANSFER_IDLE_TIMEOUT)
+
+        self.link_monitor = None
+        if constants.LINK_PROBE_INTERVAL:
+            self.link_monitor = LinkMonitor(self, self.probe_link, constants.LINK_PROBE_INTERVAL,
+                                            constants.LINK_PROBE_TIMEOUT, constants.LINK_RTT_ALPHA,
+                                            constants.LINK_COST_UNIT, constants.LINK_COST_THRESHOLD,
+                                            constants.LINK_HOLD_DOWN, constants.LINK_DOWN_LOSS)
+
+        self.outbound = None
+        if constants.OUTBOUND_QUEUES:
+            self.outbound = OutboundScheduler(
+                lambda jid, body: self.send_message(jid, body, mtype='chat'), self.encode_distance_vector,
+                loop=self.loop, queue_size=constants.OUTBOUND_QUEUE_SIZE, batch_delay=constants.OUTBOUND_BATCH_DELAY,
+                rate=constants.OUTBOUND_RATE, full_control=self.full_distance_vector)
+
+        self.setup_metrics(metrics.REGISTRY)
+
+    def setup_metrics(self, registry):
+        """
+        Creates the forwarding path metrics. Timers are only read when the registry is enabled.
+        :param registry: metrics.Registry shared by the nodes of the process
+        """
+        self.metrics_enabled = registry.enabled
+        self.parse_time = registry.histogram('routing_parse_seconds', "Time spent decoding a routed message")
+        self.route_lookup_time = registry.histogram('routing_route_lookup_seconds',
+                                                    "Time spent choosing the next hop of a message")
+        self.forward_time = registry.histogram('routing_forward_seconds',
+                                               "Time spent encoding and queueing a message for its next hops")
+        self.queue_depth = registry.histogram('routing_queue_depth', "Messages waiting in a neighbor queue",
+                                              metrics.COUNT_BUCKETS)
+        self.message_count = registry.counter('routing_messages_total', "Routed messages handled", 'algorithm')
+        self.drop_count = registry.counter('routing_dropped_total',
+                                           "Messages dropped because the queue of their next hop was full")
+        self.hop_histogram = registry.histogram('routing_hops', "Links traversed by delivered messages",
+                                                metrics.COUNT_BUCKETS)
+        self.latency = registry.histogram('routing_end_to_end_seconds',
+                                          "Time from the origin sending a message to its delivery")
+
+    @property
+    def matrix(self):
+        """
+        Dense adjacency matrix of the topology file, only built when something asks for it
+        :return: list of rows or None above DENSE_MATRIX_LIMIT nodes
+        """
+        return self.topology_reader.adjacency_matrix
+
+    def stop_routing(self):
+        """
+        Cancels the routing timers and the outbound sender tasks
+        """
+        for handle in (self.dvr_update_handle, self.spf_handle, self.lsa_refresh_handle, self.route_solve,
+                       self.dvr_solve):
+            if handle is not None:
+                handle.cancel()
+        self.dvr_update_handle = self.spf_handle = self.lsa_refresh_handle = self.route_solve = self.dvr_solve = None
+        if self.outbound is not None:
+            self.outbound.close()
+        if self.link_monitor is not None:
+            self.link_monitor.close()
+        self.transfers.close()
+
+    def neighbor_names(self):
+        """
+        :return: jids of the nodes this node has a link to
+        """
+        return [self.nodes[node_index] for node_index, weight in enumerate(self.adjacent_node_weights)
+                if node_index != self.node_number and is_link(weight)]
+
+    def forwarding_table(self):
+        """
+        Link state forwarding table, rebuilt from the shortest path tree only when the tree changed
+        :return: dictionary of destination index -> jid of the next hop
+        """
+        self.ensure_routes()
+        if self.fib_version != self.route_cache.version:
+            self.fib = {destination: self.nodes[hop] for destination, hop in enumerate(self.route_cache.next_hops)
+                        if hop >= 0 and destination != self.node_number}
+            self.fib_version = self.route_cache.version
+        return self.fib
+
+    def link_state_route(self, destination):
+        """
+        Next hop of a destination only link state message, from the area routes in hierarchical mode
+        :param destination: destination node index
+        :return: jid of the next hop or None if the destination is unreachable, and the distance
+        """
+        if self.hierarchy is None:
+            return self.forwarding_table().get(destination), self.route_cache.distances[destination]
+        if self.hierarchy.version != self.topology_version:
+            self.hierarchy.compute(self.graph, self.topology_version)
+        hop, distance = self.hierarchy.route(destination)
+        if hop < 0 or destination == self.node_number:
+            return None, distance
+        return self.nodes[hop], distance
+
+    def ensure_routes(self):
+        """
+        Brings the shortest path tree up to date. With a route worker the new tree is computed in the
+        background and the previous one keeps answering lookups until it arrives, only the first tree
+        is computed on the loop.
+        """
+        cache = self.route_cache
+        if cache.version == self.topology_version and cache.source == self.node_number:
+            return
+        if self.route_worker is None or cache.version is None:
+            cache.refresh(self.graph, self.node_number, self.topology_version)
+        elif self.route_solve_version != self.topology_version:
+            self.submit_route_solve()
+
+    def submit_route_solve(self):
+        """
+        Starts computing the shortest path tree of the current topology in the route worker
+        """
+        if self.route_solve is not None:
+            self.route_solve.cancel()
+        version = self.topology_version
+        self.route_solve = self.route_worker.submit('shortest_paths', self.graph, self.node_number)
+        self.route_solve_version = version
+        graph = self.graph
+        self.route_solve.add_done_callback(
+            lambda future: self.call_on_loop(self.route_solved, future, graph, version))
+
+    def route_solved(self, future, graph, version):
+        """
+        Installs a shortest path tree computed by the route worker, runs on the loop
+        :param future: finished computation
+        :param graph: graph the tree was computed on
+        :param version: topology version it was computed for
+        """
+        if future is self.route_solve:
+            self.route_solve = None
+            self.route_solve_version = None
+        # A tree older than the topology is still newer than the cached one, a newer solve replaces it
+        if future.cancelled() or (self.route_cache.version is not None and version <= self.route_cache.version):
+            return
+        self.route_cache.install(graph, version, future.result())
+        self.forwarding_table()
+
+    def call_on_loop(self, callback, *args):
+        """
+        Runs a callback on the node's loop from a worker thread, ignored once the loop is closed
+        """
+        try:
+            self.loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            pass
+
+    def transmit(self, jid, body, mtype='chat'):
+        """
+        Sends a message to a neighbor through its outbound queue when queues are enabled. A full queue first
+        gives up its pending distance vector update, the message is only dropped, and counted, without one.
+        :param jid: jid of the neighbor
+        :param body: message body
+        :param mtype: message type
+        """
+        if self.outbound is None:
+            self.send_message(jid, body, mtype=mtype)
+        elif not self.outbound.put_nowait(jid, body):
+            self.drop_count.inc()
+            log.warning("Outbound queue to %s is full, message dropped", jid)
+        elif self.metrics_enabled:
+            self.queue_depth.observe(len(self.outbound.queues[jid].messages))
+
+    def forward(self, jid, envelope):
+        """
+        Encodes an envelope and sends it to the next hop
+        :param jid: jid of the next hop
+        :param envelope: envelope to send
+        """
+        if not self.metrics_enabled:
+            self.transmit(jid, self.codec.encode(envelope), mtype='chat')
+            return
+        start = time.perf_counter()
+        self.transmit(jid, self.codec.encode(envelope), mtype='chat')
+        self.forward_time.observe(time.perf_counter() - start)
+
+    def topology_changed(self):
+        """
+        Marks the topology as changed so cached routes are recomputed on the next lookup.
+        Must be called after replacing self.graph or modifying the DVR state.
+        """
+        self.topology_version += 1
+        if self.route_solve is not None:
+            self.route_solve.cancel()     # Only succeeds if the solve did not start yet
+
+    def receive_routed_message(self, body, received_from):
+        """
+        Handles a routed message: delivers it, forwards it or applies the routing update it carries
+        :param body: message body
+        :param received_from: bare jid of the neighbor that sent the message
+        """
+        timed = self.metrics_enabled
+        if timed:
+            start = time.perf_counter()
+
+        message_id = peek_message_id(body)
+        if message_id is not None and message_id[0] == FLOODING and \
+                self.flood_seen.check_and_add(message_id[1:]):
+            return
+
+        try:
+            envelope = self.codec.decode(body)
+        except CodecError:
+            print(f"Message received from {received_from}: {body}")
+            return
+
+        if timed:
+            lookup_start = time.perf_counter()
+            self.parse_time.observe(lookup_start - start)
+            self.message_count.inc(ALGORITHM_NAMES.get(envelope.algorithm, envelope.algorithm))
+
+        if envelope.algorithm in (DVR_UPDATE, LSA):
+            try:
+                if envelope.algorithm == DVR_UPDATE:    # DVR updates are addressed to the neighbor itself
+                    self.receive_distance_vector(envelope)
+                else:
+                    self.receive_link_state(envelope, received_from)
+            except CodecError as error:
+                log.warning("Dropped routing update from %s: %s", received_from, error)
+
+        elif envelope.algorithm == FLOODING and message_id is None and \
+                self.flood_seen.check_and_add(envelope.message_id):
+            return
+
+        elif envelope.destination == self.node_number and envelope.kind == CHUNK:
+            self.transfers.receive_chunk(envelope)
+
+        elif envelope.destination == self.node_number and envelope.kind == CHUNK_ACK:
+            self.transfers.receive_ack(envelope)
+
+        elif envelope.destination == self.node_number:
+            if timed:
+                self.hop_histogram.observe(self.hop_count(envelope))
+                if envelope.timestamp:
+                    self.latency.observe(max(0.0, time.time() - envelope.timestamp))
+            self.message_delivered(envelope)
+
+        elif envelope.algorithm == FLOODING:
+            self.flood(envelope, received_from)
+
+        elif envelope.algorithm == LINK_STATE and envelope.path:
+            message_destinatary_index = envelope.path.pop(0)
+            envelope.visited.append(message_destinatary_index)
+            message_destinatary = self.nodes[message_destinatary_index]
+            if timed:
+                self.route_lookup_time.observe(time.perf_counter() - lookup_start)
+            log.debug("Forwarding message to node %s", message_destinatary)
+            self.forward(message_destinatary, envelope)
+
+        elif envelope.algorithm == LINK_STATE:     # Destination only header
+            message_destinatary, _ = self.link_state_route(envelope.destination)
+            if timed:
+                self.route_lookup_time.observe(time.perf_counter() - lookup_start)
+            if message_destinatary is None or envelope.ttl <= 0:
+                log.debug("Dropping message to node %s, no route or TTL expired", envelope.destination)
+                return
+            envelope.ttl -= 1
+            self.forward(message_destinatary, envelope)
+
+        elif envelope.algorithm == DVR and self.dvr_next_hops and self.dvr_next_hops[envelope.destination] >= 0:
+            message_destinatary = self.nodes[self.dvr_next_hops[envelope.destination]]
+            if timed:
+                self.route_lookup_time.observe(time.perf_counter() - lookup_start)
+            if envelope.ttl <= 0:
+                log.debug("Dropping message to node %s, TTL expired", envelope.destination)
+                return
+            envelope.ttl -= 1
+            envelope.visited.append(self.node_number)
+            log.debug("Forwarding message to node %s", message_destinatary)
+            self.forward(message_destinatary, envelope)
+
+    def message_delivered(self, envelope):
+        """
+        Called when a routed message reaches this node, hands it to delivery_callback when one is set
+        :param envelope: delivered envelope
+        """
+        if self.delivery_callback is not None:
+            self.delivery_callback(envelope)
+            return
+        print(f"Message received from {self.nodes[envelope.sender]}: {envelope.text}")
+
+    def transfer_received(self, sender, path, size):
+        """
+        Called when a streamed transfer to this node is complete
+        :param sender: jid of the sender node
+        :param path: file the payload was written to
+        :param size: payload size in bytes
+        """
+        print(f"File received from {sender}: {path} ({size} bytes)")
+
+    @staticmethod
+    def hop_count(envelope):
+        """
+        Number of links a delivered message went through
+        :param envelope: delivered envelope
+        :return: hops
+        """
+        if envelope.algorithm == FLOODING:
+            return constants.FLOOD_TTL - envelope.ttl
+        if envelope.algorithm == LINK_STATE and not envelope.visited:
+            return constants.LINK_STATE_TTL - envelope.ttl
+        if envelope.algorithm == LINK_STATE and len(envelope.visited) > 1:
+            return len(envelope.visited) - 1
+        return len(envelope.visited)
+
+    def schedule_dvr_update(self):
+        """
+        Schedules one recompute for all the distance vectors received during the debounce window
+        """
+        if self.dvr_update_handle is None:
+            self.dvr_update_handle = self.loop.call_later(constants.DVR_DEBOUNCE, self.apply_dvr_updates)
+
+    def apply_dvr_updates(self):
+        """
+        Applies the queued distance vectors and sends the changed entries to the neighbors
+        """
+        self.dvr_update_handle = None
+        if not self.dvr_table.apply_pending():
+            return
+        self.dvr_min_distances = list(self.dvr_table.distances)
+        self.dvr_next_hops = list(self.dvr_table.next_hops)
+        self.topology_changed()
+        log.info("The new minimum distances are: %s", self.dvr_min_distances)
+        self.send_dvr_update()
+
+    def send_dvr_update(self):
+        """
+        Sends a triggered update with the entries that changed since the last advertisement
+        """
+        entries = self.dvr_table.triggered_update()
+        if entries:
+            self.send_distance_vector(entries)
+
+    def send_distance_vector(self, entries):
+        """
+        Sends distance vector entries to every neighbor
+        :param entries: dictionary of destination index -> distance
+        """
+        if self.outbound is not None:
+            for node in self.adjacent_names:
+                self.outbound.put_control(node, entries)
+            return
+
+        for node in self.adjacent_names:
+            self.send_message(node, self.encode_distance_vector(node, entries), mtype='chat')
+
+    def full_distance_vector(self, node):
+        """
+        Every entry of this node's distance vector, sent again to a neighbor whose pending update was evicted
+        :param node: jid of the neighbor
+        :return: dictionary of destination index -> distance
+        """
+        if constants.DVR_INCREMENTAL:
+            return dict(enumerate(self.dvr_table.distances))
+        return dict(enumerate(self.adjacent_node_weights))
+
+    def encode_distance_vector(self, node, entries):
+        """
+        Builds a distance vector update for a neighbor
+        :param node: jid of the neighbor
+        :param entries: dictionary of destination index -> distance
+        :return: message body
+        """
+        neighbor = self.codec.node_indexes[node]
+        if constants.DVR_INCREMENTAL:
+            # Poisoned reverse: routes through the neighbor are advertised to it as unreachable
+            entries = {destination: INF if self.dvr_next_hops[destination] == neighbor else distance
+                       for destination, distance in entries.items()}
+        envelope = Envelope(self.node_number, neighbor, DVR_UPDATE,
+                            payload=self.codec.encode_vector(entries))
+        return self.codec.encode(envelope)
+
+    def receive_distance_vector(self, envelope):
+        """
+        Updates the distance vector state with a vector received from a neighbor
+        :param envelope: DVR update envelope
+        """
+        entries = self.codec.decode_vector(envelope)
+        if constants.DVR_INCREMENTAL:
+            self.dvr_table.receive(envelope.sender, entries)
+            self.schedule_dvr_update()
+            return
+
+        # Only reachable destinations are stored, a vector replaces the previous one of its sender
+        distance_vector = {destination: distance for destination, distance in entries.items()
+                           if destination != envelope.sender and is_link(distance)}
+        if self.dvr_vectors.get(envelope.sender) == distance_vector:
+            return
+        self.dvr_vectors[envelope.sender] = distance_vector
+        self.solve_distance_vectors(envelope.sender)
+
+    def solve_distance_vectors(self, sender):
+        """
+        Solves the received distance vectors from scratch, in the route worker when there is one
+        :param sender: index of the node whose vector or link changed
+        """
+        self.dvr_version += 1
+        if self.route_worker is not None:
+            self.submit_distance_vector_solve(sender)
+            return
+        try:
+            result = self.routing_algorithm.bellman_ford(self.distance_vector_graph(), self.node_number)
+        except NegativeCycleError:
+            print(f"Distance vector from {self.nodes[sender]} creates a negative cycle")
+            return
+        self.apply_distance_vector_solve(result)
+
+    def distance_vector_graph(self):
+        """
+        Graph of the received distance vectors: the node's own links plus a link from every neighbor to
+        each destination it advertised, weighted with the advertised distance
+        :return: CSRGraph
+        """
+        edges = [(self.node_number, neighbor, weight) for neighbor, weight in enumerate(self.adjacent_node_weights)
+                 if neighbor != self.node_number and is_link(weight)]
+        for sender, vector in self.dvr_vectors.items():
+            edges.extend((sender, destination, distance) for destination, distance in vector.items())
+        return CSRGraph.from_edges(len(self.nodes), edges)
+
+    def submit_distance_vector_solve(self, sender):
+        """
+        Starts solving the distance vector matrix in the route worker, replacing a solve of an older matrix
+        :param sender: index of the neighbor whose vector changed the matrix
+        """
+        if self.dvr_solve is not None:
+            self.dvr_solve.cancel()
+        version = self.dvr_version
+        self.dvr_solve = self.route_worker.submit('distance_vector', self.distance_vector_graph(), self.node_number)
+        self.dvr_solve.add_done_callback(
+            lambda future: self.call_on_loop(self.distance_vector_solved, future, version, sender))
+
+    def distance_vector_solved(self, future, version, sender):
+        """
+        Applies a distance vector solve computed by the route worker unless the matrix changed since
+        """
+        if future is self.dvr_solve:
+            self.dvr_solve = None
+        if future.cancelled() or version != self.dvr_version:
+            return
+        try:
+            result = future.result()
+        except NegativeCycleError:
+            print(f"Distance vector from {self.nodes[sender]} creates a negative cycle")
+            return
+        self.apply_distance_vector_solve(result)
+
+    def apply_distance_vector_solve(self, result):
+        """
+        Stores the distances and next hops of a distance vector solve
+        :param result: (distances, next hops) from bellman_ford
+        """
+        current_min_distances, self.dvr_next_hops = list(result[0]), list(result[1])
+        if current_min_distances != self.dvr_min_distances:
+            self.dvr_min_distances = current_min_distances
+            self.topology_changed()
+            log.info("The new minimum distances are: %s", self.dvr_min_distances)
+
+    def update_link(self, jid, weight):
+        """
+        Changes the weight of one of this node's links at runtime and advertises it
+        :param jid: jid of the neighbor
+        :param weight: new weight, 0 or infinite removes the link
+        """
+        self.update_links({jid: weight})
+
+    def update_links(self, weights):
+        """
+        Changes the weights of several of this node's links and advertises them together
+        :param weights: dictionary of neighbor jid -> new weight, 0 or infinite removes the link
+        """
+        restored = []
+        changed = set()
+        for jid, weight in weights.items():
+            neighbor = self.codec.node_indexes[jid]
+            if not is_link(self.adjacent_node_weights[neighbor]) and is_link(weight):
+                restored.append(jid)
+            self.adjacent_node_weights[neighbor] = weight
+            if constants.DVR_INCREMENTAL:
+                changed |= self.dvr_table.set_link_cost(neighbor, weight)
+        self.adjacent_names = self.neighbor_names()
+
+        if constants.DVR_INCREMENTAL:
+            if changed:
+                self.dvr_min_distances = list(self.dvr_table.distances)
+                self.dvr_next_hops = list(self.dvr_table.next_hops)
+                self.topology_changed()
+                self.send_dvr_update()
+            # A link that comes back gets the whole vector, the neighbor dropped it when the link went down
+            entries = dict(enumerate(self.dvr_table.distances))
+            for jid in restored:
+                if self.outbound is not None:
+                    self.outbound.put_control(jid, entries)
+                else:
+                    self.send_message(jid, self.encode_distance_vector(jid, entries), mtype='chat')
+        elif self.dvr_vectors:
+            self.solve_distance_vectors(self.node_number)
+        self.originate_lsa()
+
+    def start_link_monitor(self):
+        """
+        Starts measuring the links when adaptive link weights are enabled
+        """
+        if self.link_monitor is not None:
+            self.link_monitor.start()
+
+    def start_link_state(self):
+        """
+        Advertises this node's links and starts refreshing its advertisement and aging the database
+        """
+        self.originate_lsa()
+        if self.lsa_refresh_handle is None:
+            self.lsa_refresh_handle = self.loop.call_later(constants.LSA_REFRESH, self.refresh_link_state)
+
+    def refresh_link_state(self):
+        """
+        Periodic advertisement refresh, also withdraws the advertisements their origins stopped refreshing
+        """
+        self.lsa_refresh_handle = self.loop.call_later(constants.LSA_REFRESH, self.refresh_link_state)
+        self.originate_lsa()
+        if self.lsdb.expire(keep=self.node_number):
+            self.schedule_spf()
+
+    def originate_lsa(self):
+        """
+        Installs a new advertisement of this node's links and floods it
+        """
+        links = {node_index: weight for node_index, weight in enumerate(self.adjacent_node_weights)
+                 if node_index != self.node_number and is_link(weight)}
+        self.lsdb.install(self.node_number, self.lsa_sequence.next(), links)
+        self.schedule_spf()
+        self.flood_lsa(self.lsdb.get(self.node_number))
+
+    def encode_lsa(self, advertisement):
+        """
+        Builds the message body of an advertisement
+        :param advertisement: LinkStateAdvertisement
+        :return: message body
+        """
+        envelope = Envelope(advertisement.origin, advertisement.origin, LSA,
+                            payload=self.codec.encode_vector(advertisement.links), sequence=advertisement.sequence)
+        return self.codec.encode(envelope)
+
+    def flood_lsa(self, advertisement, received_from=None):
+        """
+        Sends an advertisement to every neighbor but the one it came from
+        :param advertisement: LinkStateAdvertisement
+        :param received_from: bare jid of the neighbor that sent it
+        """
+        message = self.encode_lsa(advertisement)
+        for node in self.adjacent_names:
+            if node != received_from:
+                self.transmit_lsa(node, advertisement, message)
+
+    def transmit_lsa(self, jid, advertisement, message):
+        """
+        Sends an advertisement to a neighbor. Advertisements skip the bounded message queue, a dropped one
+        would only be repaired by the next refresh.
+        :param jid: jid of the neighbor
+        :param advertisement: LinkStateAdvertisement
+        :param message: encoded advertisement
+        """
+        if self.outbound is None:
+            self.send_message(jid, message, mtype='chat')
+        else:
+            self.outbound.put_advertisement(jid, advertisement.origin, message)
+
+    def receive_link_state(self, envelope, received_from):
+        """
+        Installs and floods a newer advertisement. A neighbor that sent an older copy gets the newer one back.
+        :param envelope: LSA envelope
+        :param received_from: bare jid of the neighbor that sent it
+        """
+        current = self.lsdb.get(envelope.sender)
+        if envelope.sender == self.node_number:
+            # Advertisement of a previous run of this node, continue after its sequence number
+            if current is None or newer(envelope.sequence, current.sequence):
+                self.lsa_sequence.value = envelope.sequence
+                self.originate_lsa()
+            return
+
+        if self.lsdb.install(envelope.sender, envelope.sequence, self.codec.decode_vector(envelope)):
+            self.flood_lsa(self.lsdb.get(envelope.sender), received_from)
+            self.schedule_spf()
+        elif current.sequence != envelope.sequence:
+            self.transmit_lsa(received_from, current, self.encode_lsa(current))
+
+    def schedule_spf(self):
+        """
+        Schedules one SPF run for every advertisement installed until it starts
+        """
+        if self.spf_handle is None:
+            self.spf_handle = self.loop.call_later(self.spf_throttle.delay(), self.run_spf)
+
+    def run_spf(self):
+        """
+        Rebuilds the graph from the link state database and recomputes the forwarding table
+        """
+        self.spf_handle = None
+        self.spf_throttle.ran()
+        previous_graph = self.graph
+        changes = self.lsdb.take_changes()
+        self.graph = self.lsdb.graph()
+
+        if self.hierarchy is not None:  # Area routes are recomputed on the next lookup
+            self.hierarchy.invalidate(changes)
+            self.spt = None
+            self.topology_changed()
+            return
+
+        if constants.INCREMENTAL_SPF and len(changes) <= constants.INCREMENTAL_SPF_LIMIT:
+            cache = self.route_cache
+            if self.spt is None and cache.graph is previous_graph and cache.source == self.node_number:
+                self.spt = ShortestPathTree(previous_graph, self.node_number, cache.result)
+            if self.spt is not None:
+                self.incremental_spf(changes)
+                return
+
+        self.spt = None
+        self.topology_changed()
+        self.forwarding_table()
+
+    def incremental_spf(self, changes):
+        """
+        Repairs the shortest path tree link by link and patches the forwarding entries that changed
+        :param changes: (origin, neighbor, weight) link changes from the link state database
+        """
+        changed = set()
+        for u, v, weight in changes:
+            if v < self.spt.size:
+                changed |= self.spt.update_link(u, v, weight)
+        fib_current = self.fib_version is not None and self.fib_version == self.route_cache.version
+        self.topology_changed()
+        self.route_cache.install(self.graph, self.topology_version, self.spt.result())
+        if not fib_current:
+            self.forwarding_table()
+            return
+        for destination in changed:
+            hop = self.spt.next_hops[destination]
+            if hop >= 0 and destination != self.node_number:
+                self.fib[destination] = self.nodes[hop]
+            else:
+                self.fib.pop(destination, None)
+        self.fib_version = self.topology_version
+
+    def multipath_route(self, destination, flow=None):
+        """
+        Picks one of the k shortest paths to a destination for the next message, the message then
+        carries the whole path like a source routed one
+        :param destination: destination node index
+        :param flow: messages with the same flow key take the same path while it is not backed up
+        :return: path and distance, empty path if the destination is unreachable
+        """
+        path_set = self.multipath.path_set(self.graph, self.node_number, destination, self.topology_version)
+        if path_set is None:
+            return [], INF
+        queues = [self.outbound.queue(self.nodes[path[1]]) if self.outbound is not None else None
+                  for path in path_set.paths]
+        index = path_set.select(queues, constants.MULTIPATH_MAX_IN_FLIGHT, flow)
+        path_set.record(index, queues[index])
+        return path_set.paths[index], path_set.distances[index]
+
+    def flood(self, envelope, received_from=None):
+        """
+        Sends a flooded message to every neighbor but the one it came from, while its TTL lasts
+        :param envelope: FLOODING envelope
+        :param received_from: bare jid of the neighbor that sent the message
+        """
+        if envelope.ttl <= 0:
+            return
+        if self.metrics_enabled:
+            start = time.perf_counter()
+        envelope.ttl -= 1
+        message = self.codec.encode(envelope)
+        for node in self.adjacent_names:
+            if node != received_from and node != self.nodes[envelope.sender]:
+                self.transmit(node, message, mtype='chat')
+        if self.metrics_enabled:
+            self.forward_time.observe(time.perf_counter() - start)
+
+    def send_routed(self, message_destinatary, message, algorithm, flow=None, kind=MESSAGE):
+        """
+        Sends a message to any node of the topology using one of the routing algorithms
+        :param message_destinatary: jid of the destination node
+        :param message: content, text or bytes
+        :param algorithm: DVR, FLOODING or LINK_STATE
+        :param flow: with multipath routing, messages with the same flow key take the same path
+        :param kind: MESSAGE, or CHUNK and CHUNK_ACK for streamed transfers
+        """
+        envelope, next_hop = self.route_message(message_destinatary, message, algorithm, flow, kind)
+        if next_hop is None:
+            self.flood(envelope)
+        else:
+            self.forward(next_hop, envelope)
+
+    async def put_routed(self, message_destinatary, message, algorithm, flow=None, kind=MESSAGE):
+        """
+        Sends a message like send_routed, first waiting until the outbound queue of its next hop has space.
+        A flooded message waits for every neighbor, any other message only for its own next hop.
+        """
+        envelope, next_hop = self.route_message(message_destinatary, message, algorithm, flow, kind)
+        if self.outbound is not None:
+            await self.outbound.wait_for_space(self.adjacent_names if next_hop is None else [next_hop])
+        if next_hop is None:
+            self.flood(envelope)
+        else:
+            self.forward(next_hop, envelope)
+
+    def route_message(self, message_destinatary, message, algorithm, flow=None, kind=MESSAGE):
+        """
+        Builds the envelope of a new message and chooses its next hop, the parameters are the ones of send_routed
+        :return: envelope and jid of the next hop, None for a flooded message, which goes to every neighbor
+        """
+        destination = self.codec.node_indexes[message_destinatary]
+        payload = message.encode('utf-8') if isinstance(message, str) else message
+        envelope = Envelope(self.node_number, destination, algorithm, payload=payload,
+                            visited=[self.node_number], timestamp=time.time(), kind=kind)
+        next_hop = message_destinatary
+        self.message_count.inc(ALGORITHM_NAMES[algorithm])
+        if self.metrics_enabled:
+            start = time.perf_counter()
+
+        if algorithm == FLOODING:
+            envelope.visited = []
+            envelope.sequence = self.flood_sequence.next()
+            envelope.ttl = constants.FLOOD_TTL
+            self.flood_seen.check_and_add(envelope.message_id)
+            return envelope, None
+
+        if algorithm == LINK_STATE and not constants.SOURCE_ROUTING and self.multipath is None:
+            # Transit nodes forward on the destination alone, the TTL counts the hops and stops loops
+            envelope.visited = []
+            envelope.ttl = constants.LINK_STATE_TTL - 1
+            next_hop, envelope.distance = self.link_state_route(destination)
+            next_hop = next_hop or message_destinatary
+
+        elif algorithm == LINK_STATE:
+            if self.multipath is not None and destination != self.node_number:
+                path, distance = self.multipath_route(destination, flow)
+            else:
+                self.ensure_routes()
+                path, distance = self.route_cache.lookup(self.graph, self.node_number, destination,
+                                                         self.route_cache.version)
+            log.debug("Shortest path is: %s with a total weight of %s", path, distance)
+            if len(path) > 1:
+                envelope.distance = distance
+                envelope.visited = path[:2]
+                envelope.path = path[2:]
+                next_hop = self.nodes[path[1]]
+
+        elif algorithm == DVR:
+            # Distance vectors can loop while they converge, the TTL counts the hops and stops loops
+            envelope.ttl = constants.DVR_TTL - 1
+            if self.dvr_next_hops and self.dvr_next_hops[destination] >= 0:
+                envelope.distance = self.dvr_min_distances[destination]
+                next_hop = self.nodes[self.dvr_next_hops[destination]]
+
+        if self.metrics_enabled:
+            self.route_lookup_time.observe(time.perf_counter() - start)
+        return envelope, next_hop
@@ -0,0 +1,324 @@
+# encoding: utf-8
+"""
+    simulator.py
+    Authors: Mario Sarmientos, Randy Venegas, Pablo Ruiz 18259 (PingMaster99)
+    Version 1.0
+    Updated October 18, 2026
+
+    In-process network simulator.
+    Every node of a topology runs the same RoutingNode logic as MessengerAccount, on one asyncio loop,
+    connected through an in-memory transport with configurable latency and loss instead of an XMPP server.
+    Reports delivery latency percentiles, hop counts, throughput and CPU time per node as JSON.
+
+    Example: python simulator.py --generate random --nodes 200 --algorithm link_state --messages 2000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+import constants
+import metrics
+from message_codec import DVR, FLOODING, LINK_STATE
+from routing_node import RoutingNode
+from topology_reader import TopologyReader
+
+ALGORITHMS = {'dvr': DVR, 'flooding': FLOODING, 'link_state': LINK_STATE}
+
+
+def percentile(values, fraction):
+    """
+    Nearest rank percentile
+    :param values: sorted values
+    :param fraction: percentile between 0 and 1
+    :return: value or None if there are no values
+    """
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class SimulatedNetwork:
+    """
+    In-memory transport standing in for the XMPP server
+    """
+    def __init__(self, loop, latency=0.005, jitter=0.0, loss=0.0, link_latency=None, seed=1):
+        """
+        Initializes the network
+        :param loop: asyncio loop running the simulation
+        :param latency: default one way latency of a link in seconds
+        :param jitter: maximum random latency added to every message
+        :param loss: probability of losing a message
+        :param link_latency: dictionary of (sender jid, receiver jid) -> latency overriding the default
+        :param seed: random seed for jitter and loss
+        """
+        self.loop = loop
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.link_latency = link_latency or {}
+        self.random = random.Random(seed)
+        self.nodes = {}
+        self.in_flight = 0
+        self.transmissions = 0
+        self.dropped = 0
+        self.sent_at = {}
+        self.deliveries = []
+
+    def add(self, node):
+        """
+        Connects a node to the network
+        :param node: SimulatedNode
+        """
+        self.nodes[node.jid] = node
+
+    def transmit(self, sender, receiver, body):
+        """
+        Sends a message body from one node to another
+        :param sender: jid of the sender
+        :param receiver: jid of the receiver
+        :param body: message body
+        """
+        self.transmissions += 1
+        if self.loss and self.random.random() < self.loss:
+            self.dropped += 1
+            return
+        delay = self.link_latency.get((sender, receiver), self.latency)
+        if self.jitter:
+            delay += self.random.uniform(0, self.jitter)
+        self.in_flight += 1
+        self.loop.call_later(delay, self.deliver, sender, receiver, body)
+
+    def round_trip(self, sender, receiver):
+        """
+        Round trip time of a probe between two nodes, with the latency and loss of both directions
+        :return: seconds, None if the probe or its answer was lost
+        """
+        if receiver not in self.nodes:
+            return None
+        rtt = 0.0
+        for link in ((sender, receiver), (receiver, sender)):
+            if self.loss and self.random.random() < self.loss:
+                return None
+            rtt += self.link_latency.get(link, self.latency)
+            if self.jitter:
+                rtt += self.random.uniform(0, self.jitter)
+        return rtt
+
+    def deliver(self, sender, receiver, body):
+        """
+        Hands a message body to its receiver
+        """
+        self.in_flight -= 1
+        node = self.nodes.get(receiver)
+        if node is not None:
+            node.receive(body, sender)
+
+    def record_delivery(self, tag, hops):
+        """
+        Records a message that reached its destination
+        :param tag: payload of the message, used as its id
+        :param hops: links the message went through
+        """
+        sent_at = self.sent_at.pop(tag, None)
+        if sent_at is not None:
+            self.deliveries.append((self.loop.time() - sent_at, hops, self.loop.time()))
+
+    async def wait_idle(self, quiet=0.05, timeout=60.0):
+        """
+        Waits until no message is in flight for a while
+        :param quiet: seconds without messages in flight
+        :param timeout: maximum seconds to wait
+        """
+        deadline = self.loop.time() + timeout
+        idle_since = None
+        while self.loop.time() < deadline:
+            if self.in_flight or any(node.dvr_update_handle is not None or node.spf_handle is not None or
+                                     (node.outbound is not None and not node.outbound.idle)
+                                     for node in self.nodes.values()):
+                idle_since = None
+            elif idle_since is None:
+                idle_since = self.loop.time()
+            elif self.loop.time() - idle_since >= quiet:
+                return
+            await asyncio.sleep(quiet / 5)
+
+
+class SimulatedNode(RoutingNode):
+    """
+    Node that routes messages over a SimulatedNetwork
+    """
+    def __init__(self, jid, topology_reader, network):
+        """
+        Initializes the node
+        :param jid: jid of the node
+        :param topology_reader: TopologyReader shared by every node
+        :param network: SimulatedNetwork the node is connected to
+        """
+        self.jid = jid
+        self.network = network
+        self.loop = network.loop
+        self.cpu_time = 0.0
+        self.handled = 0
+        self.setup_routing(jid, topology_reader)
+        network.add(self)
+
+    def send_message(self, mto, mbody, mtype='chat'):
+        """
+        Same signature as ClientXMPP.send_message
+        """
+        self.network.transmit(self.jid, str(mto), mbody)
+
+    async def probe_link(self, jid, timeout):
+        """
+        Same contract as MessengerAccount.probe_link
+        """
+        rtt = self.network.round_trip(self.jid, str(jid))
+        if rtt is None or rtt > timeout:
+            await asyncio.sleep(timeout)
+            return None
+        await asyncio.sleep(rtt)
+        return rtt
+
+    def receive(self, body, sender):
+        """
+        Handles a message from the network, measuring the CPU time spent on it
+        """
+        start = time.thread_time()
+        self.receive_routed_message(body, sender)
+        self.cpu_time += time.thread_time() - start
+        self.handled += 1
+
+    def message_delivered(self, envelope):
+        """
+        Records the delivery in the network statistics
+        """
+        self.network.record_delivery(envelope.text, self.hop_count(envelope))
+
+
+async def simulate(topology_file, algorithm, messages=1000, rate=1000.0, latency=0.005, jitter=0.0, loss=0.0,
+                   seed=1):
+    """
+    Runs a simulation
+    :param topology_file: topology file path
+    :param algorithm: 'dvr', 'flooding' or 'link_state'
+    :param messages: number of messages sent between random pairs of nodes
+    :param rate: messages sent per second
+    :param latency: one way latency of every link
+    :param jitter: maximum random latency added to every message
+    :param loss: probability of losing a message
+    :param seed: random seed
+    :return: report dictionary
+    """
+    loop = asyncio.get_running_loop()
+    reader = TopologyReader(topology_file)
+    network = SimulatedNetwork(loop, latency, jitter, loss, seed=seed)
+    nodes = [SimulatedNode(jid, reader, network) for jid in reader.nodes]
+    rng = random.Random(seed)
+
+    for node in nodes:
+        node.start_link_monitor()
+
+    convergence_time = None
+    if ALGORITHMS[algorithm] == DVR:
+        start = loop.time()
+        for node in nodes:
+            node.send_dvr_update()
+        await network.wait_idle(quiet=max(0.05, 2 * constants.DVR_DEBOUNCE))
+        convergence_time = loop.time() - start
+    elif ALGORITHMS[algorithm] == LINK_STATE and constants.LINK_STATE_DATABASE:
+        start = loop.time()
+        for node in nodes:
+            node.start_link_state()
+        await network.wait_idle(quiet=max(0.05, 2 * constants.SPF_INITIAL_DELAY))
+        convergence_time = loop.time() - start
+    control_transmissions = network.transmissions
+
+    start = loop.time()
+    for i in range(messages):
+        source, destination = rng.sample(nodes, 2) if len(nodes) > 1 else (nodes[0], nodes[0])
+        tag = f"sim-{i}"
+        network.sent_at[tag] = loop.time()
+        source.send_routed(destination.jid, tag, ALGORITHMS[algorithm])
+        await asyncio.sleep(1 / rate)
+    await network.wait_idle()
+
+    for node in nodes:
+        node.stop_routing()
+
+    latencies = sorted(delivery[0] for delivery in network.deliveries)
+    hops = sorted(delivery[1] for delivery in network.deliveries)
+    elapsed = (max(delivery[2] for delivery in network.deliveries) - start) if network.deliveries else 0.0
+    cpu_times = {node.jid: node.cpu_time for node in nodes}
+    return {
+        'algorithm': algorithm,
+        'nodes': len(nodes),
+        'links': reader.graph.edge_count,
+        'messages_sent': messages,
+        'messages_delivered': len(network.deliveries),
+        'delivery_ratio': len(network.deliveries) / messages if messages else None,
+        'messages_per_second': len(network.deliveries) / elapsed if elapsed else None,
+        'transmissions': network.transmissions - control_transmissions,
+        'control_transmissions': control_transmissions,
+        'dropped': network.dropped,
+        'convergence_time': convergence_time,
+        'latency': {name: percentile(latencies, fraction) for name, fraction in
+                    (('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('max', 1.0))},
+        'hops': {'mean': sum(hops) / len(hops) if hops else None, 'max': hops[-1] if hops else None},
+        'cpu_time': {
+            'total': sum(cpu_times.values()),
+            'mean': sum(cpu_times.values()) / len(cpu_times),
+            'max': max(cpu_times.values()),
+            'busiest_node': max(cpu_times, key=cpu_times.get),
+        },
+    }
+
+
+def main():
+    """
+    Command line entry point
+    """
+    parser = argparse.ArgumentParser(description="Simulate the routing algorithms without an XMPP server")
+    parser.add_argument('--topology', default='./topology.txt', help="Topology file")
+    parser.add_argument('--generate', help="Generate a topology instead (random, grid, ring, scale_free, mesh)")
+    parser.add_argument('--nodes', type=int, default=100, help="Nodes of the generated topology")
+    parser.add_argument('--algorithm', nargs='+', choices=list(ALGORITHMS), default=list(ALGORITHMS))
+    parser.add_argument('--messages', type=int, default=1000)
+    parser.add_argument('--rate', type=float, default=1000.0, help="Messages sent per second")
+    parser.add_argument('--latency', type=float, default=0.005, help="Link latency in seconds")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Maximum random latency added in seconds")
+    parser.add_argument('--loss', type=float, default=0.0, help="Probability of losing a message")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="JSON report file, printed when omitted")
+    parser.add_argument('--metrics', help="Also record the forwarding path metrics of every node into this file")
+    args = parser.parse_args()
+    if args.metrics:
+        metrics.REGISTRY.enabled = True
+
+    with tempfile.TemporaryDirectory() as workspace:
+        topology_file = args.topology
+        if args.generate:
+            from benchmark import write_topology
+            topology_file = os.path.join(workspace, 'topology.txt')
+            write_topology(topology_file, args.generate, args.nodes, args.seed)
+
+        reports = []
+        for algorithm in args.algorithm:
+            reports.append(asyncio.run(simulate(topology_file, algorithm, args.messages, args.rate,
+                                                args.latency, args.jitter, args.loss, args.seed)))
+
+    if args.metrics:
+        metrics.REGISTRY.export(args.metrics)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(reports, output, indent=2)
+    else:
+        print(json.dumps(reports, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -5,47 +5,241 @@
     Version 1.0
     Updated August 31, 2021
 
-    Reads a txt file to form a network topology
+    Reads a txt file to form a network topology.
+    Two formats are supported:
+    - Adjacency matrix: a line with the node names followed by one row of weights per node.
+    - Edge list: a line with EDGES, a line with the node names and one "source target weight" line per link.
+    The parsed topology is stored in a binary cache next to the file, so later starts map it instead of
+    parsing the text again.
 """
 
-from constants import SERVER
+import hashlib
+import mmap
+import os
+import struct
+from array import array
+from constants import SERVER, DENSE_MATRIX_LIMIT
+from graph import CSRGraph, INF
+
+EDGE_LIST_HEADER = 'EDGES'
+CACHE_SUFFIX = '.csr'
+CACHE_MAGIC = b'TOPO'
+CACHE_VERSION = 2     # 2: matrices with fewer rows than nodes are rejected, older caches may hold them
+# magic, version, source mtime (ns), source size, source sha256, nodes, links, node names length
+CACHE_HEADER = struct.Struct('<4sIqq32sqqq')
+
+
+def file_digest(path):
+    """
+    sha256 of a file, read in blocks
+    :param path: file path
+    :return: digest bytes
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(1 << 20), b''):
+            digest.update(block)
+    return digest.digest()
 
 
 class TopologyReader:
-    def __init__(self):
-        self.file = './topology.txt'
+    def __init__(self, file='./topology.txt', use_cache=True):
+        """
+        Reads the topology file
+        :param file: topology file path
+        :param use_cache: read and write the binary cache next to the file
+        """
+        self.file = file
+        self.cache_file = f"{file}{CACHE_SUFFIX}"
         self.node_quantity = 0
-        self.adjacency_matrix = []
         self.nodes = []
-        self.fill_file()
+        self.graph = None
+        self._adjacency_matrix = None
+        self._heaviest_link = None
+        self._cache = None
+
+        if not (use_cache and self.load_cache()):
+            self.fill_file()
+            if use_cache and self.graph is not None:
+                self.write_cache()
+
+    @property
+    def adjacency_matrix(self):
+        """
+        Dense matrix view of the topology. It is always built from self.graph, so a parsed file and a
+        cached one give the same view, and only for topologies of up to DENSE_MATRIX_LIMIT nodes, bigger
+        ones must use self.graph.
+        :return: list of rows, missing links and the diagonal are infinite, or None
+        """
+        if self._adjacency_matrix is None and self.graph is not None and \
+                self.node_quantity <= DENSE_MATRIX_LIMIT:
+            self._adjacency_matrix = self.graph.to_matrix()
+        return self._adjacency_matrix
+
+    @adjacency_matrix.setter
+    def adjacency_matrix(self, matrix):
+        self._adjacency_matrix = matrix
+
+    @property
+    def heaviest_link(self):
+        """
+        :return: biggest link weight of the topology, 1 when it has no links
+        """
+        if self._heaviest_link is None and self.graph is not None:
+            self._heaviest_link = max(self.graph.weights, default=1.0)
+        return self._heaviest_link
 
     def fill_file(self):
-        self.adjacency_matrix = []
+        """
+        Parses the topology file line by line into the CSR graph
+        """
+        self.adjacency_matrix = None
+        self._heaviest_link = None
+        self.graph = None
         with open(self.file) as top:
-            first_line = True
-            for line in top:
-                if first_line:
-                    self.nodes = line.split()
-                    self.nodes = [f"{node}{SERVER}" for node in self.nodes]
-                    self.node_quantity = len(self.nodes)
-                    first_line = False
-                    continue
-
-                line = line.strip()
-                if len(line) == 0:
-                    continue
-
-                try:
-                    content = [float(i) for i in line.split()]
-                    if len(content) != len(self.nodes):
-                        self.nodes = None
-                        self.adjacency_matrix = None
-                        print("topology.txt contains an adjacency matrix that is not proportional to the number of "
-                              "nodes")
-                        break
-                    self.adjacency_matrix.append(content)
-
-                except ValueError:
-                    print("topology.txt contains non numeric values")
-                    break
+            first_line = top.readline()
+            if first_line.strip() == EDGE_LIST_HEADER:
+                names = top.readline().split()
+                parsed = self.read_edge_list(top, names)
+            else:
+                names = first_line.split()
+                parsed = self.read_matrix(top, names)
+
+        if not parsed:
+            self.nodes = None
+            self.adjacency_matrix = None
+            self.graph = None
+            return
+        self.nodes = [f"{node}{SERVER}" for node in names]
+        self.node_quantity = len(self.nodes)
+
+    def read_matrix(self, top, names):
+        """
+        Reads the rows of an adjacency matrix
+        :param top: open file positioned after the node names
+        :param names: node names
+        :return: True if the matrix has one row and one column per node
+        """
+        sources, targets, weights = array('q'), array('q'), array('d')
+        u = 0
+        for line in top:
+            line = line.strip()
+            if len(line) == 0:
+                continue
+
+            try:
+                content = [float(i) for i in line.split()]
+            except ValueError:
+                print(f"{self.file} contains non numeric values")
+                return False
+            if len(content) != len(names) or u >= len(names):
+                print(f"{self.file} contains an adjacency matrix that is not proportional to the number of "
+                      "nodes")
+                return False
+
+            for v, weight in enumerate(content):
+                if u != v and weight != 0 and weight != INF:
+                    sources.append(u)
+                    targets.append(v)
+                    weights.append(weight)
+            u += 1
+
+        if u != len(names):
+            print(f"{self.file} contains an adjacency matrix that is not proportional to the number of nodes")
+            return False
+        self.graph = CSRGraph.from_arrays(len(names), sources, targets, weights)
+        return True
+
+    def read_edge_list(self, top, names):
+        """
+        Reads "source target [weight]" lines, nodes are given by name or index and the weight defaults to 1
+        :param top: open file positioned after the node names
+        :param names: node names
+        :return: True if every link is valid
+        """
+        indexes = {name: index for index, name in enumerate(names)}
+        sources, targets, weights = array('q'), array('q'), array('d')
+        for line in top:
+            fields = line.split()
+            if len(fields) == 0 or fields[0].startswith('#'):
+                continue
+
+            try:
+                link = [indexes[field] if field in indexes else int(field) for field in fields[:2]]
+                weight = float(fields[2]) if len(fields) > 2 else 1.0
+            except ValueError:
+                print(f"{self.file} contains an invalid link: {line.strip()}")
+                return False
+            if len(fields) < 2 or not all(0 <= node < len(names) for node in link):
+                print(f"{self.file} contains a link to an unknown node: {line.strip()}")
+                return False
+
+            if link[0] != link[1] and weight != 0 and weight != INF:
+                sources.append(link[0])
+                targets.append(link[1])
+                weights.append(weight)
+
+        self.graph = CSRGraph.from_arrays(len(names), sources, targets, weights)
+        return True
+
+    def write_cache(self):
+        """
+        Writes the parsed graph next to the topology file. Failing to write the cache is not an error.
+        """
+        names = '\n'.join(node[:-len(SERVER)] if node.endswith(SERVER) else node
+                          for node in self.nodes).encode('utf-8')
+        names += b'\0' * (-len(names) % 8)     # Keep the arrays 8 byte aligned
+        try:
+            stat = os.stat(self.file)
+            header = CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, stat.st_mtime_ns, stat.st_size,
+                                       file_digest(self.file), self.graph.size, self.graph.edge_count, len(names))
+            temporary_file = f"{self.cache_file}.tmp"
+            with open(temporary_file, 'wb') as cache:
+                cache.write(header)
+                cache.write(names)
+                cache.write(bytes(self.graph.offsets))
+                cache.write(bytes(self.graph.targets))
+                cache.write(bytes(self.graph.weights))
+            os.replace(temporary_file, self.cache_file)
+        except OSError:
+            pass
+
+    def load_cache(self):
+        """
+        Maps the binary cache if it matches the topology file. The file is considered unchanged when its
+        modification time and size match, or otherwise when its sha256 matches.
+        :return: True if the graph was loaded from the cache
+        """
+        try:
+            stat = os.stat(self.file)
+            with open(self.cache_file, 'rb') as cache:
+                mapped = mmap.mmap(cache.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+
+        try:
+            magic, version, mtime, size, digest, node_count, link_count, names_length = \
+                CACHE_HEADER.unpack_from(mapped)
+        except struct.error:
+            mapped.close()
+            return False
+        expected_length = CACHE_HEADER.size + names_length + 8 * (node_count + 1) + 16 * link_count
+        if magic != CACHE_MAGIC or version != CACHE_VERSION or len(mapped) != expected_length or \
+                ((mtime, size) != (stat.st_mtime_ns, stat.st_size) and digest != file_digest(self.file)):
+            mapped.close()
+            return False
+
+        view = memoryview(mapped)
+        start = CACHE_HEADER.size + names_length
+        names = bytes(view[CACHE_HEADER.size:start]).rstrip(b'\0').decode('utf-8')
+        offsets = view[start:start + 8 * (node_count + 1)].cast('q')
+        start += 8 * (node_count + 1)
+        targets = view[start:start + 8 * link_count].cast('q')
+        start += 8 * link_count
+        weights = view[start:start + 8 * link_count].cast('d')
 
+        self._cache = mapped
+        self.nodes = [f"{node}{SERVER}" for node in names.split('\n')] if node_count else []
+        self.node_quantity = node_count
+        self.graph = CSRGraph(node_count, offsets, targets, weights)
+        return True
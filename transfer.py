@@ -0,0 +1,409 @@
+# encoding: utf-8
+"""
+    transfer.py
+    Authors: Mario Sarmientos, Randy Venegas, Pablo Ruiz 18259 (PingMaster99)
+    Version 1.0
+    Updated October 18, 2026
+
+    Streamed payload transfer.
+    The payload is compressed with zlib while it is read and cut into sequence numbered chunks that are
+    routed like any other message, so every hop only ever holds one chunk. The destination acknowledges
+    with its next expected chunk and a bitmap of the chunks it buffered after it (selective repeat), the
+    sender keeps up to a window of unacknowledged chunks in flight and sends again the ones whose
+    acknowledgement timed out. Chunk 0 carries the name of the transfer.
+"""
+
+import asyncio
+import io
+import logging
+import os
+import random
+import struct
+import zlib
+from collections import OrderedDict
+from message_codec import CHUNK, CHUNK_ACK
+
+log = logging.getLogger(__name__)
+
+# transfer id, chunk index, flags
+CHUNK_HEADER = struct.Struct('!IIB')
+# transfer id, next expected chunk, bitmap of the buffered chunks after it
+ACK = struct.Struct('!IIQ')
+FINAL = 1
+MAX_WINDOW = 64
+READ_SIZE = 16384
+
+
+class TransferError(Exception):
+    """
+    Raised when a transfer cannot be completed
+    """
+
+
+class OutgoingTransfer:
+    """
+    Sender side of a transfer
+    """
+    def __init__(self, transfer_id, destination, algorithm, source, name, chunk_size, level):
+        """
+        Initializes the transfer
+        :param transfer_id: random id of the transfer
+        :param destination: jid of the destination node
+        :param algorithm: routing algorithm of the chunks
+        :param source: binary file object the payload is read from
+        :param name: name of the payload
+        :param chunk_size: compressed bytes per chunk
+        :param level: zlib compression level
+        """
+        self.transfer_id = transfer_id
+        self.destination = destination
+        self.algorithm = algorithm
+        self.source = source
+        self.chunk_size = chunk_size
+        self.compressor = zlib.compressobj(level)
+        self.compressed = bytearray()
+        self.exhausted = False
+        self.next_index = 1
+        self.unacked = {0: [0, name.encode('utf-8'), 0.0, 0]}    # index -> [flags, data, sent at, sends]
+        self.acked = 0
+        self.read = 0
+        self.sent_bytes = 0
+        self.retransmissions = 0
+        self.progress = asyncio.Event()
+
+    @property
+    def finished(self):
+        return self.exhausted and not self.unacked
+
+    def next_chunk(self):
+        """
+        Reads and compresses the source until a chunk is ready
+        :return: chunk index
+        """
+        while len(self.compressed) < self.chunk_size and self.source is not None:
+            data = self.source.read(READ_SIZE)
+            if data:
+                self.read += len(data)
+                self.compressed += self.compressor.compress(data)
+            else:
+                self.compressed += self.compressor.flush()
+                self.source = None
+        data = bytes(self.compressed[:self.chunk_size])
+        del self.compressed[:self.chunk_size]
+        flags = 0
+        if self.source is None and not self.compressed:
+            flags = FINAL
+            self.exhausted = True
+        index = self.next_index
+        self.next_index += 1
+        self.unacked[index] = [flags, data, 0.0, 0]
+        return index
+
+    def acknowledge(self, next_expected, bitmap):
+        """
+        Drops the chunks the destination confirmed
+        :param next_expected: every chunk before it was received
+        :param bitmap: bit i set when chunk next_expected + 1 + i was received
+        """
+        for index in [index for index in self.unacked if index < next_expected or
+                      (index > next_expected and bitmap >> (index - next_expected - 1) & 1)]:
+            del self.unacked[index]
+            self.acked += 1
+        self.progress.set()
+
+
+class IncomingTransfer:
+    """
+    Receiver side of a transfer, chunks are buffered until the ones before them arrive
+    """
+    def __init__(self, sender, transfer_id, directory):
+        """
+        Initializes the transfer
+        :param sender: jid of the sender node
+        :param transfer_id: id of the transfer
+        :param directory: directory the payload is written to
+        """
+        self.sender = sender
+        self.transfer_id = transfer_id
+        self.directory = directory
+        self.next_index = 0
+        self.buffer = {}
+        self.decompressor = zlib.decompressobj()
+        self.file = None
+        self.path = None
+        self.size = 0
+        self.ack_handle = None
+        self.active_at = 0.0
+
+    def bitmap(self):
+        """
+        :return: bitmap of the buffered chunks after the next expected one
+        """
+        bitmap = 0
+        for index in self.buffer:
+            bitmap |= 1 << (index - self.next_index - 1)
+        return bitmap
+
+    def write(self, index, flags, data, max_size):
+        """
+        Handles the next chunk in order
+        :param index: chunk index
+        :param flags: chunk flags
+        :param data: chunk data
+        :param max_size: biggest decompressed payload accepted
+        :return: True when the transfer is complete
+        """
+        if index == 0:
+            # Only the last part of the name is used so the sender cannot choose the directory
+            name = os.path.basename(data.decode('utf-8', 'replace')) or 'transfer'
+            username = self.sender.split('@')[0]
+            os.makedirs(self.directory, exist_ok=True)
+            self.path = os.path.join(self.directory, f"{username}-{self.transfer_id:08x}-{name}")
+            self.file = open(self.path, 'wb')
+            return False
+
+        # Decompressed in bounded pieces so a small chunk cannot expand into a huge buffer
+        while data:
+            output = self.decompressor.decompress(data, READ_SIZE)
+            self.size += len(output)
+            if self.size > max_size:
+                raise TransferError(f"Transfer from {self.sender} is bigger than {max_size} bytes")
+            self.file.write(output)
+            data = self.decompressor.unconsumed_tail
+        if flags & FINAL:
+            self.file.write(self.decompressor.flush())
+            self.close()
+            return True
+        return False
+
+    def close(self):
+        """
+        Closes the output file
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def discard(self):
+        """
+        Closes and deletes the partial output file
+        """
+        if self.ack_handle is not None:
+            self.ack_handle.cancel()
+            self.ack_handle = None
+        self.close()
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+class TransferManager:
+    """
+    Streamed transfers of a routing node
+    """
+    def __init__(self, node, chunk_size=4096, window=32, timeout=2.0, retries=5, directory='received',
+                 max_incoming=16, max_size=1 << 30, idle_timeout=60.0, level=6):
+        """
+        Initializes the manager
+        :param node: RoutingNode the chunks are routed through
+        :param chunk_size: compressed bytes per chunk
+        :param window: chunks in flight before waiting for acknowledgements, at most 64
+        :param timeout: seconds without an acknowledgement before a chunk is sent again
+        :param retries: times a chunk is sent again before the transfer fails
+        :param directory: directory received payloads are written to
+        :param max_incoming: transfers received at the same time
+        :param max_size: biggest decompressed payload accepted
+        :param idle_timeout: seconds without chunks before an incoming transfer is discarded
+        :param level: zlib compression level
+        """
+        self.node = node
+        self.chunk_size = chunk_size
+        self.window = min(window, MAX_WINDOW)
+        self.timeout = timeout
+        self.retries = retries
+        self.directory = directory
+        self.max_incoming = max_incoming
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.level = level
+        self.outgoing = {}
+        self.incoming = {}
+        self.expire_handle = None
+        # Finished transfers still answer late retransmissions, so a lost final acknowledgement is repeated
+        self.completed = OrderedDict()
+
+    async def send(self, destination, source, name, algorithm):
+        """
+        Streams a payload to another node
+        :param destination: jid of the destination node
+        :param source: bytes or binary file object
+        :param name: name of the payload at the destination
+        :param algorithm: DVR, FLOODING or LINK_STATE
+        :return: dictionary with the bytes read, bytes sent, chunks and retransmissions
+        """
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = io.BytesIO(source)
+        transfer_id = random.getrandbits(32)
+        transfer = OutgoingTransfer(transfer_id, destination, algorithm, source, name, self.chunk_size, self.level)
+        self.outgoing[transfer_id] = transfer
+        loop = asyncio.get_running_loop()
+        try:
+            while not transfer.finished:
+                while len(transfer.unacked) < self.window and not transfer.exhausted:
+                    transfer.next_chunk()
+
+                # Chunks never sent and chunks whose acknowledgement timed out
+                now = loop.time()
+                for index, chunk in sorted(transfer.unacked.items()):
+                    flags, data, sent_at, sends = chunk
+                    if sends and now - sent_at < self.timeout:
+                        continue
+                    if sends > self.retries:
+                        raise TransferError(f"Chunk {index} to {destination} was not acknowledged")
+                    if index not in transfer.unacked:   # Acknowledged while an earlier chunk waited for space
+                        continue
+                    if sends:
+                        transfer.retransmissions += 1
+                    await self.send_chunk(transfer, index, flags, data)
+                    chunk[2], chunk[3] = loop.time(), sends + 1
+
+                if transfer.finished:
+                    break
+                transfer.progress.clear()
+                try:
+                    await asyncio.wait_for(transfer.progress.wait(), self.timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            del self.outgoing[transfer_id]
+        return {'read': transfer.read, 'sent': transfer.sent_bytes, 'chunks': transfer.next_index,
+                'retransmissions': transfer.retransmissions}
+
+    async def send_chunk(self, transfer, index, flags, data):
+        """
+        Routes one chunk to the destination of a transfer, waiting while the queue of its next hop is full
+        """
+        payload = CHUNK_HEADER.pack(transfer.transfer_id, index, flags) + data
+        transfer.sent_bytes += len(payload)
+        await self.node.put_routed(transfer.destination, payload, transfer.algorithm, flow=transfer.transfer_id,
+                                   kind=CHUNK)
+
+    def receive_chunk(self, envelope):
+        """
+        Buffers a chunk that reached this node and writes every chunk that is now in order
+        :param envelope: CHUNK envelope
+        """
+        if len(envelope.payload) < CHUNK_HEADER.size:
+            log.warning("Malformed chunk from %s dropped", self.node.nodes[envelope.sender])
+            return
+        transfer_id, index, flags = CHUNK_HEADER.unpack_from(envelope.payload)
+        data = bytes(envelope.payload[CHUNK_HEADER.size:])
+        sender = self.node.nodes[envelope.sender]
+        key = (envelope.sender, transfer_id)
+
+        if key in self.completed:
+            self.send_ack(envelope, transfer_id, self.completed[key], 0)
+            return
+        transfer = self.incoming.get(key)
+        if transfer is None:
+            self.expire_incoming()
+            if len(self.incoming) >= self.max_incoming:
+                log.warning("Too many incoming transfers, chunk from %s dropped", sender)
+                return
+            transfer = self.incoming[key] = IncomingTransfer(sender, transfer_id, self.directory)
+            if self.expire_handle is None:
+                self.expire_handle = self.node.loop.call_later(self.idle_timeout, self.expire_incoming)
+        transfer.active_at = self.node.loop.time()
+
+        # Chunks beyond the window are dropped so the buffer stays bounded, the sender sends them again
+        if transfer.next_index <= index <= transfer.next_index + self.window:
+            transfer.buffer[index] = (flags, data)
+        try:
+            while transfer.next_index in transfer.buffer:
+                flags, data = transfer.buffer.pop(transfer.next_index)
+                transfer.next_index += 1
+                if transfer.write(transfer.next_index - 1, flags, data, self.max_size):
+                    self.finish(key, transfer)
+                    break
+        except (TransferError, zlib.error, OSError) as error:
+            print(f"Transfer from {sender} failed: {error}")
+            transfer.discard()
+            del self.incoming[key]
+            return
+        self.schedule_ack(envelope, transfer)
+
+    def schedule_ack(self, envelope, transfer):
+        """
+        Acknowledges once per loop iteration, a burst of chunks gets a single acknowledgement
+        """
+        if transfer.ack_handle is None:
+            transfer.ack_handle = self.node.loop.call_soon(self.send_transfer_ack, envelope, transfer)
+
+    def send_transfer_ack(self, envelope, transfer):
+        """
+        Sends the acknowledgement of an incoming transfer
+        """
+        transfer.ack_handle = None
+        self.send_ack(envelope, transfer.transfer_id, transfer.next_index, transfer.bitmap())
+
+    def send_ack(self, envelope, transfer_id, next_expected, bitmap):
+        """
+        Routes an acknowledgement back to the sender of a chunk
+        """
+        self.node.send_routed(self.node.nodes[envelope.sender], ACK.pack(transfer_id, next_expected, bitmap),
+                              envelope.algorithm, kind=CHUNK_ACK)
+
+    def receive_ack(self, envelope):
+        """
+        Applies an acknowledgement that reached this node
+        :param envelope: CHUNK_ACK envelope
+        """
+        if len(envelope.payload) != ACK.size:
+            log.warning("Malformed chunk acknowledgement from %s dropped", self.node.nodes[envelope.sender])
+            return
+        transfer_id, next_expected, bitmap = ACK.unpack_from(envelope.payload)
+        transfer = self.outgoing.get(transfer_id)
+        if transfer is not None:
+            transfer.acknowledge(next_expected, bitmap)
+
+    def finish(self, key, transfer):
+        """
+        Records a complete incoming transfer and tells the node
+        """
+        del self.incoming[key]
+        self.completed[key] = transfer.next_index
+        if len(self.completed) > 256:
+            self.completed.popitem(last=False)
+        self.node.transfer_received(transfer.sender, transfer.path, transfer.size)
+
+    def expire_incoming(self):
+        """
+        Discards the incoming transfers whose sender stopped sending chunks, and checks again later while
+        transfers are still running
+        """
+        if self.expire_handle is not None:
+            self.expire_handle.cancel()
+            self.expire_handle = None
+        now = self.node.loop.time()
+        for key, transfer in list(self.incoming.items()):
+            if now - transfer.active_at >= self.idle_timeout:
+                print(f"Transfer from {transfer.sender} timed out, partial file discarded")
+                transfer.discard()
+                del self.incoming[key]
+        if self.incoming:
+            self.expire_handle = self.node.loop.call_later(self.idle_timeout, self.expire_incoming)
+
+    def close(self):
+        """
+        Closes the files of unfinished incoming transfers
+        """
+        if self.expire_handle is not None:
+            self.expire_handle.cancel()
+            self.expire_handle = None
+        for transfer in self.incoming.values():
+            if transfer.ack_handle is not None:
+                transfer.ack_handle.cancel()
+            transfer.close()
+        self.incoming.clear()